@@ -0,0 +1,357 @@
+# **********************************************************************************
+# * Project: Eskapade - A python-based package for data analysis                   *
+# * Created: 2017/06/21                                                            *
+# * Description:                                                                   *
+# *      Readers of columnar file formats (Parquet, Feather), with column          *
+# *      projection, row-group pruning of query selections and chunked reading     *
+# *                                                                                *
+# * Authors:                                                                       *
+# *      KPMG Big Data team, Amstelveen, The Netherlands                           *
+# *                                                                                *
+# * Redistribution and use in source and binary forms, with or without             *
+# * modification, are permitted according to the terms listed in the file          *
+# * LICENSE.                                                                       *
+# **********************************************************************************
+
+import ast
+import io
+import logging
+import tokenize
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow
+    import pyarrow.feather
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+from eskapade.exceptions import MissingPackageError
+
+log = logging.getLogger(__name__)
+
+# comparison operators of query expressions that can be checked against column statistics
+COMPARISON_OPS = {ast.Eq: '==', ast.NotEq: '!=', ast.Lt: '<', ast.LtE: '<=', ast.Gt: '>', ast.GtE: '>=',
+                  ast.In: 'in', ast.NotIn: 'not in'}
+LOCAL_VAR_PREFIX = '__local_var_'
+FLIPPED_OPS = {'==': '==', '!=': '!=', '<': '>', '<=': '>=', '>': '<', '>=': '<='}
+
+
+def _check_pyarrow(file_format):
+    """Raise exception if pyarrow is not available"""
+
+    if pyarrow is None:
+        raise MissingPackageError('unable to import pyarrow', required_by='{} reader'.format(file_format))
+
+
+def _parse_query(query):
+    """Parse query expression; returns None if query cannot be parsed as a Python expression"""
+
+    # local variables, referred to as "@var", are parsed as names with a prefix
+    try:
+        tokens = []
+        for tok in tokenize.generate_tokens(io.StringIO(query.strip()).readline):
+            if tokens and tokens[-1] == (tokenize.OP, '@') and tok.type == tokenize.NAME:
+                tokens[-1] = (tokenize.NAME, LOCAL_VAR_PREFIX + tok.string)
+            else:
+                tokens.append((tok.type, tok.string))
+        return ast.parse(tokenize.untokenize(tokens), mode='eval').body
+    except (SyntaxError, tokenize.TokenError):
+        return None
+
+
+def query_columns(query):
+    """Get names of columns used in query expression
+
+    :param str query: query expression, as passed to pandas.DataFrame.query
+    :returns: column names; None if the query cannot be parsed
+    :rtype: set
+    """
+
+    expr = _parse_query(query)
+    if expr is None:
+        return None
+    return set(node.id for node in ast.walk(expr)
+               if isinstance(node, ast.Name) and not node.id.startswith(LOCAL_VAR_PREFIX))
+
+
+def query_to_filters(query):
+    """Translate simple conditions of query expression into filters
+
+    The query is split into conditions combined by "and" (or "&").  Each
+    condition that compares a column with a literal value, e.g. "x > 2",
+    "2 < x <= 5" or "y in ['a', 'b']", is translated into a filter
+    (column, operator, value).  Other conditions, including comparisons with
+    values that cannot be converted, are ignored and only applied by the
+    query on the rows that are read.  The filters thus select a super set of
+    the query selection.
+
+    :param str query: query expression, as passed to pandas.DataFrame.query
+    :returns: filters
+    :rtype: list
+    """
+
+    expr = _parse_query(query)
+    if expr is None:
+        return []
+
+    # split query into conditions
+    conditions = []
+    todo = [expr]
+    while todo:
+        node = todo.pop()
+        if isinstance(node, ast.BoolOp) and isinstance(node.op, ast.And):
+            todo += node.values
+        elif isinstance(node, ast.BinOp) and isinstance(node.op, ast.BitAnd):
+            todo += [node.left, node.right]
+        elif isinstance(node, ast.Compare):
+            conditions.append(node)
+
+    # translate comparisons of columns and literals
+    filters = []
+    for cond in conditions:
+        operands = [cond.left] + cond.comparators
+        for left, op, right in zip(operands[:-1], cond.ops, operands[1:]):
+            if type(op) not in COMPARISON_OPS:
+                continue
+            op = COMPARISON_OPS[type(op)]
+            if isinstance(right, ast.Name) and op in FLIPPED_OPS:
+                left, right, op = right, left, FLIPPED_OPS[op]
+            if not isinstance(left, ast.Name) or left.id.startswith(LOCAL_VAR_PREFIX):
+                continue
+            try:
+                value = ast.literal_eval(right)
+            except (ValueError, TypeError):
+                # e.g. unhashable set elements; condition is left to the post-read query
+                continue
+            if op in ('in', 'not in') and not isinstance(value, (list, tuple, set)):
+                continue
+            filters.append((left.id, op, value))
+
+    return filters
+
+
+def _may_match(op, value, min_val, max_val, null_count):
+    """Check if values in range [min_val, max_val] may pass filter"""
+
+    try:
+        if op == '==':
+            return min_val <= value <= max_val
+        if op == '<':
+            return min_val < value
+        if op == '<=':
+            return min_val <= value
+        if op == '>':
+            return max_val > value
+        if op == '>=':
+            return max_val >= value
+        if op == 'in':
+            return any(min_val <= v <= max_val for v in value)
+        # missing values pass the "!=" and "not in" conditions
+        if null_count:
+            return True
+        if op == '!=':
+            return not min_val == max_val == value
+        if op == 'not in':
+            return not (min_val == max_val and min_val in value)
+    except TypeError:
+        pass
+    return True
+
+
+def select_row_groups(parquet_file, filters):
+    """Select row groups of Parquet file that may contain rows that pass filters
+
+    Row groups are skipped based on the minimum and maximum values of the
+    filtered columns, if stored in the file metadata.
+
+    :param pyarrow.parquet.ParquetFile parquet_file: Parquet file
+    :param list filters: filters (column, operator, value), as created by query_to_filters
+    :returns: indices of selected row groups
+    :rtype: list
+    """
+
+    meta = parquet_file.metadata
+    col_indices = dict((meta.schema.column(i).path, i) for i in range(meta.num_columns))
+    filters = [f for f in filters if f[0] in col_indices]
+    row_groups = []
+    for rg_index in range(meta.num_row_groups):
+        row_group = meta.row_group(rg_index)
+        for col, op, value in filters:
+            stats = row_group.column(col_indices[col]).statistics
+            if stats is None or not stats.has_min_max:
+                continue
+            if not _may_match(op, value, stats.min, stats.max, stats.null_count):
+                break
+        else:
+            row_groups.append(rg_index)
+
+    return row_groups
+
+
+def _read_columns(columns, queries, file_columns):
+    """Determine columns to read for selected columns and queries"""
+
+    if columns is None:
+        return None
+    read_cols = list(columns)
+    for query in queries:
+        q_cols = query_columns(query)
+        if q_cols is None:
+            return None
+        read_cols += [c for c in file_columns if c in q_cols and c not in read_cols]
+    return read_cols
+
+
+def _select(df, queries, columns):
+    """Apply queries and column selection to dataframe"""
+
+    for query in queries:
+        df = df.query(query)
+    if columns is not None and list(df.columns) != list(columns):
+        df = df[list(columns)]
+    return df
+
+
+def _table_frames(tables, queries, columns):
+    """Convert Arrow tables to dataframes and apply selections
+
+    Tables come with the row numbers of their rows in the file.  These are
+    used as index of the dataframes, unless an index is stored in the file.
+    """
+
+    for table, rows in tables:
+        df = table.to_pandas()
+        if isinstance(df.index, pd.RangeIndex) and df.index.start == 0 and df.index.step == 1:
+            df.index = rows
+        yield _select(df, queries, columns)
+
+
+def _row_numbers(row_counts, selected=None):
+    """Get row numbers in file of selected row groups or record batches"""
+
+    starts = np.cumsum([0] + list(row_counts))
+    if selected is None:
+        selected = range(len(row_counts))
+    return [pd.RangeIndex(starts[i], starts[i + 1]) for i in selected]
+
+
+def _rechunk(frames, chunksize):
+    """Yield dataframes of chunksize rows; the last dataframe may be shorter"""
+
+    pieces = []
+    n_rows = 0
+    for df in frames:
+        pieces.append(df)
+        n_rows += len(df)
+        while n_rows >= chunksize:
+            data = pd.concat(pieces) if len(pieces) > 1 else pieces[0]
+            yield data.iloc[:chunksize]
+            pieces = [data.iloc[chunksize:]]
+            n_rows -= chunksize
+    if n_rows > 0:
+        yield pd.concat(pieces) if len(pieces) > 1 else pieces[0]
+
+
+def _query_set(query_set):
+    """Get list of query expressions"""
+
+    if query_set is None:
+        return []
+    if isinstance(query_set, str):
+        return [query_set]
+    return list(query_set)
+
+
+def read_parquet(path, usecols=None, columns=None, query_set=None, chunksize=None):
+    """Read dataframe from Parquet file
+
+    Only the selected columns are read from the file.  Row groups that
+    cannot contain rows that pass the query selection are skipped, based on
+    the column statistics in the file metadata.  The queries are applied
+    to the rows that are read, so the result is the same as when applying
+    the queries to the full dataframe, e.g. with ApplySelectionToDf.
+
+    :param str path: path of Parquet file
+    :param list usecols: columns to read (same as "columns")
+    :param list columns: columns to read; all columns by default
+    :param list query_set: query expressions to select rows, applied in the same order, see pandas documentation
+    :param int chunksize: if set, return an iterator over dataframes of this number of rows
+    :returns: dataframe or iterator over dataframes
+    """
+
+    _check_pyarrow('Parquet')
+    columns = columns if columns is not None else usecols
+    queries = _query_set(query_set)
+
+    # select row groups
+    pq_file = pyarrow.parquet.ParquetFile(path)
+    read_cols = _read_columns(columns, queries, pq_file.schema_arrow.names)
+    filters = [f for q in queries for f in query_to_filters(q)]
+    row_groups = select_row_groups(pq_file, filters)
+    log.debug('Reading %d of %d row groups from Parquet file "%s"', len(row_groups),
+              pq_file.metadata.num_row_groups, path)
+
+    # read row groups
+    meta = pq_file.metadata
+    rows = _row_numbers([meta.row_group(i).num_rows for i in range(meta.num_row_groups)], row_groups)
+    if chunksize:
+        tables = (pq_file.read_row_group(i, columns=read_cols, use_pandas_metadata=True) for i in row_groups)
+        return _rechunk(_table_frames(zip(tables, rows), queries, columns), chunksize)
+    if row_groups:
+        table = pq_file.read_row_groups(row_groups, columns=read_cols, use_pandas_metadata=True)
+    else:
+        table = pq_file.schema_arrow.empty_table()
+        if read_cols is not None:
+            table = table.select(read_cols)
+    index = rows[0].append(rows[1:]) if rows else pd.RangeIndex(0)
+    return next(_table_frames([(table, index)], queries, columns))
+
+
+def _feather_columns(path):
+    """Get column names of Feather file"""
+
+    try:
+        return pyarrow.ipc.open_file(pyarrow.memory_map(path)).schema.names
+    except pyarrow.ArrowInvalid:
+        # Feather version 1 file
+        return pyarrow.feather.read_table(path, memory_map=True).column_names
+
+
+def read_feather(path, usecols=None, columns=None, query_set=None, chunksize=None):
+    """Read dataframe from Feather file
+
+    Only the selected columns are read from the file.  The file is memory
+    mapped and, if iterating, read per record batch.
+
+    :param str path: path of Feather file
+    :param list usecols: columns to read (same as "columns")
+    :param list columns: columns to read; all columns by default
+    :param list query_set: query expressions to select rows, applied in the same order, see pandas documentation
+    :param int chunksize: if set, return an iterator over dataframes of this number of rows
+    :returns: dataframe or iterator over dataframes
+    """
+
+    _check_pyarrow('Feather')
+    columns = columns if columns is not None else usecols
+    queries = _query_set(query_set)
+    read_cols = _read_columns(columns, queries, _feather_columns(path) if queries else [])
+
+    if chunksize:
+        try:
+            ipc_file = pyarrow.ipc.open_file(pyarrow.memory_map(path))
+            n_batches = ipc_file.num_record_batches
+            tables = (pyarrow.Table.from_batches([ipc_file.get_batch(i)]) for i in range(n_batches))
+            if read_cols is not None:
+                tables = (t.select(read_cols) for t in tables)
+            rows = _row_numbers([ipc_file.get_batch(i).num_rows for i in range(n_batches)])
+        except pyarrow.ArrowInvalid:
+            # Feather version 1 file: no record batches
+            tables = [pyarrow.feather.read_table(path, columns=read_cols)]
+            rows = _row_numbers([tables[0].num_rows])
+        return _rechunk(_table_frames(zip(tables, rows), queries, columns), chunksize)
+    table = pyarrow.feather.read_table(path, columns=read_cols, memory_map=True)
+    return next(_table_frames([(table, pd.RangeIndex(table.num_rows))], queries, columns))
@@ -0,0 +1,294 @@
+# **********************************************************************************
+# * Project: Eskapade - A python-based package for data analysis                   *
+# * Class  : DecompressedStream                                                    *
+# * Created: 2017/06/19                                                            *
+# * Description:                                                                   *
+# *      Streaming decompression of compressed input files in background           *
+# *      threads, with parallel decompression of multi-member files                *
+# *                                                                                *
+# * Authors:                                                                       *
+# *      KPMG Big Data team, Amstelveen, The Netherlands                           *
+# *                                                                                *
+# * Redistribution and use in source and binary forms, with or without             *
+# * modification, are permitted according to the terms listed in the file          *
+# * LICENSE.                                                                       *
+# **********************************************************************************
+
+import bz2
+import concurrent.futures
+import io
+import mmap
+import os
+import queue
+import threading
+import zlib
+from collections import OrderedDict
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+try:
+    import lz4.frame
+except ImportError:
+    lz4 = None
+
+from eskapade.core.mixins import LoggingMixin
+
+
+def _zstd_decompressor():
+    if zstandard is None:
+        raise RuntimeError('module "zstandard" is required to decompress zstd files')
+    return zstandard.ZstdDecompressor().decompressobj()
+
+
+def _lz4_decompressor():
+    if lz4 is None:
+        raise RuntimeError('module "lz4" is required to decompress lz4 files')
+    return lz4.frame.LZ4FrameDecompressor()
+
+
+# compression codecs by file extension: magic bytes at the start of each member/frame and decompressor factory
+CODECS = {'gz': (b'\x1f\x8b\x08', lambda: zlib.decompressobj(16 + zlib.MAX_WBITS)),
+          'bz2': (b'BZh', bz2.BZ2Decompressor),
+          'zst': (b'\x28\xb5\x2f\xfd', _zstd_decompressor),
+          'lz4': (b'\x04\x22\x4d\x18', _lz4_decompressor)}
+
+
+def compression_codec(path):
+    """Get compression codec of file from its extension
+
+    :param str path: file path
+    :returns: codec name; None if file extension does not correspond to a known codec
+    :rtype: str
+    """
+
+    ext = os.path.splitext(path)[1].strip('.').lower()
+    return ext if ext in CODECS else None
+
+
+class DecompressedStream(io.RawIOBase, LoggingMixin):
+    """Read-only stream of decompressed file contents
+
+    The file is decompressed in a background thread, while the consumer,
+    e.g. a pandas parser, reads from the stream.  Files with multiple
+    compressed members (gzip, bzip2) or frames (zstd, lz4), e.g. created by
+    concatenating compressed files or by block-compression tools, are
+    decompressed in parallel by a pool of worker threads.  The decompression
+    libraries release the GIL, so decompression is not limited to one core.
+
+    Members are located by their magic bytes.  Once the end of the first
+    member shows that the file has multiple members, candidate members are
+    decompressed ahead in the worker threads.  Only members that follow
+    directly on the previous member are used, so magic bytes that occur
+    inside compressed data do not affect the output.
+    """
+
+    def __init__(self, path, codec=None, workers=1, block_size=2 ** 20, max_blocks=16):
+        """Initialize decompressed stream
+
+        :param str path: path of compressed file
+        :param str codec: compression codec, e.g. "gz"; determined from file extension by default
+        :param int workers: number of threads to decompress members in parallel; if one, the file is decompressed
+               in the background thread only
+        :param int block_size: size of compressed blocks fed to the decompressor
+        :param int max_blocks: maximum number of decompressed blocks buffered ahead of the consumer
+        """
+
+        io.RawIOBase.__init__(self)
+        self.path = path
+        self.codec = codec or compression_codec(path)
+        if self.codec not in CODECS:
+            self.log().critical('Unknown compression codec for file "%s": "%s"', path, str(self.codec))
+            raise RuntimeError('unknown compression codec')
+        self.magic, self.decompressor = CODECS[self.codec]
+        self.workers = max(int(workers), 1)
+        self.block_size = block_size
+
+        self._blocks = queue.Queue(maxsize=max_blocks)
+        self._buffer = b''
+        self._eof = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._produce, name='decompress_{}'.format(os.path.basename(path)))
+        self._thread.daemon = True
+        self._thread.start()
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        """Read decompressed bytes into buffer
+
+        :param b: writable buffer
+        :returns: number of bytes read; zero at end of stream
+        :rtype: int
+        """
+
+        while not self._buffer and not self._eof:
+            block = self._blocks.get()
+            if isinstance(block, Exception):
+                self._eof = True
+                raise block
+            if block is None:
+                self._eof = True
+            else:
+                self._buffer = memoryview(block)
+        n_bytes = min(len(b), len(self._buffer))
+        b[:n_bytes] = self._buffer[:n_bytes]
+        self._buffer = self._buffer[n_bytes:]
+        return n_bytes
+
+    def close(self):
+        """Close stream and stop decompression"""
+
+        self._stop.set()
+        io.RawIOBase.close(self)
+
+    def _put(self, block):
+        """Put decompressed block in queue; returns False if stream was closed"""
+
+        while not self._stop.is_set():
+            try:
+                self._blocks.put(block, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _produce(self):
+        """Decompress file and put decompressed blocks in queue"""
+
+        try:
+            with open(self.path, 'rb') as comp_file:
+                if os.fstat(comp_file.fileno()).st_size == 0:
+                    self._put(None)
+                    return
+                with mmap.mmap(comp_file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                    if data[:len(self.magic)] != self.magic:
+                        raise IOError('file "{0:s}" is not a "{1:s}" file'.format(self.path, self.codec))
+                    if self.workers > 1:
+                        self._produce_parallel(data)
+                    else:
+                        self._produce_serial(data)
+        except Exception as exc:
+            self._put(exc)
+            return
+        self._put(None)
+
+    def _produce_serial(self, data):
+        """Decompress members one by one in this thread"""
+
+        offset = 0
+        while offset < len(data) and data[offset:offset + len(self.magic)] == self.magic:
+            offset = self._stream_member(data, offset)
+            if offset is None:
+                return
+
+    def _produce_parallel(self, data):
+        """Decompress members ahead in worker threads"""
+
+        def candidates():
+            pos = data.find(self.magic, 1)
+            while pos >= 0:
+                yield pos
+                pos = data.find(self.magic, pos + 1)
+
+        cand_itr = candidates()
+        pending = OrderedDict()
+        offset = 0
+        with concurrent.futures.ThreadPoolExecutor(self.workers) as pool:
+            while offset < len(data) and data[offset:offset + len(self.magic)] == self.magic:
+                # decompress next members ahead, after a member boundary has been found
+                while offset > 0 and len(pending) < 2 * self.workers:
+                    cand = next(cand_itr, None)
+                    if cand is None:
+                        break
+                    if cand > offset:
+                        pending[cand] = pool.submit(self._decompress_member, data, cand)
+
+                # use decompressed member at current offset if available, else stream it
+                fut = pending.pop(offset, None)
+                result = None
+                if fut is not None:
+                    try:
+                        result = fut.result()
+                    except Exception:
+                        result = None
+                if result is not None:
+                    if not self._put(result[0]):
+                        return
+                    offset = result[1]
+                else:
+                    offset = self._stream_member(data, offset)
+                    if offset is None:
+                        return
+
+                # drop candidates inside the member
+                for cand in [c for c in pending if c < offset]:
+                    pending.pop(cand).cancel()
+            for fut in pending.values():
+                fut.cancel()
+
+    def _feed_member(self, data, offset):
+        """Feed compressed blocks of member to decompressor
+
+        :returns: generator of decompressed blocks; the end offset of the member is returned at the end
+        """
+
+        decomp = self.decompressor()
+        pos = offset
+        while not decomp.eof:
+            if pos >= len(data):
+                raise EOFError('compressed file "{}" ended before the end-of-stream marker'.format(self.path))
+            comp = data[pos:pos + self.block_size]
+            pos += len(comp)
+            block = decomp.decompress(comp)
+            if block:
+                yield block
+        return pos - len(decomp.unused_data)
+
+    def _stream_member(self, data, offset):
+        """Decompress member in this thread and put blocks in queue
+
+        :returns: end offset of member; None if stream was closed
+        """
+
+        feed = self._feed_member(data, offset)
+        while True:
+            try:
+                block = next(feed)
+            except StopIteration as stop:
+                return stop.value
+            if not self._put(block):
+                return None
+
+    def _decompress_member(self, data, offset):
+        """Decompress member in worker thread
+
+        :returns: decompressed member and its end offset
+        :rtype: tuple
+        """
+
+        blocks = []
+        feed = self._feed_member(data, offset)
+        while True:
+            if self._stop.is_set():
+                return None
+            try:
+                blocks.append(next(feed))
+            except StopIteration as stop:
+                return b''.join(blocks), stop.value
+
+
+def open_decompressed(path, codec=None, workers=1, buffer_size=2 ** 20):
+    """Open compressed file for reading decompressed contents
+
+    :param str path: path of compressed file
+    :param str codec: compression codec, e.g. "gz"; determined from file extension by default
+    :param int workers: number of threads to decompress members in parallel
+    :param int buffer_size: size of read buffer
+    :returns: buffered binary stream
+    :rtype: io.BufferedReader
+    """
+
+    return io.BufferedReader(DecompressedStream(path, codec=codec, workers=workers), buffer_size=buffer_size)
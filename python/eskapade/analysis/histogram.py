@@ -1,3 +1,5 @@
+import numbers
+import zlib
 import numpy as np
 import pandas as pd
 import random
@@ -27,12 +29,191 @@ def _check_num_vals(cnts_iter):
         raise TypeError('non-numeric type found ("%s")' % type(val).__name__)
 
 
+def _bin_spec_to_num(spec):
+    """Convert bin width or bin offset to a plain number
+
+    Timedelta and timestamp specifications are converted to nanoseconds,
+    which is the representation of timestamp columns used for binning.
+
+    :param spec: bin width or bin offset
+    :returns: numeric bin width or bin offset
+    """
+
+    if isinstance(spec, (np.timedelta64, pd.Timedelta)):
+        return pd.Timedelta(spec).value
+    if isinstance(spec, (np.datetime64, pd.Timestamp)):
+        return pd.Timestamp(spec).value
+    return spec
+
+
+def timestamps_to_ns(values):
+    """Convert array of timestamps to nanoseconds
+
+    Vectorized equivalent of converting each value with
+    pd.to_datetime(val).value.  Missing timestamps (NaT) are converted to
+    zero.
+
+    :param values: array or series of timestamps
+    :returns: nanoseconds since the epoch
+    :rtype: numpy.ndarray
+    """
+
+    ts = np.asarray(values, dtype='datetime64[ns]')
+    ns = ts.view(np.int64).copy()
+    ns[np.isnat(ts)] = 0
+    return ns
+
+
+def values_to_bin_index(values, bin_width=1, bin_offset=0):
+    """Convert array of values to bin indices
+
+    Vectorized equivalent of applying
+    eskapade.analysis.links.value_counter.value_to_bin_index to each value.
+    Timestamps are converted to nanoseconds first.  Integer input with
+    integer bin specifications is binned with an exact floor division.
+    Values that cannot be binned (NaN, inf) are passed on unchanged, in
+    which case a float array is returned.
+
+    :param values: array or series of numbers or timestamps
+    :param bin_width: bin width; number or timedelta
+    :param bin_offset: bin offset; number or timestamp
+    :returns: bin indices
+    :rtype: numpy.ndarray
+    """
+
+    vals = np.asarray(values)
+    if vals.dtype.kind == 'M':
+        vals = timestamps_to_ns(vals)
+    bin_width = _bin_spec_to_num(bin_width)
+    bin_offset = _bin_spec_to_num(bin_offset)
+
+    # exact binning of integers
+    if vals.dtype.kind in 'iu' and all(isinstance(s, (int, np.integer)) for s in (bin_width, bin_offset)):
+        return np.floor_divide(vals.astype(np.int64) - bin_offset, bin_width)
+
+    # binning of floats; keep values that cannot be converted to an index
+    idx = np.floor((vals - bin_offset) / bin_width)
+    finite = np.isfinite(idx)
+    if finite.all():
+        return idx.astype(np.int64)
+    idx[~finite] = vals[~finite]
+    return idx
+
+
+def values_to_bin_center(values, bin_width=1, bin_offset=0):
+    """Convert array of values to bin centers
+
+    Vectorized equivalent of applying
+    eskapade.analysis.links.value_counter.value_to_bin_center to each value.
+    Bin centers of timestamp bins are returned as timestamps.
+
+    :param values: array or series of numbers or timestamps
+    :param bin_width: bin width; number or timedelta
+    :param bin_offset: bin offset; number or timestamp
+    :returns: bin centers
+    :rtype: numpy.ndarray
+    """
+
+    idx = values_to_bin_index(values, bin_width, bin_offset)
+    width = _bin_spec_to_num(bin_width)
+    offset = _bin_spec_to_num(bin_offset)
+    is_ts = isinstance(bin_offset, (np.datetime64, pd.Timestamp))
+
+    # compute bin centers; like the scalar function, cast to the type of the bin width
+    centers = (idx + 0.5) * width
+    finite = np.isfinite(centers)
+    if isinstance(width, (int, np.integer)):
+        centers[finite] = np.trunc(centers[finite])
+        if finite.all():
+            centers = centers.astype(np.int64)
+    centers = offset + centers
+    if not finite.all():
+        centers[~finite] = idx[~finite]
+    elif is_ts:
+        centers = centers.astype(np.int64).view('datetime64[ns]')
+    return centers
+
+
+def _object_array(values):
+    """Create one-dimensional object array from sequence of values"""
+
+    values = list(values)
+    arr = np.empty(len(values), dtype=object)
+    arr[:] = values
+    return arr
+
+
+def _factorize(values):
+    """Encode values as integer codes
+
+    Values are compared as dictionary keys, so the encoding is the same as
+    when counting values in a dictionary.
+
+    :param values: array of hashable values
+    :returns: codes and unique values, in order of first occurrence
+    :rtype: tuple
+    """
+
+    index = {}
+    codes = np.fromiter((index.setdefault(v, len(index)) for v in values), dtype=np.int64, count=len(values))
+    return codes, _object_array(index)
+
+
+def _sum_by_group(group_ids, counts, n_groups):
+    """Sum counts per group
+
+    :param numpy.ndarray group_ids: group index for each count
+    :param numpy.ndarray counts: counts
+    :param int n_groups: number of groups
+    :returns: summed counts
+    :rtype: numpy.ndarray
+    """
+
+    if counts.dtype.kind in 'iub' and np.abs(counts).sum() >= 2 ** 53:
+        # sum of large integers: floats are not exact
+        sums = np.zeros(n_groups, dtype=counts.dtype)
+        np.add.at(sums, group_ids, counts)
+        return sums
+    sums = np.bincount(group_ids, weights=counts, minlength=n_groups)
+    return sums.astype(counts.dtype) if counts.dtype.kind in 'iub' else sums
+
+
+def _group_counts(columns, counts):
+    """Sum counts of equal rows of key values
+
+    :param list columns: arrays of key values, one per variable
+    :param numpy.ndarray counts: count for each row of key values
+    :returns: arrays of unique key values and summed counts
+    :rtype: tuple
+    """
+
+    if not len(counts):
+        return [col[:0] for col in columns], counts[:0]
+    codes, uniques = zip(*[_factorize(col) for col in columns])
+    sizes = [len(u) for u in uniques]
+    if len(columns) == 1:
+        group_ids, rows = codes[0], [np.arange(sizes[0])]
+    elif np.prod(sizes, dtype=float) < 2 ** 62:
+        flat_ids, group_ids = np.unique(np.ravel_multi_index(codes, sizes), return_inverse=True)
+        rows = np.unravel_index(flat_ids, sizes)
+    else:
+        unique_codes, group_ids = np.unique(np.stack(codes, axis=1), axis=0, return_inverse=True)
+        rows = unique_codes.T
+    sums = _sum_by_group(group_ids.ravel(), counts, len(rows[0]))
+    return [u[r] for u, r in zip(uniques, rows)], sums
+
+
 class ValueCounts(object):
     """A dictionary of value counts
 
     The dictionary of value counts comes out of pandas.series.value_counts()
     for one variable or pandas.Dataframe.groupby.size() performed over one
     or multiple variables.
+
+    Internally, the value counts are stored in arrays: one object array of
+    values per variable and one array of counts.  Projections, selections
+    and lookups are done on these arrays.  The dictionary is only created
+    when requested.
     """
 
     def __init__(self, key, subkey=None, counts={}, sel={}):
@@ -49,16 +230,71 @@ class ValueCounts(object):
 
         key = self._transform_key(key)
         subkey = self._transform_key(subkey) if subkey is not None else key
-        counts = dict((k if isinstance(k, tuple) else (k,), v) for k, v in counts.items())
 
         self._key = key
         self._skey = subkey if subkey is not None else key
-        self._cnts = counts
+        self._set_counts(counts)
         self._sel = dict((k, list(s) if hasattr(s, '__iter__') else [s]) for k, s in sel.items())
         self._ktos = tuple(key.index(k) for k in subkey)
         self._kind = dict((k, key.index(k)) for k in key)
         self._stok = tuple(subkey.index(k) if k in subkey else None for k in key)
+
+    @classmethod
+    def _from_arrays(cls, key, values, counts):
+        """Create ValueCounts instance from arrays of key values and counts
+
+        :param tuple key: variable names
+        :param list values: arrays of values, one per variable
+        :param numpy.ndarray counts: counts
+        :rtype: ValueCounts
+        """
+
+        vc = cls(key)
+        vc._set_arrays(values, counts)
+        return vc
+
+    def _set_counts(self, counts):
+        """Set counts from value-counts dictionary"""
+
+        if isinstance(counts, ValueCounts):
+            self._set_arrays(*counts._arrays())
+            return
+        self._cnts = dict((k if isinstance(k, tuple) else (k,), v) for k, v in counts.items())
+        self._vals = None
+        self._cnt_vals = None
+        self._no_none_cnts = SortedDict()
+        self._sorted_nonone = None
+
+    def _set_arrays(self, values, counts):
+        """Set counts from arrays of key values and counts"""
+
+        self._vals = [np.asarray(v, dtype=object) for v in values]
+        self._cnt_vals = np.asarray(counts)
+        self._cnts = None
         self._no_none_cnts = SortedDict()
+        self._sorted_nonone = None
+
+    def _arrays(self):
+        """Get arrays of key values and counts
+
+        :returns: list of value arrays, one per variable, and array of counts
+        :rtype: tuple
+        """
+
+        if self._vals is None:
+            keys = list(self._cnts.keys())
+            n_vars = len(self._key)
+            self._vals = [_object_array(k[i] for k in keys) for i in range(n_vars)]
+            self._cnt_vals = np.array(list(self._cnts.values())) if keys else np.zeros(0, dtype=np.int64)
+        return self._vals, self._cnt_vals
+
+    def _dict(self):
+        """Get value-counts dictionary"""
+
+        if self._cnts is None:
+            keys = zip(*[v.tolist() for v in self._vals]) if self._vals else ()
+            self._cnts = dict(zip(keys, self._cnt_vals.tolist()))
+        return self._cnts
 
     def __lt__(self, other):
         """Less than operator
@@ -110,6 +346,30 @@ class ValueCounts(object):
 
         return self.__lt__(other) or self.__eq__(other)
 
+    def __add__(self, other):
+        """Add operator
+
+        Counts of the same values are summed.  Used for instance to combine
+        value counts of data partitions.
+
+        :param ValueCounts other: value counts of the same variables
+        :returns: value counts with summed counts
+        :rtype: ValueCounts
+        """
+
+        if not isinstance(other, ValueCounts):
+            return NotImplemented
+        if set(self.key) != set(other.key):
+            raise RuntimeError('value counts of different variables cannot be added ({0:s} and {1:s})'
+                               .format(str(self.key), str(other.key)))
+
+        # sum counts, with values of other counts in order of own variables
+        vals, cnts = self._arrays()
+        other_vals, other_cnts = other._arrays()
+        order = tuple(other.key.index(k) for k in self.key)
+        columns = [np.concatenate([v, other_vals[i]]) for v, i in zip(vals, order)]
+        return ValueCounts._from_arrays(self.key, *_group_counts(columns, np.concatenate([cnts, other_cnts])))
+
     def _transform_key(self, key):
         """Transform input key to desired tuple format
 
@@ -151,7 +411,7 @@ class ValueCounts(object):
         """
 
         self.process_counts()
-        return self._cnts
+        return self._dict()
 
     @property
     def nononecounts(self):
@@ -163,11 +423,43 @@ class ValueCounts(object):
 
         self.process_counts()
         if len(self._no_none_cnts) == 0:
-            self._no_none_cnts = SortedDict([(var, cnt) for var, cnt in self._cnts.items() if None not in var])
-        # return dict([(var, cnt) for var, cnt in self._cnts.items() if None
-        # not in var])
+            vals, cnts = self._nonone_arrays()
+            keys = zip(*[v.tolist() for v in vals])
+            self._no_none_cnts = SortedDict(zip(keys, cnts.tolist()))
         return self._no_none_cnts
 
+    def _nonone_arrays(self):
+        """Get arrays of key values and counts without None keys"""
+
+        vals, cnts = self._arrays()
+        has_none = np.zeros(len(cnts), dtype=bool)
+        for v in vals:
+            has_none |= np.fromiter((x is None for x in v), dtype=bool, count=len(v))
+        if not has_none.any():
+            return vals, cnts
+        return [v[~has_none] for v in vals], cnts[~has_none]
+
+    def sorted_nonone_arrays(self):
+        """Sorted arrays of values and counts without None keys
+
+        Used for fast lookups of counts of one-dimensional value counts, e.g.
+        with numpy.searchsorted.
+
+        :returns: array of values, in ascending order, and array of corresponding counts
+        :rtype: tuple
+        """
+
+        self.process_counts()
+        if len(self._key) != 1:
+            raise RuntimeError('sorted value arrays only available for one-dimensional value counts')
+        if self._sorted_nonone is None:
+            labels = _object_array(k[0] for k in self.nononecounts.keys())
+            num_labels = np.array(labels.tolist())
+            if num_labels.dtype.kind in 'iuf':
+                labels = num_labels
+            self._sorted_nonone = (labels, np.array(list(self.nononecounts.values())))
+        return self._sorted_nonone
+
     @property
     def key(self):
         """Current value-counts key
@@ -197,7 +489,8 @@ class ValueCounts(object):
         :rtype: int
         """
 
-        return len(self.counts)
+        self.process_counts()
+        return len(self._cnts) if self._cnts is not None else len(self._cnt_vals)
 
     @property
     def num_nonone_bins(self):
@@ -217,7 +510,9 @@ class ValueCounts(object):
         :rtype: float
         """
 
-        return sum(self._cnts.values())
+        if self._cnts is not None:
+            return sum(self._cnts.values())
+        return self._cnt_vals.sum().item()
 
     @property
     def sum_nonone_counts(self):
@@ -242,7 +537,10 @@ class ValueCounts(object):
         """
 
         subkey = self._transform_key(subkey)
-        return ValueCounts(self.key, subkey, self.counts, sel)
+        self.process_counts()
+        vc = ValueCounts(self._key, subkey, {}, sel)
+        vc._set_arrays(*self._arrays())
+        return vc
 
     def count(self, value_bin):
         """Get bin count for specific bin-key value bin
@@ -253,7 +551,7 @@ class ValueCounts(object):
         """
 
         self.process_counts()
-        return self._cnts.get(tuple(value_bin[k] for k in self._stok), 0)
+        return self._dict().get(tuple(value_bin[k] for k in self._stok), 0)
 
     def get_values(self, val_keys=()):
         """Get all key-values of a subset of keys
@@ -268,7 +566,9 @@ class ValueCounts(object):
         self.process_counts()
         if not val_keys:
             val_keys = self._skey
-        return sorted(set(tuple(key[self._kind[k]] for k in val_keys) for key in self._cnts.keys()))
+        vals, cnts = self._arrays()
+        uniques, _ = _group_counts([vals[self._kind[k]] for k in val_keys], cnts)
+        return sorted(zip(*[u.tolist() for u in uniques]))
 
     def remove_keys_of_inconsistent_type(self, prefered_key_type=None):
         """Remove keys with inconsistent data type(s)
@@ -301,29 +601,27 @@ class ValueCounts(object):
 
         # sort all keys by their key type, and count how often these types
         # occur
-        cnts_types = Counter()
-        cnts_keys = dict((tuple(np.dtype(type(k)).type for k in key), [])
-                         for key in self._cnts)
-        for key in self._cnts:
-            ktype = tuple(np.dtype(type(k)).type for k in key)
-            cnts_types[ktype] += self._cnts[key]
-            cnts_keys[ktype].append(key)
+        vals, cnts = self._arrays()
+        if not len(cnts):
+            return
+        type_cols = []
+        for v in vals:
+            type_codes, types = _factorize(_object_array(map(type, v)))
+            type_cols.append(_object_array([np.dtype(t).type for t in types])[type_codes])
+        key_types, type_cnts = _group_counts(type_cols, cnts)
+        key_types = list(zip(*[t.tolist() for t in key_types]))
 
         # pick the prefered key type to keep
         if prefered_key_type is None:
             # select most common key type
-            prefered_key_type = cnts_types.most_common()[0][0]
+            prefered_key_type = key_types[int(np.argmax(type_cnts))]
 
         # remove all keys of different key type than preferred
-        for ktype in cnts_types:
-            if ktype == prefered_key_type:
-                continue
-            keys = cnts_keys[ktype]
-            for k in keys:
-                del self._cnts[k]
-
-        # no_none_cnts gets refilled next time when called
-        self._no_none_cnts.clear()
+        keep = np.ones(len(cnts), dtype=bool)
+        for t_col, t in zip(type_cols, prefered_key_type):
+            keep &= np.fromiter((tc is t for tc in t_col), dtype=bool, count=len(t_col))
+        if not keep.all():
+            self._set_arrays([v[keep] for v in vals], cnts[keep])
 
     def process_counts(self, accept_equiv=True):
         """Project value counts onto the existing subset of keys
@@ -343,27 +641,26 @@ class ValueCounts(object):
         if not self._sel and accept_equiv and all(k in self._skey for k in self._key):
             return False
 
-        # create new counts dictionary with subcounts
-        scnts = {}
-        for vals, cnt in self._cnts.items():
-            # apply selection
-            if self._sel and any(vals[self._kind[k]] not in s for k, s in self._sel.items()):
-                continue
+        # apply selection
+        vals, cnts = self._arrays()
+        if self._sel:
+            mask = np.ones(len(cnts), dtype=bool)
+            for k, s in self._sel.items():
+                codes, uniques = _factorize(vals[self._kind[k]])
+                mask &= np.array([u in s for u in uniques], dtype=bool)[codes]
+            vals, cnts = [v[mask] for v in vals], cnts[mask]
 
-            # add counts for subkey to sum
-            vkey = tuple(vals[i] for i in self._ktos)
-            if vkey not in scnts:
-                scnts[vkey] = 0
-            scnts[vkey] += cnt
+        # sum counts for subkey
+        sub_vals = [vals[i] for i in self._ktos]
+        if len(cnts):
+            sub_vals, cnts = _group_counts(sub_vals, cnts)
 
         # set subcounts as new counts
         self._key = self._skey
-        self._cnts = scnts
+        self._set_arrays(sub_vals, cnts)
         self._sel = {}
         self._kind = dict((k, self._key.index(k)) for k in self._key)
         self._ktos = self._stok = tuple(range(len(self._skey)))
-        # no_none_cnts refilled when called
-        self._no_none_cnts.clear()
         return True
 
 
@@ -478,6 +775,43 @@ class BinningUtil(object):
                 if be > var_value:
                     return i
 
+    def values_to_bin_labels(self, values, greater_equal=False):
+        """Return bin indices for array of values
+
+        Vectorized version of value_to_bin_label.  Values that cannot be
+        binned, e.g. NaN, get the label -1 for bin edges and NaN for a bin
+        width.
+
+        :param values: array of variable values for which to find the bin indices
+        :param bool greater_equal: for float, int, timestamp, return index of bin for which value falls in range
+                                   [lower edge, upper edge). If set to true, return index of bin for which value falls
+                                   in range [lower edge, upper edge]. Default if false.
+        :returns: array of bin indices
+        :rtype: numpy.ndarray
+        """
+
+        # check bin specifications and specified values
+        if not self.bin_specs:
+            return None
+        values = np.asarray(values)
+        if values.dtype.kind == 'O' and len(values) and isinstance(values.flat[0], pd.Timestamp):
+            values = values.astype('datetime64[ns]')
+
+        # find bin labels
+        if 'bin_width' in self.bin_specs:
+            ratio = (values - self.bin_specs.get('bin_offset', 0)) / self.bin_specs['bin_width']
+            ratio_floor = np.floor(ratio)
+            if greater_equal:
+                # correct for upper bin edge
+                ratio_floor = np.where(ratio == ratio_floor, ratio_floor - 1, ratio_floor)
+            return ratio_floor.astype(np.int64) if np.isfinite(ratio_floor).all() else ratio_floor
+        edges = np.asarray(self.bin_specs['bin_edges'])
+        labels = np.searchsorted(edges[1:], values, side='left' if greater_equal else 'right')
+        labels = np.minimum(labels, len(edges) - 2)
+        if values.dtype.kind in 'fc':
+            labels[np.isnan(values)] = -1
+        return labels
+
     def get_bin_center(self, bin_label):
         """Return bin center for a given bin index
 
@@ -641,6 +975,134 @@ class BinningUtil(object):
         return bins
 
 
+def _random_state(random_state, salt=None):
+    """Get NumPy random state from seed or random state
+
+    The global NumPy random state is returned if no seed or random state is
+    specified, such that numpy.random.seed applies.  A salt is folded into
+    integer seeds, such that the same seed gives independent streams for
+    different salts.
+    """
+
+    if random_state is None:
+        return np.random.mtrand._rand
+    if isinstance(random_state, np.random.RandomState):
+        return random_state
+    if salt is not None and isinstance(random_state, numbers.Integral):
+        return np.random.RandomState([int(random_state) % 2 ** 32, salt])
+    return np.random.RandomState(random_state)
+
+
+class HistogramSampler(LoggingMixin):
+    """Sampler of values from a histogram, used as probability distribution
+
+    The sampler is set up once and draws any number of values per call.
+    Values of categorical histograms are drawn with an alias table, which
+    takes constant time per value.  For numeric histograms, a bin is drawn
+    from the cumulative distribution of the bin values and a value is drawn
+    uniformly within the bin.
+
+    By default, values are drawn with the global NumPy random state.  A
+    checksum of the bin values and bins is folded into integer seeds, so
+    samplers of different histograms with the same seed draw independent
+    streams.
+    """
+
+    def __init__(self, bin_values, bins, numeric=True, random_state=None):
+        """Initialize sampler
+
+        :param bin_values: (unnormalized) bin values
+        :param bins: bin edges of numeric histogram or bin labels of categorical histogram
+        :param bool numeric: sample numeric values within bins if true, else bin labels
+        :param random_state: seed or NumPy random state used to draw values; global NumPy random state by default
+        """
+
+        probs = np.array(bin_values, dtype=np.float64)
+        if not len(probs) or np.any(probs < 0) or not probs.sum() > 0:
+            self.log().critical('Cannot sample from bin values %s', str(probs))
+            raise RuntimeError('invalid bin values for sampling')
+        probs /= probs.sum()
+        self.numeric = bool(numeric)
+        self.seed_salt = zlib.crc32(repr((probs.tolist(), np.asarray(bins).tolist())).encode())
+        self.random_state = _random_state(random_state, self.seed_salt)
+
+        if self.numeric:
+            # cumulative distribution of bins and bin edges; timestamps are sampled in nanoseconds
+            self.bins = np.asarray(bins)
+            self._timestamps = self.bins.dtype.kind == 'M'
+            self.numeric_bins = self.bins.astype('datetime64[ns]').view(np.int64) if self._timestamps else self.bins
+            edges = self.numeric_bins.astype(np.float64)
+            self._cdf = np.cumsum(probs)
+            self._cdf /= self._cdf[-1]
+            self._lower = edges[:-1]
+            self._widths = np.diff(edges)
+        else:
+            # alias table (Vose's method)
+            self.bins = _object_array(list(bins)) if np.asarray(bins).dtype.kind == 'O' else np.asarray(bins)
+            n_bins = len(probs)
+            scaled = probs * n_bins
+            self._accept = np.ones(n_bins)
+            self._alias = np.arange(n_bins)
+            small = np.flatnonzero(scaled < 1).tolist()
+            large = np.flatnonzero(scaled >= 1).tolist()
+            while small and large:
+                sml, lrg = small.pop(), large.pop()
+                self._accept[sml] = scaled[sml]
+                self._alias[sml] = lrg
+                scaled[lrg] += scaled[sml] - 1
+                (small if scaled[lrg] < 1 else large).append(lrg)
+
+    @property
+    def n_bins(self):
+        """Number of bins"""
+
+        return len(self._cdf) if self.numeric else len(self._accept)
+
+    def sample_bins(self, size, random_state=None):
+        """Draw bin indices
+
+        :param int size: number of indices to draw
+        :param random_state: seed or NumPy random state; the random state of the sampler by default
+        :returns: bin indices
+        :rtype: numpy.ndarray
+        """
+
+        rs = _random_state(random_state, self.seed_salt) if random_state is not None else self.random_state
+        if self.numeric:
+            return np.minimum(np.searchsorted(self._cdf, rs.random_sample(size), side='right'), self.n_bins - 1)
+        idx = rs.randint(self.n_bins, size=size)
+        return np.where(rs.random_sample(size) < self._accept[idx], idx, self._alias[idx])
+
+    def values(self, bin_indices, random_state=None):
+        """Draw values in bins
+
+        :param bin_indices: indices of bins to draw values in
+        :param random_state: seed or NumPy random state; the random state of the sampler by default
+        :returns: values drawn uniformly within numeric bins, or labels of categorical bins
+        :rtype: numpy.ndarray
+        """
+
+        if not self.numeric:
+            return self.bins[bin_indices]
+        rs = _random_state(random_state, self.seed_salt) if random_state is not None else self.random_state
+        values = self._lower[bin_indices] + rs.random_sample(len(bin_indices)) * self._widths[bin_indices]
+        if self._timestamps:
+            values = values.astype(np.int64).view('datetime64[ns]')
+        return values
+
+    def sample(self, size, random_state=None):
+        """Draw values
+
+        :param int size: number of values to draw
+        :param random_state: seed or NumPy random state; the random state of the sampler by default
+        :returns: drawn values
+        :rtype: numpy.ndarray
+        """
+
+        rs = _random_state(random_state, self.seed_salt) if random_state is not None else self.random_state
+        return self.values(self.sample_bins(size, rs), rs)
+
+
 class Histogram(BinningUtil, ArgumentsMixin, LoggingMixin):
     """Generic 1D Histogram class
 
@@ -694,6 +1156,7 @@ class Histogram(BinningUtil, ArgumentsMixin, LoggingMixin):
         # check for extraneous keyword arguments
         self.check_extra_kwargs(kwargs)
 
+        self._samplers = {}
         self.log().debug('initializing histogram for "%s"', self.variable)
 
         # set value counts
@@ -740,6 +1203,32 @@ class Histogram(BinningUtil, ArgumentsMixin, LoggingMixin):
                     self.log().critical('Values of bin edges are not increasing: %s', str(edges))
                     raise RuntimeError('invalid bin edges specified')
 
+    def __add__(self, other):
+        """Add operator
+
+        Bin counts are summed.  Histograms must describe the same variable
+        and have the same bin specifications.
+
+        :param Histogram other: histogram to add
+        :returns: histogram with summed bin counts
+        :rtype: Histogram
+        """
+
+        if not isinstance(other, Histogram):
+            return NotImplemented
+        if other.variable != self.variable:
+            self.log().critical('histograms of different variables specified: "%s" and "%s"', self.variable,
+                                other.variable)
+            raise RuntimeError('histograms of different variables cannot be added')
+        specs, other_specs = self.bin_specs or {}, other.bin_specs or {}
+        if set(specs) != set(other_specs) or not all(np.array_equal(specs[k], other_specs[k]) for k in specs):
+            self.log().critical('histograms with different bin specifications specified: %s and %s', str(specs),
+                                str(other_specs))
+            raise RuntimeError('histograms with different bin specifications cannot be added')
+
+        return Histogram(self._val_counts + other._val_counts, variable=self.variable, datatype=self.datatype,
+                         bin_specs=self.bin_specs)
+
     @property
     def variable(self):
         """Name of variable represented by the histogram
@@ -988,16 +1477,34 @@ class Histogram(BinningUtil, ArgumentsMixin, LoggingMixin):
         :rtype: int
         """
 
+        if not self.bin_specs:
+            # categorical histogram: value is bin label
+            return self.get_bin_count(var_value)
         try:
             bin_label = self.value_to_bin_label(var_value)
         except Exception as exc:
             self.log().error(
                 'bin label for variable value "%s" not found (%s)',
                 str(var_value),
-                exc.message)
+                str(exc))
             return 0
         return self.get_bin_count(bin_label)
 
+    def get_hist_vals(self, var_values):
+        """Get bin counts for bins by array of values of histogram variable
+
+        Vectorized version of get_hist_val.
+
+        :param var_values: array of values to find corresponding bins
+        :returns: array of bin counter values
+        :rtype: numpy.ndarray
+        """
+
+        if not self.bin_specs:
+            # categorical histogram: values are bin labels
+            return self.get_bin_counts(var_values)
+        return self.get_bin_counts(self.values_to_bin_labels(var_values))
+
     def get_bin_vals(self, variable_range=[], combine_values=True):
         """Get bin labels/edges and corresponding bin counts
 
@@ -1034,7 +1541,29 @@ class Histogram(BinningUtil, ArgumentsMixin, LoggingMixin):
                 bin_centers.append(bin_center)
             labs = [self.value_to_bin_label(bc) for bc in bin_centers]
 
-        return np.array([self.get_bin_count(v) for v in labs]), np.asarray(bins)
+        return self.get_bin_counts(labs), np.asarray(bins)
+
+    def get_bin_counts(self, bin_labels):
+        """Get bin counts for array of bin labels
+
+        Numeric labels are looked up with a binary search in the sorted bin
+        labels; other labels, e.g. of categorical histograms, are looked up
+        with a hash index.
+
+        :param bin_labels: bin labels to find corresponding bins
+        :returns: array of bin counts
+        :rtype: numpy.ndarray
+        """
+
+        labels = np.asarray(bin_labels)
+        sorted_labels, counts = self._val_counts.sorted_nonone_arrays()
+        if not len(sorted_labels) or not len(labels):
+            return np.zeros(len(labels), dtype=counts.dtype if len(counts) else np.int64)
+        if labels.dtype.kind in 'iuf' and sorted_labels.dtype.kind in 'iuf':
+            idx = np.minimum(np.searchsorted(sorted_labels, labels), len(sorted_labels) - 1)
+            return np.where(sorted_labels[idx] == labels, counts[idx], 0)
+        idx = pd.Index(sorted_labels, dtype=object).get_indexer(_object_array(labels.tolist()))
+        return np.where(idx >= 0, counts[idx], 0)
 
     def remove_keys_of_inconsistent_type(self, prefered_key_type=None):
         """Remove all keys that have inconsistent data type(s)
@@ -1043,43 +1572,78 @@ class Histogram(BinningUtil, ArgumentsMixin, LoggingMixin):
                                         or (int,str,float). If None provided, the most common key type found is kept.
         """
 
-        n_keys_prev = len(self._val_counts._cnts)
+        n_keys_prev = self._val_counts.num_bins
         self._val_counts.remove_keys_of_inconsistent_type(prefered_key_type)
-        n_keys_new = len(self._val_counts._cnts)
+        n_keys_new = self._val_counts.num_bins
+        if getattr(self, '_samplers', None):
+            self._samplers.clear()
 
         if n_keys_new < n_keys_prev:
             self.log().info('Removed "%d" inconsistent keys out of "%d", requiring "%s" data type.',
                             n_keys_prev - n_keys_new, n_keys_prev,
                             prefered_key_type if prefered_key_type is not None else 'most common')
 
-    def simulate(self, size, *args):
+    def sampler(self, *args, **kwargs):
+        """Get sampler of values, using self (Histogram instance) as PDF
+
+        The sampler is created once for each set of arguments and kept with
+        the histogram, so consecutive simulations use the same sampler.  A
+        new sampler draws values with the global NumPy random state, unless a
+        seed or random state is specified.
+
+        :param list variable_range: variable range used for finding the right bins to get values from.
+        :param bool combine_values: if bin_specs is not set, combine existing bin labels with variable range.
+        :param random_state: seed or NumPy random state of a new sampler
+        :returns: sampler
+        :rtype: HistogramSampler
+        """
+
+        random_state = kwargs.pop('random_state', None)
+        key = repr((args, sorted(kwargs.items())))
+        if getattr(self, '_samplers', None) is None:
+            # histogram pickled without samplers
+            self._samplers = {}
+        if key not in self._samplers:
+            hist, bins = self.get_bin_vals(*args, **kwargs)
+            self._samplers[key] = HistogramSampler(hist, bins, numeric=bool(self.bin_specs),
+                                                   random_state=random_state)
+        return self._samplers[key]
+
+    def simulate(self, size, *args, **kwargs):
         """Simulate data using self (Histogram instance) as PDF
 
+        Values of numeric histograms are drawn uniformly within the bins.  The
+        values are drawn by the sampler of the histogram, see sampler().
+
         see https://docs.scipy.org/doc/scipy/reference/generated/scipy.stats.rv_continuous.html
 
         :param int size: number of data points to generate
+        :param list variable_range: variable range used for finding the right bins to get values from.
+        :param bool combine_values: if bin_specs is not set, combine existing bin labels with variable range.
+        :param random_state: seed or NumPy random state used instead of the random state of the sampler
+        :param bool make_hist: create histogram of the generated data (default is True)
         :return numpy.array generated_data: the generated data
-        :returns: Histogram of the generated data
+        :returns: Histogram of the generated data; None if make_hist is false
         :rtype: Histogram
         """
 
-        h_norm = self.to_normalized()
-        hist, bins = h_norm.get_bin_vals(*args)
-        values = np.random.rand(size)
-
-        # check if Histogram is categorical or numeric
+        random_state = kwargs.pop('random_state', None)
+        make_hist = kwargs.pop('make_hist', True)
+        sampler = self.sampler(*args, **kwargs)
+        if random_state is not None:
+            random_state = _random_state(random_state, sampler.seed_salt)
+        bin_indices = sampler.sample_bins(size, random_state)
+        generated_data = sampler.values(bin_indices, random_state)
+        if not make_hist:
+            return generated_data, None
+
+        # histogram of generated data from bin indices
+        counts = np.bincount(bin_indices, minlength=sampler.n_bins)
         if not self.bin_specs:
-            generated_data = np.random.choice(bins, p=hist, size=size)
-            vc = pd.Series(generated_data).value_counts() / float(len(generated_data))
-            h_sim = Histogram((vc.values, vc.index.values), variable='x')
+            nonzero = np.flatnonzero(counts)
+            h_sim = Histogram((counts[nonzero] / float(size), sampler.bins[nonzero]), variable=self.variable)
         else:
-            # see
-            # http://stackoverflow.com/questions/17821458/random-number-from-histogram
-            bin_midpoints = bins[:-1] + np.diff(bins) / 2
-            cdf = np.cumsum(hist)
-            generated_data = np.searchsorted(cdf, values)
-            random_from_cdf = bin_midpoints[generated_data]
-            h_sim = Histogram(np.histogram(random_from_cdf, bins=bins), variable=self.variable)
+            h_sim = Histogram((counts, sampler.numeric_bins), variable=self.variable)
         return generated_data, h_sim
 
     def surface(self):
@@ -15,6 +15,11 @@
 # **********************************************************************************
 
 import collections
+import concurrent.futures
+import multiprocessing
+
+import numpy as np
+import pandas as pd
 
 from eskapade import ProcessManager, StatusCode, DataStore, Link
 
@@ -25,6 +30,13 @@ class ApplyFuncToDf(Link):
     Applies one or more functions to a (grouped) dataframe column or an
     entire dataframe.  In the latter case, this can be done row wise or
     column wise.  The input dataframe will be overwritten.
+
+    Functions that accept entire columns are applied at once if declared
+    "vectorized".  Other functions can be applied in parallel by a pool of
+    forked processes: the rows, or the groups in case of a groupby, are
+    split into one partition per process and the results are combined in
+    order.  The processes read the dataframe from the memory of the parent
+    process, so only the results are copied.
     """
 
     def __init__(self, **kwargs):
@@ -41,13 +53,16 @@ class ApplyFuncToDf(Link):
           - 'kwargs' (dict, optional): kwargs for 'func'
           - 'groupby' (list, optional): column names to group by
           - 'groupbyColout' (string) output column after the split-apply-combine combination
+          - 'vectorized' (boolean, optional): 'func' accepts the entire input column(s), instead of single values
         :param dict add_columns: columns to add to output (name, column)
+        :param int n_workers: number of processes to apply functions in parallel; row-wise, element-wise and groupby
+          applies are parallelized. Default is 1 (no parallelization).
         """
 
         Link.__init__(self, kwargs.pop('name', 'apply_func_to_dataframe'))
 
         # process keyword arguments
-        self._process_kwargs(kwargs, read_key='', store_key='', apply_funcs=[], add_columns=None)
+        self._process_kwargs(kwargs, read_key='', store_key='', apply_funcs=[], add_columns=None, n_workers=1)
         self.check_extra_kwargs(kwargs)
 
     def initialize(self):
@@ -56,9 +71,21 @@ class ApplyFuncToDf(Link):
         self.check_arg_vals('read_key')
         if not self.apply_funcs:
             self.log().warning('No functions to apply')
+        assert isinstance(self.n_workers, int) and self.n_workers > 0, 'n_workers needs to be a positive integer.'
 
         return StatusCode.Success
 
+    def data_keys(self):
+        """Get keys of data-store objects that are read and stored by ApplyFuncToDf
+
+        Columns are added to the input data frame in place, so its key is
+        stored as well.
+        """
+
+        store_keys = {self.read_key if self.store_key is None else self.store_key, self.read_key}
+        store_keys |= set(arr['storekey'] for arr in self.apply_funcs if 'storekey' in arr)
+        return {self.read_key}, store_keys
+
     def execute(self):
         """Execute link"""
 
@@ -91,9 +118,9 @@ class ApplyFuncToDf(Link):
                 elif 'colin' in keys:
                     colin = arr['colin']
                     assert colin in df.columns
-                    result = df[colin].apply(func, args=args, **kwargs)
+                    result = self.apply(df[colin], func, arr.get('vectorized', False), *args, **kwargs)
                 else:
-                    result = df.apply(func, args=args, **kwargs)
+                    result = self.apply(df, func, arr.get('vectorized', False), *args, **kwargs)
                 ds[arr['storekey']] = result
             else:
                 assert 'colout' in keys, 'function input is insufficient'
@@ -107,9 +134,9 @@ class ApplyFuncToDf(Link):
                             assert c in df.columns
                     else:
                         assert colin in df.columns
-                    df[colout] = df[colin].apply(func, args=args, **kwargs)
+                    df[colout] = self.apply(df[colin], func, arr.get('vectorized', False), *args, **kwargs)
                 else:
-                    df[colout] = df.apply(func, args=args, **kwargs)
+                    df[colout] = self.apply(df, func, arr.get('vectorized', False), *args, **kwargs)
 
         # add columns
         if self.add_columns is not None:
@@ -145,16 +172,93 @@ class ApplyFuncToDf(Link):
             self.apply_funcs.append({'colin': inColumn, 'func': func, 'colout': outColumn, 'args': args,
                                      'kwargs': kwargs})
 
+    def apply(self, data, func, vectorized=False, *args, **kwargs):
+        """Apply function to series or dataframe
+
+        :param data: input series or dataframe
+        :param func: function to apply
+        :param bool vectorized: if True, call function with entire input; else use pandas apply
+        """
+
+        if vectorized:
+            return func(data, *args, **kwargs)
+
+        # split rows over processes if function is applied element- or row-wise
+        row_wise = isinstance(data, pd.Series) or kwargs.get('axis') in (1, 'columns')
+        if self.n_workers > 1 and row_wise and len(data) > 1:
+            bounds = np.linspace(0, len(data), min(self.n_workers, len(data)) + 1).astype(int)
+            parts = [slice(start, stop) for start, stop in zip(bounds[:-1], bounds[1:])]
+            results = run_partitions(data, parts, lambda part: part.apply(func, args=args, **kwargs), self.n_workers)
+            return pd.concat(results)
+
+        return data.apply(func, args=args, **kwargs)
+
     def groupbyapply(self, df, groupbyColumns, applyfunc, *args, **kwargs):
         """Apply groupby to dataframe"""
 
-        if 'groupbyColout' not in list(kwargs.keys()):
-            return df.groupby(groupbyColumns).apply(applyfunc, *args, **kwargs).reset_index(drop=True)
+        colout = kwargs.pop('groupbyColout', None)
+        t = self._groupbyapply(df, groupbyColumns, applyfunc, *args, **kwargs)
+        if colout is None:
+            return t.reset_index(drop=True)
         else:
-            colout = kwargs['groupbyColout']
-            kwargs.pop('groupbyColout')
-            t = df.groupby(groupbyColumns).apply(applyfunc, *args, **kwargs)
             for i in range(0, len(groupbyColumns)):
                 t.index = t.index.droplevel()
             df[colout] = t
             return df
+
+    def _groupbyapply(self, df, groupbyColumns, applyfunc, *args, **kwargs):
+        """Apply function to groups, in parallel if multiple workers are set"""
+
+        if self.n_workers == 1:
+            return df.groupby(groupbyColumns).apply(applyfunc, *args, **kwargs)
+
+        # split groups, in sorted order, over processes
+        group_nums = df.groupby(groupbyColumns).ngroup().values
+        n_groups = group_nums.max() + 1 if len(group_nums) else 0
+        n_parts = min(self.n_workers, n_groups)
+        if n_parts < 2:
+            return df.groupby(groupbyColumns).apply(applyfunc, *args, **kwargs)
+        part_nums = np.where(group_nums >= 0, group_nums * n_parts // n_groups, -1)
+        parts = [np.flatnonzero(part_nums == i) for i in range(n_parts)]
+        results = run_partitions(df, parts, lambda part: part.groupby(groupbyColumns).apply(applyfunc, *args, **kwargs),
+                                 self.n_workers)
+        if all(isinstance(res, (pd.DataFrame, pd.Series)) and res.index.equals(df.index[part])
+               for res, part in zip(results, parts)):
+            # like-indexed (transform-like) results: restore original order of rows, as in serial mode
+            return pd.concat(results).iloc[np.argsort(np.concatenate(parts), kind='stable')]
+        return pd.concat(results)
+
+
+# data and operation of parallel apply, inherited by forked processes
+_PARTITION_TASK = None
+
+
+def run_partitions(data, parts, operation, n_workers):
+    """Apply operation to partitions of data in forked processes
+
+    The data and operation are inherited by the processes, so only the
+    partition selections and the results are passed between processes.
+
+    :param data: series or dataframe
+    :param list parts: row selections of partitions, passed to data.iloc
+    :param operation: callable that returns the result for a partition
+    :param int n_workers: number of processes
+    :returns: results of partitions, in order
+    :rtype: list
+    """
+
+    global _PARTITION_TASK
+    _PARTITION_TASK = (data, parts, operation)
+    try:
+        ctx = multiprocessing.get_context('fork')
+        with concurrent.futures.ProcessPoolExecutor(min(n_workers, len(parts)), mp_context=ctx) as pool:
+            return list(pool.map(_run_partition, range(len(parts))))
+    finally:
+        _PARTITION_TASK = None
+
+
+def _run_partition(index):
+    """Apply operation to partition in forked process"""
+
+    data, parts, operation = _PARTITION_TASK
+    return operation(data.iloc[parts[index]])
@@ -14,6 +14,7 @@
 # **********************************************************************************
 
 import copy
+import numpy as np
 import pandas as pd
 from eskapade import ProcessManager, StatusCode, DataStore, Link
 
@@ -29,13 +30,24 @@ class ApplySelectionToDf(Link):
 
         Input dataframe is not overwritten, unless instructed to do so in kwargs.
 
+        By default, each query is evaluated on the rows that pass the
+        previous queries.  Set combineQueries to true to combine the queries
+        into one expression, which is evaluated at once on the input
+        dataframe, using numexpr if available.  Queries should then be
+        element-wise: a query like "x > x.mean()" is evaluated on all input
+        rows, not on the rows that pass the previous queries.
+
         :param str name: name of link
         :param str readKey: key of data to read from data store
         :param str storeKey: key of data to store in data store. If not set readKey is overwritten.
         :param list querySet: list of strings, query expressions to evaluate in the same order, see pandas documentation
         :param list selectColumns: column names to select after querying
         :param bool continueIfFailure: if True continues with next query after failure (optional)
-        :param kwargs: all other key word arguments are passed on to the pandas queries.
+        :param bool storeIndex: if True, store the index of the selected rows instead of a copy of the dataframe
+               (optional)
+        :param bool combineQueries: if True, evaluate all queries at once on the input dataframe; if False (default),
+               evaluate the queries one by one on the rows selected by the previous queries (optional)
+        :param kwargs: all other key word arguments are passed on to the pandas eval function.
         """
 
         Link.__init__(self, kwargs.pop('name', 'ApplySelectionToDf'))
@@ -47,9 +59,11 @@ class ApplySelectionToDf(Link):
                              storeKey=None,
                              querySet=[],
                              selectColumns=[],
-                             continueIfFailure=False)
+                             continueIfFailure=False,
+                             storeIndex=False,
+                             combineQueries=False)
         
-        # pass on remaining kwargs to pandas query
+        # pass on remaining kwargs to pandas eval
         self.kwargs = copy.deepcopy(kwargs)
 
         return
@@ -82,58 +96,42 @@ class ApplySelectionToDf(Link):
 
         assert len(self.querySet) or len(self.selectColumns), 'No selections have been provided.'
 
-        self.log().info('kwargs passed on to pandas query function are: %s' % self.kwargs )
+        self.log().info('kwargs passed on to pandas eval function are: %s' % self.kwargs )
         
         return StatusCode.Success
 
 
+    def data_keys(self):
+        """Get keys of data-store objects that are read and stored by ApplySelectionToDf"""
+
+        store_key = self.storeKey if self.storeKey is not None else self.readKey
+        return {self.readKey}, {store_key, 'n_' + store_key}
+
     def execute(self):
         """ Execute ApplySelectionToDf
 
         Applies queries or column selection to a pandas DataFrame.
         Input dataframe is not overwritten, unless told to do so in kwargs.
 
-        1. Apply queries, in order of provided query list.
-        2. Select columns (if provided). 
+        1. Evaluate queries into one boolean mask of selected rows (at once or one by one).
+        2. Select columns (if provided) and rows in one go.
         """
 
         ds = ProcessManager().service(DataStore)
         assert self.readKey in list(ds.keys()), 'Key %s not in DataStore.' % self.readKey
         assert isinstance(ds[self.readKey],pd.DataFrame), 'Object with key %s is not a pandas DataFrame.' % self.readKey
+        df = ds[self.readKey]
 
-        # 1. apply queries to input dataframe.
-        #    input dataframe is not overwritten, unless told to do so in kwargs.
-        do_continue = True
+        # 1. evaluate queries on input dataframe.
+        #    on failure with continueIfFailure, no rows are selected.
+        rows = None
         if len(self.querySet):
-            # apply first query
-            query = self.querySet[0]
-            try:
-                df = ds[self.readKey].query(query, **self.kwargs)
-            except:
-                if not self.continueIfFailure:
-                    raise ValueError('Failed to apply query <%s> to dataframe <%s>.' % (query, self.readKey))
-                else:
-                    orig_df_cols = (ds[self.readKey]).columns
-                    df = pd.DataFrame(columns=orig_df_cols)
-                    do_continue = False
-            # apply rest of the queries if any
-            if do_continue:
-                for query in self.querySet[1:]:
-                    try:
-                        df = df.query(query, **self.kwargs)
-                    except:
-                        if not self.continueIfFailure:
-                            raise ValueError('Failed to apply query <%s> to dataframe <%s>.' % (query, self.readKey))
-                        else:
-                            orig_df_cols = (ds[self.readKey]).columns
-                            df = pd.DataFrame(columns=orig_df_cols)
-                            break
-
-        # 2. apply column selection to input dataframe.
+            mask = self._query_mask(df) if self.combineQueries else self._sequential_query_mask(df)
+            rows = np.flatnonzero(mask) if mask is not None else np.array([], dtype=int)
+
+        # 2. apply column and row selection to input dataframe.
         #    input dataframe is not overwritten.
         if len(self.selectColumns):
-            if not 'df' in vars():
-                df = (ds[self.readKey]).copy(deep=False)
             try:
                 df = df[self.selectColumns]
             except:
@@ -142,12 +140,69 @@ class ApplySelectionToDf(Link):
                                                                                            self.readKey))
                 else:
                     df = pd.DataFrame(columns=self.selectColumns)
-
-        assert 'df' in vars(), 'No dataframe available for storage?'
+                    rows = None
+        if self.storeIndex:
+            df = df.index if rows is None else df.index[rows]
+        elif rows is not None:
+            df = df.take(rows)
 
         ds[self.storeKey] = df
-        ds['n_'+self.storeKey] = len(df.index)
+        ds['n_'+self.storeKey] = len(df)
 
-        self.log().info('Stored dataframe with key <%s> and length <%d>.' % (self.storeKey, len(df.index)))
+        self.log().info('Stored %s with key <%s> and length <%d>.' % ('index' if self.storeIndex else 'dataframe',
+                                                                       self.storeKey, len(df)))
 
         return StatusCode.Success
+
+    def _query_mask(self, df):
+        """ Evaluate queries into boolean mask of selected rows
+
+        Returns None if a query fails and continueIfFailure is set.
+        """
+
+        expr = ' & '.join('(%s)' % query for query in self.querySet)
+        try:
+            return self._eval_mask(df, expr)
+        except Exception:
+            pass
+
+        # find failing query
+        for query in self.querySet:
+            try:
+                self._eval_mask(df, query)
+            except Exception:
+                if not self.continueIfFailure:
+                    raise ValueError('Failed to apply query <%s> to dataframe <%s>.' % (query, self.readKey))
+                return None
+        raise ValueError('Failed to apply queries <%s> to dataframe <%s>.' % (str(self.querySet), self.readKey))
+
+    def _sequential_query_mask(self, df):
+        """ Evaluate queries one by one on the rows selected by the previous queries
+
+        Returns None if a query fails and continueIfFailure is set.
+        """
+
+        mask = np.ones(len(df), dtype=bool)
+        for query in self.querySet:
+            rows = np.flatnonzero(mask)
+            try:
+                mask[rows] = self._eval_mask(df.take(rows), query)
+            except Exception:
+                if not self.continueIfFailure:
+                    raise ValueError('Failed to apply query <%s> to dataframe <%s>.' % (query, self.readKey))
+                return None
+        return mask
+
+    def _eval_mask(self, df, expr):
+        """ Evaluate expression into boolean mask
+
+        Missing values of nullable boolean results do not select rows.
+        """
+
+        mask = df.eval(expr, **self.kwargs)
+        if isinstance(mask, pd.Series) and pd.api.types.is_bool_dtype(mask.dtype):
+            mask = mask.to_numpy(dtype=bool, na_value=False)
+        mask = np.asarray(mask)
+        if mask.dtype != bool or mask.shape != (len(df),):
+            raise ValueError('expression <%s> does not evaluate to a boolean for each row' % expr)
+        return mask
@@ -58,6 +58,11 @@ class DfConcatenator(Link):
 
         return StatusCode.Success
 
+    def data_keys(self):
+        """Get keys of data-store objects that are read and stored by DfConcatenator"""
+
+        return set(self.readKeys), {self.storeKey, 'n_' + self.storeKey} if self.storeKey else set()
+
     def execute(self):
         """ Execute DfConcatenator
 
@@ -83,6 +83,12 @@ class DfMerger(Link):
                 
         return StatusCode.Success
 
+    def data_keys(self):
+        """Get keys of data-store objects that are read and stored by DfMerger"""
+
+        return {self.input_collection1, self.input_collection2}, {self.output_collection,
+                                                                  'n_' + self.output_collection}
+
     def execute(self):
         """ Perform merging of input dataframes.
         """
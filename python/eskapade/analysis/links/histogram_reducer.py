@@ -0,0 +1,124 @@
+# **********************************************************************************
+# * Project: Eskapade - A python-based package for data analysis                   *
+# * Class  : HistogramReducer                                                      *
+# * Created: 2017/06/12                                                            *
+# * Description:                                                                   *
+# *      Algorithm to merge partial states of ValueCounter or                      *
+# *      HistogrammarFiller links, e.g. filled on different parts of a data        *
+# *      set, into final histograms                                                *
+# *                                                                                *
+# * Authors:                                                                       *
+# *      KPMG Big Data team, Amstelveen, The Netherlands                           *
+# *                                                                                *
+# * Redistribution and use in source and binary forms, with or without             *
+# * modification, are permitted according to the terms listed in the file          *
+# * LICENSE.                                                                       *
+# **********************************************************************************
+
+from eskapade import ProcessManager, Link, StatusCode, DataStore
+from eskapade.analysis.links.value_counter import ValueCounter, merge_partial_settings, merge_partial_counts, \
+    make_value_counts, make_histograms
+from eskapade.analysis.links.histogrammar_filler import HistogrammarFiller, merge_partial_hists
+
+# links that produce partial states
+PARTIAL_STATE_LINKS = dict(ValueCounter=ValueCounter, HistogrammarFiller=HistogrammarFiller)
+
+
+class HistogramReducer(Link):
+    """Merge partial histogram states into final histograms
+
+    ValueCounter and HistogrammarFiller links store the partial state of
+    their histograms if store_key_partial is set.  HistogramReducer merges
+    partial states, for instance filled on different parts of a data set or
+    in different runs, and stores the resulting histograms in the same way
+    as the original link.
+    """
+
+    def __init__(self, **kwargs):
+        """Initialize HistogramReducer instance
+
+        :param str name: name of link
+        :param list read_keys: keys of partial states in data store; each key refers to a partial state or a list of
+               partial states
+        :param str store_key_hists: key of output data to store histograms in data store
+        :param str store_key_counts: key of output data to store ValueCounts objects in data store (only for partial
+               states of ValueCounter)
+        :param bool drop_inconsistent_key_types: remove keys with inconsistent data types from ValueCounter
+               histograms. Default is True.
+        """
+
+        # initialize Link, pass name from kwargs
+        Link.__init__(self, kwargs.pop('name', 'HistogramReducer'))
+
+        # process and register all relevant kwargs. kwargs are added as attributes of the link.
+        # second arg is default value for an attribute. key is popped from kwargs.
+        self._process_kwargs(kwargs,
+                             read_keys=[],
+                             store_key_hists=None,
+                             store_key_counts=None,
+                             drop_inconsistent_key_types=True)
+
+        # check residual kwargs. exit if any present.
+        self.check_extra_kwargs(kwargs)
+
+    def initialize(self):
+        """Initialize HistogramReducer"""
+
+        if isinstance(self.read_keys, str):
+            self.read_keys = [self.read_keys]
+        assert isinstance(self.read_keys, list) and len(self.read_keys), 'read_keys have not been set correctly.'
+        assert self.store_key_hists is not None or self.store_key_counts is not None, 'no store key has been set.'
+
+        return StatusCode.Success
+
+    def data_keys(self):
+        """Get keys of data-store objects that are read and stored by HistogramReducer"""
+
+        return self.attr_data_keys()
+
+    def execute(self):
+        """Execute HistogramReducer
+
+        Merge all partial states and store the resulting histograms, as the
+        ValueCounter or HistogrammarFiller link would.
+        """
+
+        ds = ProcessManager().service(DataStore)
+
+        # collect partial states
+        states = []
+        for key in self.read_keys:
+            if key not in ds:
+                raise KeyError('key "%s" not in data store' % key)
+            states += ds[key] if isinstance(ds[key], list) else [ds[key]]
+        link_types = set(st.get('link') if isinstance(st, dict) else None for st in states)
+        if len(link_types) != 1 or not link_types <= set(PARTIAL_STATE_LINKS):
+            self.log().critical('Expected partial states of one of the link types %s; got %s',
+                                ', '.join(PARTIAL_STATE_LINKS), ', '.join(str(t) for t in link_types))
+            raise RuntimeError('invalid partial states specified')
+        link_type = link_types.pop()
+
+        # merge column settings and histograms
+        columns, datatype, bin_specs = [], {}, {}
+        counts, hists = {}, {}
+        for state in states:
+            merge_partial_settings(columns, datatype, bin_specs, state, link_type)
+            if link_type == 'ValueCounter':
+                merge_partial_counts(counts, state)
+            else:
+                merge_partial_hists(hists, state)
+        self.log().debug('Merged %d partial states of %s links', len(states), link_type)
+
+        # store merged histograms
+        if link_type == 'ValueCounter':
+            value_counts = make_value_counts(columns, counts, datatype, self.drop_inconsistent_key_types)
+            if self.store_key_counts is not None:
+                ds[self.store_key_counts] = value_counts
+            if self.store_key_hists is not None:
+                ds[self.store_key_hists] = make_histograms(columns, value_counts, datatype, bin_specs)
+        else:
+            if self.store_key_hists is None:
+                raise AssertionError('store_key_hists has not been set.')
+            ds[self.store_key_hists] = hists
+
+        return StatusCode.Success
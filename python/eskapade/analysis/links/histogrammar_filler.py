@@ -22,6 +22,9 @@ import numpy as np
 import pandas as pd
 import histogrammar as hg
 
+from eskapade.analysis.histogram import timestamps_to_ns
+from eskapade.analysis.links.value_counter import freeze_bin_specs, merge_partial_settings
+
 # numeric datatypes get converted to an index, which is then used for value counting
 NUMERIC_SUBSTR = [np.dtype('int'), np.dtype('float'), np.dtype('double')]
 
@@ -32,6 +35,10 @@ STRING_SUBSTR = [np.dtype('str'), np.dtype('object'), np.dtype('bool')]
 TIME_SUBSTR = [np.dtype('datetime64[ns]'), np.datetime64]
 NUM_NS_DAY = 24 * 3600 * int(1e9)
 
+# default bin specifications of numeric and timestamp columns
+UNIT_BIN_SPECS = {'bin_width': 1.0, 'bin_offset': 0.0}
+UNIT_TIMESTAMP_SPECS = {'bin_width': pd.Timedelta(days=30).value, 'bin_offset': pd.Timestamp('2010-01-04').value}
+
 
 class HistogrammarFiller(Link):
     """Fill histogrammar sparse-bin histograms
@@ -73,6 +80,9 @@ class HistogrammarFiller(Link):
         >>> drop_keys = {'x': [1,4,8,19],
                          'y': ['apple', 'pear', 'tomato']
                          'x:y': [(1,'apple'),(19,'tomato')]}
+
+        :param str store_key_partial: key of output data to store partial state of histograms in data store.
+               Partial states of different data sets can be merged, e.g. with the HistogramReducer link.
         """
 
         # initialize Link, pass name from kwargs
@@ -87,14 +97,14 @@ class HistogrammarFiller(Link):
                              bin_specs={},
                              datatype={},
                              quantity={},
-                             drop_keys={})
+                             drop_keys={},
+                             store_key_partial=None)
 
         # check residual kwargs. exit if any present.
         self.check_extra_kwargs(kwargs)
 
-        self._unit_bin_specs = {'bin_width': 1.0, 'bin_offset': 0.0}
-        self._unit_timestamp_specs = {'bin_width': pd.Timedelta(days=30).value,
-                                      'bin_offset': pd.Timestamp('2010-01-04').value}
+        self._unit_bin_specs = dict(UNIT_BIN_SPECS)
+        self._unit_timestamp_specs = dict(UNIT_TIMESTAMP_SPECS)
         # these get filled during execution
         self._hists = {}
 
@@ -125,6 +135,11 @@ class HistogrammarFiller(Link):
 
         return StatusCode.Success
 
+    def data_keys(self):
+        """Get keys of data-store objects that are read and stored by HistogrammarFiller"""
+
+        return self.attr_data_keys()
+
     def execute(self):
         """Execute HistogrammarFiller
 
@@ -172,12 +187,7 @@ class HistogrammarFiller(Link):
         idf = df[strcols + numcols].copy(deep=False)
         for col in dtcols:
             self.log().debug('Converting column "%s" of type "%s" to nanosec', col, self.datatype[col])
-
-            def to_ns(x):
-                if pd.isnull(x):
-                    return 0
-                return pd.to_datetime(x).value
-            idf[col] = df[col].apply(to_ns)
+            idf[col] = timestamps_to_ns(df[col])
 
         # 3. do the actual histogram filling
         for c in self.columns:
@@ -197,67 +207,62 @@ class HistogrammarFiller(Link):
         del idf
 
         # 4. storage
-        ds[self.store_key] = self._hists
+        self.make_and_store()
 
         return StatusCode.Success
 
+    def make_and_store(self):
+        """Store histograms and, if requested, their partial state"""
+
+        ds = ProcessManager().service(DataStore)
+        ds[self.store_key] = self._hists
+        if self.store_key_partial is not None:
+            ds[self.store_key_partial] = self.partial_state()
+
+    def partial_state(self):
+        """Get partial state of histograms
+
+        The partial state contains copies of the histograms filled so far,
+        and the column settings required to merge them with the histograms
+        of other data sets.  The copies are histogrammar objects restored
+        from their JSON representation, so they have no filling functions
+        and no data-type attributes.  Bin specifications may contain NumPy
+        or pandas objects, e.g. timestamps.
+
+        :returns: partial state
+        :rtype: dict
+        """
+
+        return dict(link='HistogrammarFiller', columns=tuple(tuple(c) for c in self.columns),
+                    hists=dict((name, hg.Factory.fromJson(h.toJson())) for name, h in self._hists.items()),
+                    datatype=dict(self.datatype), bin_specs=freeze_bin_specs(self.bin_specs))
+
+    def merge_partial_state(self, state):
+        """Merge partial state of histograms from other data set
+
+        :param dict state: partial state, as returned by partial_state
+        :raises: RuntimeError if partial state is incompatible
+        """
+
+        merge_partial_settings(self.columns, self.datatype, self.bin_specs, state, 'HistogrammarFiller')
+
+        # start from empty histograms with filling functions, to fill them further
+        for c in self.columns:
+            name = ':'.join(c)
+            if name in state['hists'] and name not in self._hists:
+                self._hists[name] = self._construct_empty_hist(c)
+        merge_partial_hists(self._hists, state)
+
     def _construct_empty_hist(self, columns):
         """Create an (empty) histogram of right type
 
-        Create a multi-dim histogram by iterating through the columns in
-        reverse order and passing a single-dim hist as input to the next
-        column.
-
         :param columns: histogram columns
         :returns: created histogram
         :rtype: histogrammar.Count
         """
 
-        hist = hg.Count()
-
-        # create a multi-dim histogram by iterating through the columns in reverse order
-        # and passing a single-dim hist as input to the next column
-        for col in reversed(columns):
-            # histogram type depends on the data type
-            dt = np.dtype(self.datatype[col])
-
-            # processing function, e.g. only accept boolians during filling
-            f = self.quantity[col] if col in self.quantity else QUANTITY[dt.type]
-            if len(columns) == 1:
-                # df[col] is a pd.series
-                q = lambda x, fnc=f: fnc(x)
-            else:
-                # df[columns] is a pd.Dataframe
-                # fix column to col
-                q = lambda x, fnc=f, clm=col: fnc(x[clm])
-
-            is_number = isinstance(dt.type(), np.number)
-            is_timestamp = isinstance(dt.type(), np.datetime64)
-
-            if is_number or is_timestamp:
-                # numbers and timestamps are put in a sparse binned histogram
-                bs = self.bin_specs.get(col, self._unit_bin_specs if is_number
-                                        else self._unit_timestamp_specs)
-                hist = hg.SparselyBin(binWidth=bs['bin_width'], origin=bs['bin_offset'], quantity=q, value=hist)
-            else:
-                # string and boolians are treated as categories
-                hist = hg.Categorize(quantity=q, value=hist)
-
-        # FIXME stick data types and number of dimension to histogram
-        dta = [self.datatype[col] for col in columns]
-        hist.datatype = dta[0] if len(columns) == 1 else dta
-        hist.n_dim = len(columns)
-        @property
-        def n_bins(self):
-            if hasattr(self, num):
-                return self.num
-            elif hasattr(size, size):
-                return self.size
-            else:
-                raise Exception('Cannot retrieve number of bins from hgr hist.')
-        hist.n_bins = n_bins
-
-        return hist
+        return construct_empty_hist(columns, self.datatype, self.bin_specs, self.quantity, self._unit_bin_specs,
+                                    self._unit_timestamp_specs)
 
     def drop_requested_keys(self, name, hist):
         """Drop requested keys from histogram
@@ -279,6 +284,104 @@ class HistogrammarFiller(Link):
         return hist
 
 
+def construct_empty_hist(columns, datatype, bin_specs, quantity=None, unit_bin_specs=UNIT_BIN_SPECS,
+                     unit_timestamp_specs=UNIT_TIMESTAMP_SPECS):
+    """Create an (empty) histogram of right type
+
+    Create a multi-dim histogram by iterating through the columns in
+    reverse order and passing a single-dim hist as input to the next
+    column.
+
+    :param columns: histogram columns
+    :param dict datatype: data types of columns
+    :param dict bin_specs: bin specifications of numeric and timestamp columns
+    :param dict quantity: filling functions of columns; default functions depend on the data type
+    :param dict unit_bin_specs: bin specifications of numeric columns without bin_specs
+    :param dict unit_timestamp_specs: bin specifications of timestamp columns without bin_specs
+    :returns: created histogram
+    :rtype: histogrammar.Count
+    """
+
+    quantity = quantity or {}
+    hist = hg.Count()
+
+    # create a multi-dim histogram by iterating through the columns in reverse order
+    # and passing a single-dim hist as input to the next column
+    for col in reversed(columns):
+        # histogram type depends on the data type
+        dt = np.dtype(datatype[col])
+
+        # processing function, e.g. only accept boolians during filling
+        f = quantity[col] if col in quantity else QUANTITY[dt.type]
+        if len(columns) == 1:
+            # df[col] is a pd.series
+            q = lambda x, fnc=f: fnc(x)
+        else:
+            # df[columns] is a pd.Dataframe
+            # fix column to col
+            q = lambda x, fnc=f, clm=col: fnc(x[clm])
+
+        is_number = isinstance(dt.type(), np.number)
+        is_timestamp = isinstance(dt.type(), np.datetime64)
+
+        if is_number or is_timestamp:
+            # numbers and timestamps are put in a sparse binned histogram
+            bs = bin_specs.get(col, unit_bin_specs if is_number else unit_timestamp_specs)
+            hist = hg.SparselyBin(binWidth=bs['bin_width'], origin=bs['bin_offset'], quantity=q, value=hist)
+        else:
+            # string and boolians are treated as categories
+            hist = hg.Categorize(quantity=q, value=hist)
+
+    # FIXME stick data types and number of dimension to histogram
+    set_hist_attributes(hist, columns, datatype)
+
+    return hist
+
+
+def set_hist_attributes(hist, columns, datatype):
+    """Stick data types and number of dimensions to histogram
+
+    :param hist: histogrammar histogram
+    :param list columns: histogram columns
+    :param dict datatype: data types of columns
+    """
+
+    dta = [datatype[col] for col in columns]
+    hist.datatype = dta[0] if len(columns) == 1 else dta
+    hist.n_dim = len(columns)
+    @property
+    def n_bins(self):
+        if hasattr(self, num):
+            return self.num
+        elif hasattr(size, size):
+            return self.size
+        else:
+            raise Exception('Cannot retrieve number of bins from hgr hist.')
+    hist.n_bins = n_bins
+
+
+def merge_partial_hists(hists, state):
+    """Merge histograms of partial state
+
+    Histograms that are not present yet are merged into empty histograms
+    with the default filling functions.
+
+    :param dict hists: histograms per column name to merge into
+    :param dict state: partial state of HistogrammarFiller
+    """
+
+    for c in state['columns']:
+        name = ':'.join(c)
+        if name not in state['hists']:
+            continue
+        if name not in hists:
+            bin_specs = dict((col, dict(specs)) for col, specs in state['bin_specs'])
+            hists[name] = construct_empty_hist(list(c), state['datatype'], bin_specs)
+        merged = hists[name] + state['hists'][name]
+        set_hist_attributes(merged, list(c), state['datatype'])
+        hists[name] = merged
+
+
 def to_str(val):
     """Convert input to (array of) string(s)
 
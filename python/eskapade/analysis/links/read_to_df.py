@@ -14,9 +14,12 @@
 # **********************************************************************************
 
 
+import collections.abc
 import copy
 import glob
 import os
+import queue
+import threading
 import pandas as pd
 import numpy as np
 
@@ -24,6 +27,8 @@ import logging
 log = logging.getLogger(__name__)
 
 from eskapade import ProcessManager, Link, StatusCode, DataStore, ConfigObject
+from eskapade.analysis.columnar import read_parquet, read_feather
+from eskapade.analysis.decompression import compression_codec, open_decompressed
 
 pd_readers = {'csv':    pd.read_csv,
               'tsv':    pd.read_csv,
@@ -36,7 +41,9 @@ pd_readers = {'csv':    pd.read_csv,
               'html':   pd.read_html,
               'dta':    pd.read_stata,
               'pkl':    pd.read_pickle,
-              'pickle': pd.read_pickle}
+              'pickle': pd.read_pickle,
+              'parquet': read_parquet,
+              'feather': read_feather}
 
 
 class ReadToDf(Link):
@@ -54,8 +61,17 @@ class ReadToDf(Link):
         :param str key: storage key for the DataStore.
         :param reader: pandas reader is determined automatically. But can be set by hand, e.g. csv, xlsx.
         :param bool itr_over_files: Iterate over individual files, default is false. If false, are files are collected in one dataframe. NB chunksize takes priority!
-        :param int chunksize: Default is none. If positive integer then will always iterate. chunksize requires pd.read_csv or pd.read_table.
+        :param int chunksize: Default is none. If positive integer then will always iterate. chunksize requires pd.read_csv, pd.read_table or a Parquet or Feather file.
+        :param int prefetch: when iterating, read up to this number of datasets (files or chunks) per file ahead in background threads. Default is 0 (off).
+        :param int prefetch_workers: number of files read in parallel when prefetching. Default is 1.
+        :param int decompress_workers: if positive, decompress compressed files (gz, bz2, zst, lz4) in background threads and stream the decompressed data to the pandas reader. Members of multi-member files are decompressed in parallel by this number of threads. Default is 0 (decompression by pandas).
+        :param bool shard: in a map/reduce run, split the input files over the map workers and combine the dataframes read by the workers. Default is false: every worker reads all files, e.g. for lookup tables.
         :param kwargs: all other key word arguments are passed on to the pandas reader.
+
+        Parquet and Feather files are read with the readers in eskapade.analysis.columnar.  These read only the
+        columns specified by usecols and accept a query_set argument: a list of query expressions as in
+        ApplySelectionToDf.  Row groups of Parquet files that cannot pass simple conditions of the queries, e.g.
+        "x > 2", are not read.  With chunksize set, these files are read per row group or record batch.
         """
 
         # initialize Link, pass name from kwargs
@@ -63,7 +79,8 @@ class ReadToDf(Link):
         
         # process and register all relevant kwargs. kwargs are added as attributes of the link.
         # second arg is default value for an attribute. key is popped from kwargs.
-        self._process_kwargs(kwargs, path='', key='', reader=None, itr_over_files=False, chunksize=None)
+        self._process_kwargs(kwargs, path='', key='', reader=None, itr_over_files=False, chunksize=None,
+                             prefetch=0, prefetch_workers=1, decompress_workers=0, shard=False)
         
         # pass on remaining kwargs to pandas reader 
         self.kwargs = copy.deepcopy(kwargs)
@@ -76,6 +93,10 @@ class ReadToDf(Link):
         self._iterate = False
         self._reader = None
         self._usecols = [] if 'usecols' not in self.kwargs else self.kwargs['usecols']
+        self._prefetch_files = None
+        self._prefetch_queue = None
+        self._prefetch_stop = None
+        self._shard = None
         
         return
 
@@ -89,27 +110,14 @@ class ReadToDf(Link):
         assert isinstance(self.key, str) and len(self.key) > 0, 'output key not set.'
         assert isinstance(self._usecols, list), 'usecols not set correctly.'
         
-        # construct and check list of file paths to read
-        read_paths = [p for p in self.path] if not isinstance(self.path, str) else [self.path]
-        if not read_paths:
-            self.log().critical('no file path specified for %s instance "%s"', self.__class__.__name__, self.name)
-            raise RuntimeError('no file path specified to read dataframe from file')
-        if not all(isinstance(p, str) for p in read_paths):
-            self.log().critical('not all paths for %s instance "%s" are strings', self.__class__.__name__, self.name)
-            raise TypeError('file paths specified to read dataframe from file must be strings')
-
-        # construct actual paths
-        read_paths = [pe for p in read_paths for pe in glob.glob(p)]
-        if not read_paths:
-            self.log().critical('specified files not found for %s instance "%s"', self.__class__.__name__, self.name)
-            raise RuntimeError('specified files not found')
-        if not all(os.path.isfile(p) for p in read_paths):
-            self.log().critical('not all paths for %s instance "%s" are files', self.__class__.__name__, self.name)
-            raise RuntimeError('paths specified to read dataframe from file must be regular files')
-
-        # set paths to read
+        # set paths to read; in a map/reduce run, only read the files of the selected part
+        read_paths = self._read_paths()
+        if self._shard is not None:
+            read_paths = read_paths[self._shard[0]::self._shard[1]]
+            self.log().info('Reading part %d of %d of input files (%d files)', self._shard[0] + 1, self._shard[1],
+                            len(read_paths))
         self._paths = np.array(read_paths)
-        self._path_itr = np.nditer(self._paths)
+        self._path_itr = np.nditer(self._paths) if len(self._paths) else None
 
         # now determine if file iterator will be used. Will iterate if:
         # 1. chunksize>0.
@@ -121,16 +129,120 @@ class ReadToDf(Link):
             self._iterate = True
         self.log().info('File and/or chunksize iterator is active: %s.' % self._iterate)
         if self.chunksize is not None:
-            self.log().info('chunksize = %d. NB chunksize requires pd.read_csv or pd.read_table.' % self.chunksize)
+            self.log().info('chunksize = %d. NB chunksize requires pd.read_csv, pd.read_table or a Parquet or Feather file.'
+                          % self.chunksize)
 
         # add back chunksize if it was a kwarg, so it's picked up by pandas.
         if self.chunksize is not None:
             self.kwargs['chunksize'] = self.chunksize
             
         self.log().info('kwargs passed on to pandas reader are: %s' % self.kwargs )
+
+        # start reading datasets in the background if prefetching is requested
+        assert isinstance(self.prefetch, int) and self.prefetch >= 0, 'prefetch needs to be a non-negative integer.'
+        assert isinstance(self.prefetch_workers, int) and self.prefetch_workers > 0, \
+            'prefetch_workers needs to be a positive integer.'
+        assert isinstance(self.decompress_workers, int) and self.decompress_workers >= 0, \
+            'decompress_workers needs to be a non-negative integer.'
+        if self._iterate and self.prefetch > 0:
+            self.start_prefetch()
         
         return StatusCode.Success
 
+    def _read_paths(self):
+        """Construct and check list of file paths to read"""
+
+        read_paths = [p for p in self.path] if not isinstance(self.path, str) else [self.path]
+        if not read_paths:
+            self.log().critical('no file path specified for %s instance "%s"', self.__class__.__name__, self.name)
+            raise RuntimeError('no file path specified to read dataframe from file')
+        if not all(isinstance(p, str) for p in read_paths):
+            self.log().critical('not all paths for %s instance "%s" are strings', self.__class__.__name__, self.name)
+            raise TypeError('file paths specified to read dataframe from file must be strings')
+
+        # construct actual paths
+        read_paths = [pe for p in read_paths for pe in glob.glob(p)]
+        if not read_paths:
+            self.log().critical('specified files not found for %s instance "%s"', self.__class__.__name__, self.name)
+            raise RuntimeError('specified files not found')
+        if not all(os.path.isfile(p) for p in read_paths):
+            self.log().critical('not all paths for %s instance "%s" are files', self.__class__.__name__, self.name)
+            raise RuntimeError('paths specified to read dataframe from file must be regular files')
+
+        return read_paths
+
+    def num_shards(self):
+        """Get number of input files, which can be read by different map/reduce workers, if shard is set"""
+
+        return len(self._read_paths()) if self.shard else None
+
+    def select_shard(self, shard, n_shards):
+        """Select part of the input files for a map/reduce worker
+
+        :param int shard: index of selected part
+        :param int n_shards: number of parts in which the files are split
+        """
+
+        self._shard = (shard, n_shards)
+
+    def finalize(self):
+        """ Finalize ReadToDf
+
+        Stops background reading of datasets, if any.
+        """
+
+        self.stop_prefetch()
+        self._close_reader()
+
+        return StatusCode.Success
+
+    def _close_reader(self):
+        """ Close chunk reader of current file, which stops its decompression """
+
+        if _is_chunk_reader(self._reader) and hasattr(self._reader, 'close'):
+            self._reader.close()
+        self._reader = None
+
+    def start_prefetch(self):
+        """
+        Start reading datasets in background threads.
+
+        Each file gets its own bounded queue, which is filled with the file
+        dataframe or its chunks by one of the worker threads.  Files are
+        picked up by the workers in order and the queues are drained in the
+        same order, so the datasets are returned in the same order as
+        without prefetching.
+        """
+
+        self.stop_prefetch()
+        self.log().info('Prefetching up to %d dataset(s) per file, reading %d file(s) in parallel.',
+                        self.prefetch, self.prefetch_workers)
+
+        self._prefetch_stop = threading.Event()
+        self._prefetch_files = []
+        tasks = queue.Queue()
+        for path in self._paths:
+            file_queue = queue.Queue(maxsize=self.prefetch)
+            self._prefetch_files.append((str(path), file_queue))
+            tasks.put((str(path), file_queue))
+        self._prefetch_files.reverse()
+
+        reader_kwargs = dict(self.kwargs, decompress_workers=self.decompress_workers)
+        for i in range(min(self.prefetch_workers, len(self._paths))):
+            worker = threading.Thread(target=_prefetch_worker, name='%s_prefetch_%d' % (self.name, i),
+                                      args=(tasks, self.reader, reader_kwargs, self._prefetch_stop))
+            worker.daemon = True
+            worker.start()
+
+    def stop_prefetch(self):
+        """ Stop background reading of datasets """
+
+        if self._prefetch_stop is not None:
+            self._prefetch_stop.set()
+        self._prefetch_files = None
+        self._prefetch_queue = None
+        self._prefetch_stop = None
+
     
     def execute(self):
         """ Execute ReadToDf
@@ -144,7 +256,12 @@ class ReadToDf(Link):
         # 1. handle first the case of no iteration. Concatenate into one dataframe.
         if not self._iterate:
             self.log().debug('reading datasets from files [%s]', ', '.join('"%s"' % p for p in self._paths))
-            df = pd.concat(pandasReader(p, self.reader, **self.kwargs) for p in self._paths)
+            if len(self._paths):
+                df = pd.concat(pandasReader(p, self.reader, decompress_workers=self.decompress_workers,
+                                            **self.kwargs) for p in self._paths)
+            else:
+                # no files in part of map/reduce worker
+                df = pd.DataFrame(columns=self._usecols)
             numentries = len(df.index)
         # 2. handle case where iteration has been turned on
         else:
@@ -182,7 +299,7 @@ class ReadToDf(Link):
 
         Assess if looper is done or if a next dataset is still coming up.
         """
-        finished = self._path_itr.finished
+        finished = self._path_itr is None or self._path_itr.finished
         if isinstance(self.chunksize,int) and self.chunksize > 0:
             finished &= (self._latest_data_length < self.chunksize)
         return finished
@@ -205,6 +322,11 @@ class ReadToDf(Link):
             
         return data
 
+    def data_keys(self):
+        """Get keys of data-store objects that are stored by ReadToDf"""
+
+        return set(), {self.key, 'n_' + self.key, 'n_sum_' + self.key} if self.key else set()
+
     def latest_data_length(self):
         """ Return length of current dataset """
         return self._latest_data_length
@@ -221,14 +343,18 @@ class ReadToDf(Link):
         """
         data = None
 
+        # 0. datasets are read in the background
+        if self._prefetch_files is not None:
+            return self._next_prefetched()
+
         # 1. input file has already been set (in previous cycle),
         #    and this is still used for chunking.
-        if self._reader!=None and isinstance(self._reader,pd.io.parsers.TextFileReader):        
+        if _is_chunk_reader(self._reader):
             try:
                 data = next(self._reader)
                 return data
             except StopIteration:
-                # TextFileReader throws stopiterator exception at end
+                # chunk reader throws stopiterator exception at end
                 data = None
             except:
                 #import sys
@@ -238,11 +364,13 @@ class ReadToDf(Link):
 
         # 2. trying next file
         # data is still None, setting up a new reader
-        if not self._path_itr.finished:
+        if self._path_itr is not None and not self._path_itr.finished:
             path = str(self._path_itr[0])
             self._path_itr.iternext()
+            self._close_reader()
             try:
-                self._reader = pandasReader(path, self.reader, **self.kwargs) 
+                self._reader = pandasReader(path, self.reader, decompress_workers=self.decompress_workers,
+                                            **self.kwargs)
             except:
                 self.log().critical('Could not read from new path <%s>' % path)
                 raise 
@@ -260,31 +388,137 @@ class ReadToDf(Link):
             data = self._reader
             # resetting the reader for next itr
             self._reader = None
-        elif isinstance(self._reader,pd.io.parsers.TextFileReader):        
+        elif _is_chunk_reader(self._reader):
             try:
                 data = next(self._reader)
             except StopIteration:
-                # TextFileReader throws stopiterator exception at end
+                # chunk reader throws stopiterator exception at end
                 data = None
             except:
                 raise 'Unexpected error: cannot process next dataset iteration. Exit.'
             pass
             
         return data
-    
 
-def pandasReader(path, reader, *args, **kwargs):
+    def _next_prefetched(self):
+        """
+        Pass up the next dataset read in the background.
+
+        The file iterator is advanced when the datasets of a new file are
+        picked up, so bookkeeping is the same as without prefetching.
+        """
+        while True:
+            # pick up queue of next file
+            if self._prefetch_queue is None:
+                if not self._prefetch_files:
+                    # no new files left
+                    return None
+                self._current_path, self._prefetch_queue = self._prefetch_files.pop()
+                self._path_itr.iternext()
+                self.log().info('Opened new file [%s]' % self._current_path)
+
+            data = self._prefetch_queue.get()
+            if isinstance(data, Exception):
+                self.log().critical('Could not read from path <%s>' % self._current_path)
+                raise data
+            if data is not _END_OF_FILE:
+                return data
+
+            # all datasets of this file have been passed up
+            self._prefetch_queue = None
+
+
+def _is_chunk_reader(reader):
+    """Check if reader is an iterator over datasets, e.g. a TextFileReader"""
+
+    return isinstance(reader, collections.abc.Iterator)
+
+
+# marker for end of datasets in prefetch queue of a file
+_END_OF_FILE = object()
+
+
+def _prefetch_worker(tasks, reader, kwargs, stop):
+    """
+    Read files in the background.
+
+    Takes (path, queue) tasks until none are left and puts the dataframe, or
+    its chunks, in the queue of the file, followed by an end-of-file marker.
+    Exceptions are put in the queue to be raised by the consumer.
+    """
+    def put(file_queue, item):
+        while not stop.is_set():
+            try:
+                file_queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    while not stop.is_set():
+        try:
+            path, file_queue = tasks.get_nowait()
+        except queue.Empty:
+            return
+        data = None
+        try:
+            data = pandasReader(path, reader, **kwargs)
+            for df in [data] if isinstance(data, pd.DataFrame) else data:
+                if not put(file_queue, df):
+                    return
+        except Exception as exc:
+            put(file_queue, exc)
+            return
+        finally:
+            if _is_chunk_reader(data) and hasattr(data, 'close'):
+                data.close()
+        put(file_queue, _END_OF_FILE)
+
+
+def pandasReader(path, reader, *args, decompress_workers=0, **kwargs):
     """ 
     Pick the correct pandas reader.
 
-    Based on provided reader setting, or based on file extension.
+    Based on provided reader setting, or based on file extension.  The
+    extension of a compressed file is skipped, e.g. "data.csv.gz" is read
+    with the csv reader.  If decompress_workers is positive, compressed
+    files are decompressed in background threads and the reader gets a
+    stream of decompressed data.  Chunks of a decompressed file are then
+    returned by a generator that closes the stream, and thereby stops the
+    decompression, when it is exhausted or closed.
     """
+    codec = compression_codec(path)
     if not reader:
-        reader = pd_readers.get(os.path.splitext(path)[1].strip('.'), None)
+        base_path = os.path.splitext(path)[0] if codec else path
+        reader = pd_readers.get(os.path.splitext(base_path)[1].strip('.'), None)
     if not reader:
         log.critical('no suitable reader found for file "%s"', path)
         raise RuntimeError('unable to find suitable Pandas reader')
     log.debug('using Pandas reader "%s"', str(reader))
     # If the reader is input as 'csv' by hand, use the lookup, else use the specified reader (as pd.read_X)
     reader = pd_readers.get(reader) if isinstance(reader, str) else reader
-    return reader(path, *args, **kwargs)
+    if not (codec and decompress_workers):
+        return reader(path, *args, **kwargs)
+
+    # read from stream of decompressed data
+    log.debug('decompressing "%s" with %d thread(s)', path, decompress_workers)
+    stream = open_decompressed(path, codec=codec, workers=decompress_workers)
+    try:
+        data = reader(stream, *args, **kwargs)
+    except BaseException:
+        stream.close()
+        raise
+    if isinstance(data, pd.DataFrame):
+        stream.close()
+        return data
+    return _close_after(data, stream)
+
+
+def _close_after(chunks, stream):
+    """Iterate over chunks read from stream and close stream afterwards, also if iteration is stopped early"""
+
+    try:
+        for chunk in chunks:
+            yield chunk
+    finally:
+        stream.close()
@@ -19,11 +19,18 @@
 # * LICENSE.                                                                       *
 # **********************************************************************************
 
+import logging
 from eskapade import ProcessManager, ConfigObject, Link, DataStore, StatusCode
 from collections import Counter
 import numpy as np
 import pandas as pd
-from eskapade.analysis.histogram import Histogram, ValueCounts
+from eskapade.analysis.histogram import Histogram, ValueCounts, timestamps_to_ns, values_to_bin_index
+
+log = logging.getLogger(__name__)
+
+# default bin specifications of numeric and timestamp columns
+UNIT_BIN_SPECS = {'bin_width': 1, 'bin_offset': 0}
+UNIT_TIMESTAMP_SPECS = {'bin_width': pd.Timedelta(days=30).value, 'bin_offset': pd.Timestamp('2010-01-04').value}
 
 # numeric datatypes get converted to an index, which is then used for value counting
 NUMERIC_SUBSTR = [np.dtype('int'), np.dtype('float'), np.dtype('double')]
@@ -78,6 +85,8 @@ class ValueCounter(Link):
                bins/keys with inconsistent datatypes. By default compare with data types in datatype dictionary.
         :param drop_keys dict: dictionary used for dropping specific keys from created value_counts dictionaries.
         :param bool copy_columns_from_df: if true, copy all columns from the dataframe.
+        :param str store_key_partial: key of output data to store partial state of value counts in data store.
+               Partial states of different data sets can be merged, e.g. with the HistogramReducer link.
 
         Example drop_keys dictionary is:
 
@@ -102,14 +111,14 @@ class ValueCounter(Link):
                              store_at_finalize=False,
                              drop_inconsistent_key_types=True,
                              drop_keys={},
-                             copy_columns_from_df=False)
+                             copy_columns_from_df=False,
+                             store_key_partial=None)
 
         # check residual kwargs. exit if any present.
         self.check_extra_kwargs(kwargs)
 
-        self._unit_bin_specs = {'bin_width': 1, 'bin_offset': 0}
-        self._unit_timestamp_specs = {'bin_width': pd.Timedelta(days=30).value,
-                                      'bin_offset': pd.Timestamp('2010-01-04').value}
+        self._unit_bin_specs = dict(UNIT_BIN_SPECS)
+        self._unit_timestamp_specs = dict(UNIT_TIMESTAMP_SPECS)
 
         # these get filled during execution
         self._counts = {}
@@ -128,8 +137,11 @@ class ValueCounter(Link):
         if self.store_key_counts is not None:
             assert isinstance(self.store_key_counts, str) and len(self.store_key_counts), \
                 'store_key_counts has not been set to string.'
-        assert self.store_key_hists is not None or self.store_key_counts is not None, \
-            'no store key has been set.'
+        if self.store_key_partial is not None:
+            assert isinstance(self.store_key_partial, str) and len(self.store_key_partial), \
+                'store_key_partial has not been set to string.'
+        assert self.store_key_hists is not None or self.store_key_counts is not None \
+            or self.store_key_partial is not None, 'no store key has been set.'
 
         # default histogram creation is at execute(). At finalize is useful for
         # looping over datasets.
@@ -160,6 +172,11 @@ class ValueCounter(Link):
 
         return StatusCode.Success
 
+    def data_keys(self):
+        """Get keys of data-store objects that are read and stored by ValueCounter"""
+
+        return self.attr_data_keys()
+
     def execute(self):
         """Execute ValueCounter
 
@@ -225,12 +242,7 @@ class ValueCounter(Link):
         idf = df[strcols].copy(deep=False)
         for col in dtcols:
             self.log().debug('Converting column "%s" of type "%s" to nanosec', col, self.datatype[col])
-
-            def to_ns(x):
-                if pd.isnull(x):
-                    return 0
-                return pd.to_datetime(x).value
-            idf[col] = df[col].apply(to_ns)
+            idf[col] = timestamps_to_ns(df[col])
 
         # 3. numerical variables are converted to indices here
         for col in numcols + dtcols:
@@ -242,7 +254,9 @@ class ValueCounter(Link):
             is_timestamp = isinstance(dt.type(), np.datetime64)
             sf = idf if is_timestamp else df
             bin_specs = self.bin_specs.get(col, self._unit_bin_specs if is_number else self._unit_timestamp_specs)
-            idf[col] = sf[col].apply(value_to_bin_index, **bin_specs)
+            # binning of full column at once; same results as applying value_to_bin_index per value
+            idf[col] = values_to_bin_index(sf[col].values, bin_width=bin_specs.get('bin_width', 1),
+                                           bin_offset=bin_specs.get('bin_offset', 0))
 
         # 4. do the actual value counting based on categories and created
         # indices
@@ -292,46 +306,54 @@ class ValueCounter(Link):
         ds = proc_mgr.service(DataStore)
 
         # 1. construct value counts
-        for c in self.columns:
-            name = ':'.join(c)
-            vc = ValueCounts(c, c, self._counts[name])
-            # remove all items from Counters where the key is not of correct datatype.
-            # e.g. in Counter dict of ints, remove any non-ints that may arise
-            # from dq issues.
-            if self.drop_inconsistent_key_types:
-                vc = self.drop_inconsistent_keys(c, vc)
-            self._valcnts[name] = vc
+        # remove all items from Counters where the key is not of correct datatype.
+        # e.g. in Counter dict of ints, remove any non-ints that may arise
+        # from dq issues.
+        self._valcnts = make_value_counts(self.columns, self._counts, self.datatype, self.drop_inconsistent_key_types)
 
         if self.store_key_counts is not None:
             ds[self.store_key_counts] = self._valcnts
+        if self.store_key_partial is not None:
+            ds[self.store_key_partial] = self.partial_state()
 
         # 2. construct hists from value counts
         if self.store_key_hists is None:
             return
 
-        for c in self.columns:
-            if len(c) != 1:
-                continue
-            name = ':'.join(c)
-            dt = np.dtype(self.datatype[name]).type()
-            is_number = isinstance(dt, np.number)
-            is_timestamp = isinstance(dt, np.datetime64)
-
-            # bin_specs is used for converting index back to original var in
-            # histogram class.
-            bin_specs = {}
-            if is_number:
-                bin_specs = self.bin_specs.get(name, self._unit_bin_specs)
-            elif is_timestamp:
-                bin_specs = self.bin_specs.get(name, self._unit_timestamp_specs)
-            h = Histogram(self._valcnts[name], variable=name, datatype=self.datatype[name],
-                          bin_specs=bin_specs)
-            self._hists1d[name] = h
+        self._hists1d = make_histograms(self.columns, self._valcnts, self.datatype, self.bin_specs,
+                                        self._unit_bin_specs, self._unit_timestamp_specs)
         # and store
         ds[self.store_key_hists] = self._hists1d
 
         return
 
+    def partial_state(self):
+        """Get partial state of value counts
+
+        The partial state contains copies of the value counts collected so
+        far, as Counter objects, with the column settings required to merge
+        them with the counts of other data sets.  Keys of the counts and bin
+        specifications may be NumPy or pandas objects, e.g. timestamps, so
+        the state can be pickled, but is not necessarily JSON serializable.
+
+        :returns: partial state
+        :rtype: dict
+        """
+
+        return dict(link='ValueCounter', columns=tuple(tuple(c) for c in self.columns),
+                    counts=dict((name, Counter(cnt)) for name, cnt in self._counts.items()),
+                    datatype=dict(self.datatype), bin_specs=freeze_bin_specs(self.bin_specs))
+
+    def merge_partial_state(self, state):
+        """Merge partial state of value counts from other data set
+
+        :param dict state: partial state, as returned by partial_state
+        :raises: RuntimeError if partial state is incompatible
+        """
+
+        merge_partial_settings(self.columns, self.datatype, self.bin_specs, state, 'ValueCounter')
+        merge_partial_counts(self._counts, state)
+
     def drop_requested_keys(self, name, counts):
         """Drop requested keys from value_counts
 
@@ -359,21 +381,88 @@ class ValueCounter(Link):
         :param object obj: ValueCounts or Histogram object to drop inconsistent keys from.
         """
 
-        # has array been converted first? if so, set correct comparison
-        # datatype
-        comp_dtype = []
-        for col in c:
-            dt = np.dtype(self.datatype[col]).type()
-            is_converted = isinstance(
-                dt, np.number) or isinstance(
-                dt, np.datetime64)
-            if is_converted:
-                comp_dtype.append(np.int64)
-            else:
-                comp_dtype.append(self.datatype[col])
-        # keep only keys of types in comp_dtype
-        obj.remove_keys_of_inconsistent_type(prefered_key_type=comp_dtype)
-        return obj
+        return drop_inconsistent_keys(c, obj, self.datatype)
+
+
+def drop_inconsistent_keys(columns, obj, datatype):
+    """Drop keys with types that are inconsistent with the column data types
+
+    :param list columns: columns of ValueCounts or Histogram object
+    :param object obj: ValueCounts or Histogram object to drop inconsistent keys from.
+    :param dict datatype: data types of columns
+    :returns: input object
+    """
+
+    # has array been converted first? if so, set correct comparison
+    # datatype
+    comp_dtype = []
+    for col in columns:
+        dt = np.dtype(datatype[col]).type()
+        is_converted = isinstance(
+            dt, np.number) or isinstance(
+            dt, np.datetime64)
+        if is_converted:
+            comp_dtype.append(np.int64)
+        else:
+            comp_dtype.append(datatype[col])
+    # keep only keys of types in comp_dtype
+    obj.remove_keys_of_inconsistent_type(prefered_key_type=comp_dtype)
+    return obj
+
+
+def make_value_counts(columns, counts, datatype, drop_inconsistent_key_types=True):
+    """Make ValueCounts objects from counts
+
+    :param list columns: columns of value counts
+    :param dict counts: Counter per column name, i.e. the columns joined by ":"
+    :param dict datatype: data types of columns
+    :param bool drop_inconsistent_key_types: remove keys with types that are inconsistent with the data types
+    :returns: ValueCounts objects per column name
+    :rtype: dict
+    """
+
+    value_counts = {}
+    for c in columns:
+        name = ':'.join(c)
+        vc = ValueCounts(c, c, counts[name])
+        if drop_inconsistent_key_types:
+            vc = drop_inconsistent_keys(c, vc, datatype)
+        value_counts[name] = vc
+    return value_counts
+
+
+def make_histograms(columns, value_counts, datatype, bin_specs, unit_bin_specs=UNIT_BIN_SPECS,
+                    unit_timestamp_specs=UNIT_TIMESTAMP_SPECS):
+    """Make histograms of single columns from value counts
+
+    :param list columns: columns of value counts; only single columns are histogrammed
+    :param dict value_counts: ValueCounts objects per column name
+    :param dict datatype: data types of columns
+    :param dict bin_specs: bin specifications of numeric and timestamp columns
+    :param dict unit_bin_specs: bin specifications of numeric columns without bin_specs
+    :param dict unit_timestamp_specs: bin specifications of timestamp columns without bin_specs
+    :returns: histograms per column name
+    :rtype: dict
+    """
+
+    hists = {}
+    for c in columns:
+        if len(c) != 1:
+            continue
+        name = ':'.join(c)
+        dt = np.dtype(datatype[name]).type()
+        is_number = isinstance(dt, np.number)
+        is_timestamp = isinstance(dt, np.datetime64)
+
+        # bin_specs is used for converting index back to original var in
+        # histogram class.
+        specs = {}
+        if is_number:
+            specs = bin_specs.get(name, unit_bin_specs)
+        elif is_timestamp:
+            specs = bin_specs.get(name, unit_timestamp_specs)
+        hists[name] = Histogram(value_counts[name], variable=name, datatype=datatype[name], bin_specs=specs)
+    return hists
 
 
 def value_to_bin_index(val, **kwargs):
@@ -416,3 +505,65 @@ def value_to_bin_center(val, **kwargs):
     except BaseException:
         pass
     return val
+
+
+def freeze_bin_specs(bin_specs):
+    """Convert bin specifications to nested tuples
+
+    :param dict bin_specs: bin specifications per column
+    :returns: tuple of (column, tuple of (spec, value)) pairs
+    :rtype: tuple
+    """
+
+    return tuple((col, tuple(sorted(specs.items()))) for col, specs in sorted(bin_specs.items()))
+
+
+def merge_partial_settings(columns, datatype, bin_specs, state, link_type):
+    """Merge column settings of partial state
+
+    The column settings are updated in place.
+
+    :param list columns: columns to merge into
+    :param dict datatype: data types of columns to merge into
+    :param dict bin_specs: bin specifications to merge into
+    :param dict state: partial state
+    :param str link_type: type of link that created compatible partial states
+    :raises: RuntimeError if partial state is incompatible
+    """
+
+    if state.get('link') != link_type:
+        log.critical('Cannot merge partial state of "%s" into %s state', state.get('link'), link_type)
+        raise RuntimeError('incompatible partial state')
+
+    # check and merge binning
+    for col, specs in state['bin_specs']:
+        specs = dict(specs)
+        own_specs = bin_specs.get(col)
+        if own_specs is None:
+            bin_specs[col] = specs
+        elif set(own_specs) != set(specs) or not all(np.array_equal(own_specs[k], specs[k]) for k in specs):
+            log.critical('Bin specifications of partial state for column "%s" (%s) do not match (%s)', col,
+                         str(specs), str(own_specs))
+            raise RuntimeError('incompatible partial state')
+
+    # merge columns and data types
+    for c in state['columns']:
+        if list(c) not in columns:
+            columns.append(list(c))
+    for col, dt in state['datatype'].items():
+        own_dt = datatype.setdefault(col, dt)
+        if own_dt != dt:
+            log.critical('Data type of partial state for column "%s" (%s) does not match (%s)', col, str(dt),
+                         str(own_dt))
+            raise RuntimeError('incompatible partial state')
+
+
+def merge_partial_counts(counts, state):
+    """Merge value counts of partial state
+
+    :param dict counts: Counter per column name to merge into
+    :param dict state: partial state of ValueCounter
+    """
+
+    for name, part_counts in state['counts'].items():
+        counts.setdefault(name, Counter()).update(part_counts)
@@ -31,7 +31,9 @@ pd_writers = {'csv': pd.DataFrame.to_csv,
               'html': pd.DataFrame.to_html,
               'dta': pd.DataFrame.to_stata,
               'pkl': pd.DataFrame.to_pickle,
-              'pickle': pd.DataFrame.to_pickle}
+              'pickle': pd.DataFrame.to_pickle,
+              'parquet': pd.DataFrame.to_parquet,
+              'feather': pd.DataFrame.to_feather}
 log = logging.getLogger(__name__)
 
 
@@ -106,6 +108,12 @@ class WriteFromDf(Link):
         
         return StatusCode.Success
 
+    def data_keys(self):
+        """Get keys of data-store objects that are read by WriteFromDf"""
+
+        read_keys = set(self.dictionary.keys()) if self.dictionary else set()
+        return read_keys | ({self.key} if self.key else set()), set()
+
     def execute(self):
         """ Execute WriteFromDf
 
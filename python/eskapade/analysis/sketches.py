@@ -0,0 +1,254 @@
+# **********************************************************************************
+# * Project: Eskapade - A python-based package for data analysis                   *
+# * Created: 2017/06/28                                                            *
+# * Description:                                                                   *
+# *      Mergeable streaming sketches of column values: running moments,           *
+# *      approximate quantiles (KLL) and approximate distinct counts               *
+# *      (HyperLogLog), updated per chunk of data at constant memory               *
+# *                                                                                *
+# * Authors:                                                                       *
+# *      KPMG Big Data team, Amstelveen, The Netherlands                           *
+# *                                                                                *
+# * Redistribution and use in source and binary forms, with or without             *
+# * modification, are permitted according to the terms listed in the file          *
+# * LICENSE.                                                                       *
+# **********************************************************************************
+
+import numpy as np
+import pandas as pd
+
+
+def _random_state(random_state):
+    """Get NumPy random state from seed or random state"""
+
+    if isinstance(random_state, np.random.RandomState):
+        return random_state
+    return np.random.RandomState(random_state)
+
+
+class RunningMoments(object):
+    """Running count, mean, standard deviation, minimum and maximum
+
+    Chunks are combined with the pairwise update of the mean and the sum
+    of squared deviations (Chan et al.), which is numerically stable.
+    """
+
+    def __init__(self):
+        """Initialize running moments"""
+
+        self.n = 0
+        self.mean = 0.
+        self.m2 = 0.
+        self.min = np.nan
+        self.max = np.nan
+
+    @property
+    def std(self):
+        """Standard deviation (without degrees-of-freedom correction)"""
+
+        return np.sqrt(self.m2 / self.n) if self.n else np.nan
+
+    def update(self, values):
+        """Update moments with chunk of values
+
+        :param values: array of non-NaN values
+        """
+
+        values = np.asarray(values, dtype=np.float64)
+        if not len(values):
+            return
+        mean = values.mean()
+        self._combine(len(values), mean, ((values - mean) ** 2).sum(), values.min(), values.max())
+
+    def merge(self, other):
+        """Merge moments of other values into these moments
+
+        :param RunningMoments other: moments of other values
+        """
+
+        if other.n:
+            self._combine(other.n, other.mean, other.m2, other.min, other.max)
+
+    def _combine(self, n, mean, m2, min_val, max_val):
+        """Combine moments with moments of other values"""
+
+        n_tot = self.n + n
+        delta = mean - self.mean
+        self.mean += delta * n / n_tot
+        self.m2 += m2 + delta ** 2 * self.n * n / n_tot
+        self.min = min_val if not self.n else min(self.min, min_val)
+        self.max = max_val if not self.n else max(self.max, max_val)
+        self.n = n_tot
+
+
+class QuantileSketch(object):
+    """Approximate quantiles of a stream of values (KLL sketch)
+
+    Values are kept in a hierarchy of compactors.  An item in compactor h
+    represents 2^h values.  If a compactor exceeds its capacity, its items
+    are sorted and every other item, starting at a random offset, is
+    promoted to the next compactor.  The capacities decrease geometrically
+    towards the lower compactors, so the total number of retained items is
+    bounded by about 3k, independent of the number of values.  The rank
+    error is of order 1/k.  Sketches of different chunks of values can be
+    merged.
+    """
+
+    def __init__(self, k=200, random_state=None):
+        """Initialize quantile sketch
+
+        :param int k: capacity of the highest compactor, which determines the accuracy
+        :param random_state: seed or NumPy random state used to select compacted items
+        """
+
+        self.k = int(k)
+        self.n = 0
+        self.random_state = _random_state(random_state)
+        self._compactors = [np.empty(0)]
+
+    def _capacity(self, level):
+        """Capacity of compactor"""
+
+        return max(int(np.ceil(self.k * (2. / 3.) ** (len(self._compactors) - level - 1))), 2)
+
+    def update(self, values):
+        """Update sketch with chunk of values
+
+        :param values: array of non-NaN values
+        """
+
+        values = np.asarray(values, dtype=np.float64)
+        if not len(values):
+            return
+        self.n += len(values)
+        self._compactors[0] = np.concatenate((self._compactors[0], values))
+        self._compress()
+
+    def merge(self, other):
+        """Merge sketch of other values into this sketch
+
+        :param QuantileSketch other: sketch of other values
+        """
+
+        self.n += other.n
+        for level, items in enumerate(other._compactors):
+            if level == len(self._compactors):
+                self._compactors.append(np.empty(0))
+            self._compactors[level] = np.concatenate((self._compactors[level], items))
+        self._compress()
+
+    def _compress(self):
+        """Compact lowest compactor over capacity until retained items fit in total capacity"""
+
+        while sum(len(c) for c in self._compactors) > sum(self._capacity(lvl) for lvl in range(len(self._compactors))):
+            level = next(lvl for lvl, c in enumerate(self._compactors) if len(c) > self._capacity(lvl))
+            if level == len(self._compactors) - 1:
+                self._compactors.append(np.empty(0))
+
+            # promote every other sorted item; an odd item stays in this compactor
+            items = np.sort(self._compactors[level])
+            keep = items[:len(items) % 2]
+            items = items[len(keep):]
+            self._compactors[level] = keep
+            self._compactors[level + 1] = np.concatenate((self._compactors[level + 1],
+                                                          items[self.random_state.randint(2)::2]))
+
+    def items(self):
+        """Get retained items and their weights, sorted by value
+
+        :returns: item values and weights
+        :rtype: tuple
+        """
+
+        values = np.concatenate(self._compactors)
+        weights = np.concatenate([np.full(len(c), 2. ** level) for level, c in enumerate(self._compactors)])
+        order = np.argsort(values, kind='mergesort')
+        return values[order], weights[order]
+
+    def quantiles(self, probability):
+        """Get approximate quantiles
+
+        The quantiles are interpolated between the centers of the ranks of
+        the items, as in statistics.weighted_quantile.
+
+        :param probability: quantile probabilities, between 0 and 1
+        :returns: quantiles
+        :rtype: numpy.ndarray
+        """
+
+        probability = np.atleast_1d(np.asarray(probability, dtype=np.float64))
+        values, weights = self.items()
+        if not len(values):
+            return np.full(len(probability), np.nan)
+        pn = (np.cumsum(weights) - 0.5 * weights) / weights.sum()
+        return np.interp(probability, pn, values)
+
+
+class DistinctCounter(object):
+    """Approximate number of distinct values of a stream (HyperLogLog)
+
+    Values are hashed to 64 bits.  The first bits select a register, which
+    keeps the maximum position of the first one-bit in the remaining bits.
+    With 2^p registers the relative error is about 1.04 / 2^(p/2), e.g.
+    0.8% for the default precision of 14.  Counters of different chunks of
+    values are merged by taking the register-wise maximum.
+    """
+
+    def __init__(self, precision=14):
+        """Initialize distinct counter
+
+        :param int precision: number of bits that select a register
+        """
+
+        self.precision = int(precision)
+        if not 4 <= self.precision <= 18:
+            raise ValueError('precision of distinct counter must be between 4 and 18')
+        self.registers = np.zeros(2 ** self.precision, dtype=np.uint8)
+
+    def update(self, values):
+        """Update counter with chunk of values
+
+        Values are hashed with pandas.util.hash_array, so equal values of
+        the same type give equal hashes, also across chunks and processes.
+
+        :param values: array of non-null values
+        """
+
+        values = np.asarray(values)
+        if not len(values):
+            return
+        hashes = pd.util.hash_array(values)
+        n_bits = 64 - self.precision
+        indices = (hashes >> np.uint64(n_bits)).astype(np.int64)
+
+        # position of first one-bit: the remaining bits are exactly representable as float, so frexp gives their
+        # bit length
+        rest = (hashes & np.uint64(2 ** n_bits - 1)).astype(np.float64)
+        ranks = (n_bits + 1 - np.frexp(rest)[1]).astype(np.uint8)
+        np.maximum.at(self.registers, indices, ranks)
+
+    def merge(self, other):
+        """Merge counter of other values into this counter
+
+        :param DistinctCounter other: counter of other values
+        """
+
+        if other.precision != self.precision:
+            raise ValueError('cannot merge distinct counters of different precisions')
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def count(self):
+        """Get approximate number of distinct values
+
+        :returns: number of distinct values
+        :rtype: int
+        """
+
+        n_reg = len(self.registers)
+        alpha = 0.7213 / (1. + 1.079 / n_reg)
+        estimate = alpha * n_reg ** 2 / np.sum(2. ** -self.registers.astype(np.float64))
+        n_zero = np.count_nonzero(self.registers == 0)
+        if estimate <= 2.5 * n_reg and n_zero:
+            # small range: linear counting
+            estimate = n_reg * np.log(n_reg / float(n_zero))
+        return int(round(estimate))
@@ -2,13 +2,17 @@ import numpy as np
 import pandas as pd
 import tabulate
 import operator
-from statsmodels.stats.weightstats import DescrStatsW
-from collections import Counter
+from collections import Counter, OrderedDict
+from eskapade.analysis import sketches
 from eskapade.analysis.histogram import BinningUtil
 from eskapade.core.mixins import LoggingMixin
 
 NUM_NS_DAY = 24 * 3600 * int(1e9)
 
+# statistics of numeric variables and corresponding quantile probabilities (after mean and std)
+NUM_STAT_VARS = ('mean', 'std', 'min', 'max', 'p01', 'p05', 'p16', 'p50', 'p84', 'p95', 'p99')
+QUANT_PROBS = (0, 1, 0.01, 0.05, 0.16, 0.50, 0.84, 0.95, 0.99)
+
 
 class ArrayStats(LoggingMixin):
     """Create summary of an array
@@ -73,13 +77,36 @@ class ArrayStats(LoggingMixin):
             if not isinstance(self.weights, pd.Series):
                 self.weights = pd.Series(w for w in self.weights)
 
-        # store non-null column values
-        self.col_nn = self.col[self.col.notnull()]
-        self.weights_nn = self.weights[self.col.notnull()] if self.weights is not None else None
+        # non-null column values, selected on first access
+        self._col_nn = None
+        self._weights_nn = None
 
         # to be filled in make_histogram
         self.hist = None
 
+    @property
+    def col_nn(self):
+        """Non-null column values"""
+
+        if self._col_nn is None:
+            self._select_non_null()
+        return self._col_nn
+
+    @property
+    def weights_nn(self):
+        """Weights of non-null column values"""
+
+        if self._col_nn is None:
+            self._select_non_null()
+        return self._weights_nn
+
+    def _select_non_null(self):
+        """Select non-null column values and their weights"""
+
+        not_null = self.col.notnull()
+        self._col_nn = self.col[not_null]
+        self._weights_nn = self.weights[not_null] if self.weights is not None else None
+
     def get_col_props(self):
         """Get column properties
 
@@ -135,6 +162,34 @@ class ArrayStats(LoggingMixin):
         resulting figures to create a statistical overview.
         """
 
+        # determine column properties
+        col_props = self.get_col_props()
+
+        # get value counts
+        cnt, var_cnt, dist_cnt = (len(self.col), len(self.col_nn), self.col.nunique())
+        if self.weights_nn is not None:
+            cnt, var_cnt = int(sum(self.weights)), int(sum(self.weights_nn))
+        n_nan = self.col.isnull().sum()
+
+        # get additional statistics for numeric variables
+        num_vals = None
+        if col_props['is_num'] and len(self.col_nn):
+            weights = self.weights_nn.values if self.weights_nn is not None else None
+            num_stats = column_stats(numeric_values(self.col_nn), weights)
+            num_vals = (num_stats['mean'][0], num_stats['std'][0]) + tuple(num_stats['quantiles'][:, 0])
+
+        self._set_stats(cnt, var_cnt, dist_cnt, n_nan, num_vals)
+
+    def _set_stats(self, cnt, var_cnt, dist_cnt, n_nan, num_vals=None):
+        """Set statistical properties of column variable
+
+        :param int cnt: number of entries
+        :param int var_cnt: number of filled entries
+        :param int dist_cnt: number of distinct values
+        :param int n_nan: number of missing values
+        :param tuple num_vals: values of numeric statistics (NUM_STAT_VARS); None for non-numeric variables
+        """
+
         # reset stats containers
         self.stat_vars = []
         self.stat_vals = {}
@@ -144,14 +199,10 @@ class ArrayStats(LoggingMixin):
         # determine column properties
         col_props = self.get_col_props()
 
-        # get value counts
-        cnt, var_cnt, dist_cnt = (len(self.col), len(self.col_nn), self.col.nunique())
-        if self.weights_nn is not None:
-            cnt, var_cnt = int(sum(self.weights)), int(sum(self.weights_nn))
+        # set value counts
         for stat_var, stat_val in zip(('count', 'filled', 'distinct'), (cnt, var_cnt, dist_cnt)):
             self.stat_vars.append(stat_var)
             self.stat_vals[stat_var] = (stat_val, '{:d}'.format(stat_val))
-        n_nan = self.col.isnull().sum()
         if n_nan:
             self.stat_vars.append('nan')
             self.stat_vals['nan'] = (n_nan, '{:d}'.format(n_nan))
@@ -161,23 +212,11 @@ class ArrayStats(LoggingMixin):
         self.print_lines.append('{0:d} entries ({1:.0f}%)'.format(var_cnt, ratio))
         self.print_lines.append('{0:d} unique entries'.format(dist_cnt))
 
-        # convert time stamps to integers
-        if col_props['is_ts']:
-            col_num = self.col_nn.astype(int)
-        else:
-            col_num = self.col_nn
-
-        # get additional statistics for numeric variables
-        if col_props['is_num'] and len(col_num):
-            stat_vars = ('mean', 'std', 'min', 'max', 'p01', 'p05', 'p16', 'p50', 'p84', 'p95', 'p99')
-            quant_probs = (0, 1, 0.01, 0.05, 0.16, 0.50, 0.84, 0.95, 0.99)
-            #stat_vals = (col_num.mean(), col_num.std(), col_num.min(), col_num.max())\
-            #            + tuple(col_num.quantile((0.01, 0.05, 0.16, 0.50, 0.84, 0.95, 0.99)))
-            # two lines below also work if weights are None
-            des = DescrStatsW(col_num, self.weights_nn)
-            stat_vals = (des.mean, des.std) + tuple(weighted_quantile(col_num, self.weights_nn, quant_probs))
+        # set additional statistics for numeric variables
+        if num_vals is not None:
+            stat_vars = NUM_STAT_VARS
             self.stat_vars += stat_vars
-            for stat_var, stat_val in zip(stat_vars, stat_vals):
+            for stat_var, stat_val in zip(stat_vars, num_vals):
                 if not col_props['is_ts']:
                     # value entry for floats and integers
                     self.stat_vals[stat_var] = (stat_val, '{:+g}'.format(stat_val))
@@ -258,56 +297,10 @@ class ArrayStats(LoggingMixin):
         col_props = self.get_col_props()
 
         if col_props['is_num']:
-            col_num = self.col_nn
-
-            # determine histogram range for numeric variable
-            if var_range:
-                # get minimum and maximum of variable for histogram from specified range
-                var_min, var_max = var_range
-                if col_props['is_ts']:
-                    # convert minimum and maximum to Unix time stamps
-                    var_min, var_max = pd.Timestamp(var_min).value, pd.Timestamp(var_max).value
-            else:
-                # determine minimum and maximum of variable for histogram from percentiles
-                var_min, var_max = self.stat_vals.get('p05')[0], self.stat_vals.get('p95')[0]
-                if col_props['is_ts']:
-                    var_min, var_max = pd.Timestamp(var_min).value, pd.Timestamp(var_max).value
-                var_min -= 0.05 * (var_max - var_min)
-                var_max += 0.05 * (var_max - var_min)
-                if var_min > 0. and var_min < +0.2 * (var_max - var_min):
-                    var_min = 0.
-                elif var_max < 0. and var_max > -0.2 * (var_max - var_min):
-                    var_max = 0.
-
-            if col_props['is_ts']:
-                # np.histogram cannot deal with timestamps, so convert to ints and convert them back below.
-                to_timestamp = np.vectorize(lambda x: pd.Timestamp(x).value)
-                col_num = to_timestamp(self.col_nn)
-                if bin_edges is not None:
-                    bin_edges = (to_timestamp(bin_edges)).tolist()
-
-            if bin_edges is not None:
-                bin_util = BinningUtil(bin_edges=bin_edges)
-                idx_min = bin_util.value_to_bin_label(var_min)
-                var_min = bin_util.get_left_bin_edge(idx_min)
-                idx_max = bin_util.value_to_bin_label(var_max)
-                var_max = bin_util.get_right_bin_edge(idx_max)
-                var_bins = bin_util.truncated_bin_edges(variable_range=[var_min, var_max])
-            else:
-                if col_props['is_int'] or col_props['is_ts']:
-                    # for ints and ts use bins around integer values
-                    bin_width = np.max((np.round((var_max - var_min) / float(var_bins)), 1.))
-                    var_min = np.floor(var_min - 0.5) + 0.5
-                    var_bins = int((var_max - var_min) // bin_width) + int((var_max - var_min) % bin_width > 0.)
-                    var_max = var_min + var_bins * bin_width
-
             # make (weighted) histogram. note that var_bins supersedes range
-            values, bins = np.histogram(col_num, bins=var_bins, range=(var_min, var_max), weights=self.weights_nn)
-
-            if col_props['is_ts']:
-                # convert Unix time stamps to Pandas time stamps
-                bins = [pd.Timestamp(ts) for ts in bins]
-            self.hist = values, bins
+            var_bins, var_range = self._hist_binning(var_bins, var_range, bin_edges)
+            values, bins = np.histogram(numeric_values(self.col_nn), bins=var_bins, range=var_range,
+                                        weights=self.weights_nn)
         else:
             # get data from data frame for categorical column
             if self.weights_nn is None:
@@ -318,9 +311,81 @@ class ArrayStats(LoggingMixin):
                     val_counts[k] += v
                 val_counts = dict(val_counts.most_common(var_bins))
             sorted_vc = sorted(val_counts.items(), key=operator.itemgetter(1), reverse=True)
-            labels = [lc[0] for lc in sorted_vc]
+            bins = [lc[0] for lc in sorted_vc]
             values = [lc[1] for lc in sorted_vc]
-            self.hist = values, labels
+
+        return self._set_histogram(values, bins, create_mpv_stat)
+
+    def _hist_binning(self, var_bins=30, var_range=None, bin_edges=None):
+        """Determine binning of histogram of numeric column values
+
+        Time stamps are binned as numbers of nanoseconds.
+
+        :param int var_bins: Number of histogram bins
+        :param tuple var_range: Range of histogram variable
+        :param list bin_edges: predefined bin edges to use for histogram. Overrules var_bins.
+        :returns: number of bins or bin edges, and range of histogram
+        :rtype: tuple
+        """
+
+        # determine column properties
+        col_props = self.get_col_props()
+
+        # determine histogram range for numeric variable
+        if var_range:
+            # get minimum and maximum of variable for histogram from specified range
+            var_min, var_max = var_range
+            if col_props['is_ts']:
+                # convert minimum and maximum to Unix time stamps
+                var_min, var_max = pd.Timestamp(var_min).value, pd.Timestamp(var_max).value
+        else:
+            # determine minimum and maximum of variable for histogram from percentiles
+            var_min, var_max = self.stat_vals.get('p05')[0], self.stat_vals.get('p95')[0]
+            if col_props['is_ts']:
+                var_min, var_max = pd.Timestamp(var_min).value, pd.Timestamp(var_max).value
+            var_min -= 0.05 * (var_max - var_min)
+            var_max += 0.05 * (var_max - var_min)
+            if var_min > 0. and var_min < +0.2 * (var_max - var_min):
+                var_min = 0.
+            elif var_max < 0. and var_max > -0.2 * (var_max - var_min):
+                var_max = 0.
+
+        if col_props['is_ts'] and bin_edges is not None:
+            # np.histogram cannot deal with timestamps, so convert to ints
+            to_timestamp = np.vectorize(lambda x: pd.Timestamp(x).value)
+            bin_edges = (to_timestamp(bin_edges)).tolist()
+
+        if bin_edges is not None:
+            bin_util = BinningUtil(bin_edges=bin_edges)
+            idx_min = bin_util.value_to_bin_label(var_min)
+            var_min = bin_util.get_left_bin_edge(idx_min)
+            idx_max = bin_util.value_to_bin_label(var_max)
+            var_max = bin_util.get_right_bin_edge(idx_max)
+            var_bins = bin_util.truncated_bin_edges(variable_range=[var_min, var_max])
+        else:
+            if col_props['is_int'] or col_props['is_ts']:
+                # for ints and ts use bins around integer values
+                bin_width = np.max((np.round((var_max - var_min) / float(var_bins)), 1.))
+                var_min = np.floor(var_min - 0.5) + 0.5
+                var_bins = int((var_max - var_min) // bin_width) + int((var_max - var_min) % bin_width > 0.)
+                var_max = var_min + var_bins * bin_width
+
+        return var_bins, (var_min, var_max)
+
+    def _set_histogram(self, values, bins, create_mpv_stat=True):
+        """Set histogram of column values
+
+        :param values: bin values
+        :param bins: bin edges of numeric variable or bin labels of categorical variable
+        :param bool create_mpv_stat: compute most probable value from histogram and add to statistics
+        :returns: histogram values and bins
+        :rtype: tuple
+        """
+
+        if self.get_col_props()['is_ts']:
+            # convert Unix time stamps to Pandas time stamps
+            bins = [pd.Timestamp(ts) for ts in bins]
+        self.hist = values, bins
 
         # compute most probable value from histogram and add to statistics
         if create_mpv_stat:
@@ -377,6 +442,466 @@ class GroupByStats(ArrayStats):
         return tabulate.tabulate(self.table, tablefmt='latex')
 
 
+class FrameStats(LoggingMixin):
+    """Create summaries of the columns of a data frame
+
+    The statistics and histograms of all numeric columns (including time
+    stamps) are computed together, with vectorized operations on the 2-D
+    array of column values.  Quantiles are determined by partitioning the
+    columns, instead of sorting them.  Other columns are summarized one by
+    one.  The summary of each column is an ArrayStats object.
+    """
+
+    def __init__(self, data, columns=None, weights=None, units=None, labels=None):
+        """Initialize for columns in data frame
+
+        :param pandas.DataFrame data: input data frame
+        :param list columns: columns to summarize; all columns by default
+        :param weights: weights of rows: array or column of data (default None)
+        :param dict units: units of columns
+        :param dict labels: labels to describe column variables
+        """
+
+        if not isinstance(data, pd.DataFrame):
+            raise TypeError('specified data object is not a data frame')
+        self.columns = list(data.columns if columns is None else columns)
+        units = units if units is not None else {}
+        labels = labels if labels is not None else {}
+
+        # get weights
+        self.weights = data[weights] if isinstance(weights, str) else weights
+        if self.weights is not None:
+            if len(self.weights) != len(data):
+                raise AssertionError('weights and data do not have the same length')
+            self.weights = pd.Series(np.asarray(self.weights, dtype=np.float64), index=data.index)
+
+        # create statistics objects of columns
+        self.stats = OrderedDict((col, ArrayStats(data, col, weights=self.weights, unit=units.get(col, ''),
+                                                  label=labels.get(col, '')))
+                                 for col in self.columns)
+        self.num_columns = [col for col in self.columns if self.stats[col].get_col_props()['is_num']]
+        self._data = data
+        self._values = None
+
+    def __getitem__(self, col):
+        """Get statistics object of column"""
+
+        return self.stats[col]
+
+    @property
+    def values(self):
+        """2-D array of values of numeric columns
+
+        Time stamps are converted to nanoseconds and missing values to NaN.
+        """
+
+        if self._values is None:
+            self._values = np.empty((len(self._data), len(self.num_columns)), dtype=np.float64)
+            for it, col in enumerate(self.num_columns):
+                self._values[:, it] = numeric_values(self._data[col])
+        return self._values
+
+    def create_stats(self):
+        """Compute statistical properties of column variables"""
+
+        # compute statistics of numeric columns in one go
+        if self.num_columns:
+            weights = self.weights.values if self.weights is not None else None
+            num_stats = column_stats(self.values, weights)
+            dist_cnts = self._data[self.num_columns].nunique()
+            cnt = len(self._data) if weights is None else int(weights.sum())
+            for it, col in enumerate(self.num_columns):
+                n_filled = num_stats['n_filled'][it]
+                var_cnt = int(n_filled) if weights is None else int(num_stats['sum_weights'][it])
+                num_vals = None
+                if n_filled:
+                    num_vals = (num_stats['mean'][it], num_stats['std'][it]) + tuple(num_stats['quantiles'][:, it])
+                self.stats[col]._set_stats(cnt, var_cnt, int(dist_cnts[col]), len(self._data) - int(n_filled),
+                                           num_vals)
+
+        # compute statistics of other columns
+        for col in self.columns:
+            if col not in self.num_columns:
+                self.stats[col].create_stats()
+
+    def make_histograms(self, var_bins=None, var_ranges=None, bin_edges=None, default_bins=30,
+                        create_mpv_stat=True):
+        """Create histograms of column values
+
+        Histograms of numeric columns with equal bin widths are filled in
+        one pass over the array of column values.
+
+        :param dict var_bins: numbers of histogram bins of columns
+        :param dict var_ranges: ranges of histogram variables of columns
+        :param dict bin_edges: predefined bin edges of columns. Overrule var_bins.
+        :param int default_bins: number of bins of columns not in var_bins
+        :param bool create_mpv_stat: compute most probable values from histograms and add to statistics
+        :returns: histograms of columns
+        :rtype: dict
+        """
+
+        var_bins = var_bins if var_bins is not None else {}
+        var_ranges = var_ranges if var_ranges is not None else {}
+        bin_edges = bin_edges if bin_edges is not None else {}
+        if any(not self.stats[col].stat_vals for col in self.columns):
+            self.create_stats()
+
+        # determine binning of numeric columns
+        uniform = OrderedDict()
+        hists = {}
+        for it, col in enumerate(self.num_columns):
+            stats = self.stats[col]
+            if not stats.stat_vals.get('filled', (0,))[0]:
+                continue
+            bins, var_range = stats._hist_binning(var_bins.get(col, default_bins), var_ranges.get(col),
+                                                  bin_edges.get(col))
+            if np.ndim(bins) == 0:
+                uniform[col] = (it, int(bins), var_range)
+            else:
+                # histogram with predefined bin edges
+                weights = self.weights.values if self.weights is not None else None
+                hists[col] = np.histogram(self.values[:, it], bins=bins, range=var_range, weights=weights)
+
+        # fill histograms with equal bin widths
+        if uniform:
+            indices = [u[0] for u in uniform.values()]
+            values = self.values[:, indices] if indices != list(range(len(self.num_columns))) else self.values
+            weights = self.weights.values if self.weights is not None else None
+            uni_hists = uniform_histograms(values, [u[1] for u in uniform.values()],
+                                           [u[2][0] for u in uniform.values()], [u[2][1] for u in uniform.values()],
+                                           weights)
+            hists.update(zip(uniform.keys(), uni_hists))
+
+        # set histograms
+        for col in self.columns:
+            if col in hists:
+                hists[col] = self.stats[col]._set_histogram(hists[col][0], hists[col][1], create_mpv_stat)
+            elif col not in self.num_columns:
+                hists[col] = self.stats[col].make_histogram(var_bins.get(col, default_bins),
+                                                            create_mpv_stat=create_mpv_stat)
+
+        return hists
+
+
+class StreamStats(LoggingMixin):
+    """Create summaries of the columns of a stream of data frames
+
+    The data frames, e.g. chunks of a large data set, are processed one by
+    one and only mergeable summaries of the column values are kept.  For
+    numeric columns (including time stamps) these are running moments, a
+    quantile sketch and a distinct-value counter, with a fixed size.
+    Quantiles, the number of distinct values and histograms are therefore
+    approximate; counts, mean, standard deviation, minimum and maximum are
+    exact.  Categorical columns are summarized by their value counts.  The
+    summary of each column is an ArrayStats object, as for FrameStats.
+    """
+
+    def __init__(self, columns=None, units=None, labels=None, sketch_size=200, distinct_precision=14,
+                 random_state=None):
+        """Initialize stream statistics
+
+        :param list columns: columns to summarize; all columns of the first data frame by default
+        :param dict units: units of columns
+        :param dict labels: labels to describe column variables
+        :param int sketch_size: size parameter k of the quantile sketches
+        :param int distinct_precision: precision of the distinct-value counters
+        :param random_state: seed or NumPy random state of the quantile sketches
+        """
+
+        self.columns = list(columns) if columns is not None else None
+        self.units = units if units is not None else {}
+        self.labels = labels if labels is not None else {}
+        self.sketch_size = sketch_size
+        self.distinct_precision = distinct_precision
+        self.random_state = random_state
+        self.n_rows = 0
+        self.dtypes = {}
+        self.n_nan = {}
+        self.moments = {}
+        self.quantile_sketches = {}
+        self.distinct_counters = {}
+        self.value_counts = {}
+        self.stats = OrderedDict()
+
+    def __getitem__(self, col):
+        """Get statistics object of column"""
+
+        return self.stats[col]
+
+    def _init_column(self, col, dtype):
+        """Initialize summaries of column"""
+
+        self.dtypes[col] = dtype
+        self.n_nan[col] = 0
+        if get_col_props(dtype)['is_num']:
+            self.moments[col] = sketches.RunningMoments()
+            self.quantile_sketches[col] = sketches.QuantileSketch(self.sketch_size, self.random_state)
+            self.distinct_counters[col] = sketches.DistinctCounter(self.distinct_precision)
+        else:
+            self.value_counts[col] = Counter()
+
+    def update(self, data):
+        """Update summaries with values of data frame
+
+        :param pandas.DataFrame data: input data frame
+        """
+
+        if not isinstance(data, pd.DataFrame):
+            raise TypeError('specified data object is not a data frame')
+        if self.columns is None:
+            self.columns = data.columns.tolist()
+
+        self.n_rows += len(data)
+        for col in self.columns:
+            if col not in self.dtypes:
+                self._init_column(col, data[col].dtype)
+            if col in self.moments:
+                values = numeric_values(data[col])
+                values = values[~np.isnan(values)]
+                self.n_nan[col] += len(data) - len(values)
+                self.moments[col].update(values)
+                self.quantile_sketches[col].update(values)
+                self.distinct_counters[col].update(values)
+            else:
+                counts = data[col].value_counts(dropna=False)
+                nan_cnt = counts[counts.index.isnull()].sum()
+                self.n_nan[col] += int(nan_cnt)
+                self.value_counts[col].update(counts[counts.index.notnull()].to_dict())
+
+    def merge(self, other):
+        """Merge summaries of other data frames into these summaries
+
+        :param StreamStats other: summaries of other data frames
+        """
+
+        if self.columns is None:
+            self.columns = other.columns
+        self.n_rows += other.n_rows
+        for col in self.columns:
+            if col not in other.dtypes:
+                continue
+            if col not in self.dtypes:
+                self._init_column(col, other.dtypes[col])
+            self.n_nan[col] += other.n_nan[col]
+            if col in self.moments:
+                self.moments[col].merge(other.moments[col])
+                self.quantile_sketches[col].merge(other.quantile_sketches[col])
+                self.distinct_counters[col].merge(other.distinct_counters[col])
+            else:
+                self.value_counts[col].update(other.value_counts[col])
+
+    def create_stats(self):
+        """Compute statistical properties of column variables from summaries"""
+
+        self.stats = OrderedDict()
+        for col in self.columns or []:
+            if col not in self.dtypes:
+                continue
+            stats = ArrayStats(pd.Series([], dtype=self.dtypes[col]), col, unit=self.units.get(col, ''),
+                               label=self.labels.get(col, ''))
+            n_filled = self.n_rows - self.n_nan[col]
+            num_vals = None
+            if col in self.moments:
+                moments = self.moments[col]
+                dist_cnt = self.distinct_counters[col].count()
+                if moments.n:
+                    quantiles = self.quantile_sketches[col].quantiles(QUANT_PROBS[2:])
+                    num_vals = (moments.mean, moments.std, moments.min, moments.max) + tuple(quantiles)
+            else:
+                dist_cnt = len(self.value_counts[col])
+            stats._set_stats(self.n_rows, n_filled, dist_cnt, self.n_nan[col], num_vals)
+            self.stats[col] = stats
+
+    def make_histograms(self, var_bins=None, var_ranges=None, bin_edges=None, default_bins=30,
+                        create_mpv_stat=True):
+        """Create histograms of column values from summaries
+
+        Histograms of numeric columns are filled with the weighted items of
+        the quantile sketches and are therefore approximate.
+
+        :param dict var_bins: numbers of histogram bins of columns
+        :param dict var_ranges: ranges of histogram variables of columns
+        :param dict bin_edges: predefined bin edges of columns. Overrule var_bins.
+        :param int default_bins: number of bins of columns not in var_bins
+        :param bool create_mpv_stat: compute most probable values from histograms and add to statistics
+        :returns: histograms of columns
+        :rtype: dict
+        """
+
+        var_bins = var_bins if var_bins is not None else {}
+        var_ranges = var_ranges if var_ranges is not None else {}
+        bin_edges = bin_edges if bin_edges is not None else {}
+        if not self.stats:
+            self.create_stats()
+
+        hists = {}
+        for col, stats in self.stats.items():
+            n_bins = var_bins.get(col, default_bins)
+            if col in self.moments:
+                if not self.moments[col].n:
+                    continue
+                bins, var_range = stats._hist_binning(n_bins, var_ranges.get(col), bin_edges.get(col))
+                items, weights = self.quantile_sketches[col].items()
+                values, bins = np.histogram(items, bins=bins, range=var_range, weights=weights)
+                values = np.rint(values).astype(np.int64)
+            else:
+                sorted_vc = sorted(self.value_counts[col].most_common(n_bins), key=operator.itemgetter(1),
+                                   reverse=True)
+                bins = [lc[0] for lc in sorted_vc]
+                values = [lc[1] for lc in sorted_vc]
+            hists[col] = stats._set_histogram(values, bins, create_mpv_stat)
+
+        return hists
+
+
+def numeric_values(col):
+    """Get values of numeric column as floats
+
+    Time stamps are converted to nanoseconds and missing values to NaN.
+
+    :param col: column values
+    :returns: float values
+    :rtype: numpy.ndarray
+    """
+
+    values = np.asarray(col)
+    if values.dtype.kind == 'M':
+        missing = np.isnat(values)
+        values = values.astype('datetime64[ns]').view(np.int64).astype(np.float64)
+        values[missing] = np.nan
+        return values
+    if values.dtype.kind == 'O':
+        values = pd.to_numeric(pd.Series(values), errors='coerce').values
+    return values.astype(np.float64)
+
+
+def column_stats(values, weights=None, probability=QUANT_PROBS):
+    """Compute statistics of the columns of a 2-D array
+
+    The number of filled (non-NaN) values, (weighted) mean, standard
+    deviation and quantiles of all columns are computed in one go.  Without
+    weights, quantiles are determined by partitioning the columns at the
+    required ranks, instead of sorting them.  The quantiles are the same as
+    those of weighted_quantile.
+
+    :param ndarray values: input array (one or two dimensions), with NaN for missing values
+    :param ndarray weights: array with the weights of the rows (default None)
+    :param probability: quantile probabilities
+    :returns: dictionary with arrays "n_filled", "sum_weights", "mean", "std" (per column) and "quantiles" (per
+              probability and column)
+    :rtype: dict
+    """
+
+    values = np.asarray(values, dtype=np.float64)
+    if values.ndim == 1:
+        values = values.reshape(-1, 1)
+    filled = ~np.isnan(values)
+    n_filled = filled.sum(axis=0)
+    filled_vals = np.where(filled, values, 0.)
+
+    # weighted sums of filled values
+    if weights is None:
+        row_weights = filled
+        sum_weights = n_filled.astype(np.float64)
+    else:
+        weights = np.asarray(weights, dtype=np.float64)
+        row_weights = np.where(filled, weights.reshape(-1, 1), 0.)
+        sum_weights = row_weights.sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = (row_weights * filled_vals).sum(axis=0) / sum_weights
+        std = np.sqrt((row_weights * (filled_vals - mean) ** 2).sum(axis=0) / sum_weights)
+
+    # quantiles
+    probability = np.atleast_1d(np.asarray(probability, dtype=np.float64))
+    if weights is None:
+        quantiles = _partition_quantiles(values, n_filled, probability)
+    else:
+        quantiles = np.full((len(probability), values.shape[1]), np.nan)
+        for it in np.flatnonzero(n_filled):
+            quantiles[:, it] = weighted_quantile(values[filled[:, it], it], weights[filled[:, it]], probability)
+
+    return dict(n_filled=n_filled, sum_weights=sum_weights, mean=mean, std=std, quantiles=quantiles)
+
+
+def _partition_quantiles(values, n_filled, probability):
+    """Compute quantiles of columns with unit weights by partitioning
+
+    :param ndarray values: 2-D input array, with NaN for missing values
+    :param ndarray n_filled: number of non-NaN values per column
+    :param ndarray probability: quantile probabilities
+    :returns: quantiles per probability and column
+    :rtype: numpy.ndarray
+    """
+
+    # ranks of quantiles: interpolation between rank centers (k + 0.5) / n, as in weighted_quantile
+    last = np.maximum(n_filled - 1, 0)
+    pos = np.clip(np.outer(probability, n_filled) - 0.5, 0, last)
+    lower = np.floor(pos).astype(np.int64)
+    upper = np.minimum(lower + 1, last)
+    frac = pos - lower
+
+    if not len(values):
+        return np.full(pos.shape, np.nan)
+
+    # partition columns at required ranks; NaNs are placed at the end of the columns
+    ranks = np.unique(np.concatenate((lower.ravel(), upper.ravel())))
+    parts = np.partition(values, ranks, axis=0)
+    lower_vals = np.take_along_axis(parts, lower, axis=0)
+    upper_vals = np.take_along_axis(parts, upper, axis=0)
+    quantiles = np.where(frac > 0, lower_vals + frac * (upper_vals - lower_vals), lower_vals)
+    quantiles[:, n_filled == 0] = np.nan
+
+    return quantiles
+
+
+def uniform_histograms(values, n_bins, var_min, var_max, weights=None):
+    """Fill histograms with equal bin widths of the columns of a 2-D array
+
+    The histograms of all columns are filled in one pass over the array.
+    Bin assignments are the same as those of numpy.histogram.
+
+    :param ndarray values: 2-D input array, with NaN for missing values
+    :param list n_bins: numbers of bins of columns
+    :param list var_min: lower edges of histogram ranges of columns
+    :param list var_max: upper edges of histogram ranges of columns
+    :param ndarray weights: array with the weights of the rows (default None)
+    :returns: bin values and bin edges of the histograms of the columns
+    :rtype: list
+    """
+
+    values = np.asarray(values, dtype=np.float64)
+    n_bins = np.asarray(n_bins, dtype=np.int64)
+    var_min = np.asarray(var_min, dtype=np.float64)
+    var_max = np.asarray(var_max, dtype=np.float64)
+
+    # bin edges; empty ranges are extended, as with numpy.histogram
+    empty = var_min == var_max
+    var_min = np.where(empty, var_min - 0.5, var_min)
+    var_max = np.where(empty, var_max + 0.5, var_max)
+    edges = [np.linspace(vmin, vmax, nb + 1) for vmin, vmax, nb in zip(var_min, var_max, n_bins)]
+    all_edges = np.concatenate(edges)
+    edge_offsets = np.cumsum(np.append(0, n_bins + 1))[:-1]
+    bin_offsets = np.cumsum(np.append(0, n_bins))
+
+    # bin indices of values in range
+    in_range = (values >= var_min) & (values <= var_max)
+    with np.errstate(invalid='ignore'):
+        indices = np.where(in_range, (values - var_min) * (n_bins / (var_max - var_min)), 0.).astype(np.int64)
+    indices = np.minimum(indices, n_bins - 1)
+
+    # correct for rounding errors in computed indices
+    indices -= in_range & (values < all_edges[edge_offsets + indices])
+    indices += in_range & (values >= all_edges[edge_offsets + indices + 1]) & (indices != n_bins - 1)
+
+    # fill bins of all histograms
+    bin_weights = None
+    if weights is not None:
+        bin_weights = np.broadcast_to(np.asarray(weights, dtype=np.float64).reshape(-1, 1), values.shape)[in_range]
+    counts = np.bincount((indices + bin_offsets[:-1])[in_range], weights=bin_weights, minlength=bin_offsets[-1])
+
+    return [(counts[bin_offsets[it]:bin_offsets[it + 1]], edges[it]) for it in range(len(edges))]
+
+
 def get_col_props(var_type):
     """Get column properties
 
@@ -420,7 +945,8 @@ def weighted_quantile(data, weights=None, probability=[0.5]):
     if data.ndim != 1:
         raise TypeError("data must be a one dimensional array")
     if weights is None:
-        weights = np.ones(len(data))
+        # select quantiles by partitioning, instead of sorting
+        return list(_partition_quantiles(data.reshape(-1, 1), np.array([len(data)]), probability)[:, 0])
     if not isinstance(weights, np.ndarray):
         weights = np.asarray(weights)
     if weights.ndim != 1:
@@ -428,10 +954,13 @@ def weighted_quantile(data, weights=None, probability=[0.5]):
     if data.shape != weights.shape:
         raise TypeError("the length of data and weights must be the same")
 
-    # Sort data and compute auxiliary arrays
-    sorted_index = np.argsort(data)
-    sorted_data = data[sorted_index]
-    sorted_weights = weights[sorted_index]
+    # Sort data (if not sorted already) and compute auxiliary arrays
+    if np.all(data[1:] >= data[:-1]):
+        sorted_data, sorted_weights = data, weights
+    else:
+        sorted_index = np.argsort(data)
+        sorted_data = data[sorted_index]
+        sorted_weights = weights[sorted_index]
     cumsum = np.cumsum(sorted_weights)
     pn = (cumsum - 0.5 * sorted_weights) / np.sum(sorted_weights)
     # Get the values of the quantiles
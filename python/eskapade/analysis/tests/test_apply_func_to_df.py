@@ -1,4 +1,5 @@
 import unittest
+import numpy as np
 import pandas as pd
 
 from eskapade.tests.observers import MockDataStoreObserver, TestCaseObservable
@@ -41,6 +42,42 @@ class ApplyFuncToDfTest(unittest.TestCase, TestCaseObservable):
         # added a column?
         self.assertIn('foo', ds['test_output'].columns, 'Column not added to DataFrame')
 
+    def test_parallel(self):
+        from eskapade import ProcessManager, DataStore
+        from eskapade.analysis import ApplyFuncToDf
+
+        # --- setup a dummy data frame
+        df = pd.DataFrame({'a': np.arange(50) * 0.1, 'b': np.arange(50) % 7})
+        ds = ProcessManager().service(DataStore)
+
+        # --- same results in serial, parallel and vectorized modes
+        apply_funcs = [dict(func=lambda x: x ** 2, colin='a', colout='a2'),
+                       dict(func=lambda r: r['a'] + r['b'], colout='ab', kwargs=dict(axis=1)),
+                       dict(func=lambda g: g['a'] - g['a'].mean(), groupby=['b'], groupbyColout='a_norm')]
+        outputs = []
+        for n_workers in (1, 3):
+            ds['test_input'] = df.copy()
+            link = ApplyFuncToDf(read_key='test_input', store_key='test_output', n_workers=n_workers,
+                                 apply_funcs=[dict(f, kwargs=dict(f.get('kwargs', {}))) for f in apply_funcs])
+            link.initialize()
+            link.execute()
+            link = ApplyFuncToDf(read_key='test_input', store_key='test_sums', n_workers=n_workers,
+                                 apply_funcs=[dict(func=lambda g: g['a'].sum(), groupby=['b'])])
+            link.execute()
+            link = ApplyFuncToDf(read_key='test_input', store_key='test_transform', n_workers=n_workers,
+                                 apply_funcs=[dict(func=lambda g: g.assign(c=g['a'] - g['a'].mean()), groupby=['b'])])
+            link.execute()
+            outputs.append((ds['test_output'], ds['test_sums'], ds['test_transform']))
+        pd.testing.assert_frame_equal(outputs[1][0], outputs[0][0])
+        pd.testing.assert_series_equal(outputs[1][1], outputs[0][1])
+        pd.testing.assert_frame_equal(outputs[1][2], outputs[0][2])
+        pd.testing.assert_series_equal(outputs[1][2]['a'], df['a'])
+
+        link = ApplyFuncToDf(read_key='test_input', store_key='test_output',
+                             apply_funcs=[dict(func=lambda x: x ** 2, colin='a', colout='a2', vectorized=True)])
+        link.execute()
+        pd.testing.assert_series_equal(ds['test_output']['a2'], outputs[0][0]['a2'])
+
     def tearDown(self):
         super(ApplyFuncToDfTest, self).tear_down_observers()
         from eskapade.core import execution
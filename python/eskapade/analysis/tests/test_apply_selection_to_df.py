@@ -0,0 +1,68 @@
+import unittest
+import numpy as np
+import pandas as pd
+
+from eskapade.tests.observers import TestCaseObservable
+
+
+class ApplySelectionToDfTest(unittest.TestCase, TestCaseObservable):
+
+    def setUp(self):
+        from eskapade import ProcessManager, DataStore
+
+        # --- setup a dummy data frame
+        self.df = pd.DataFrame({'a': np.arange(10) - 4, 'b': np.arange(10) % 3, 'c': list('xyzxyzxyzx')},
+                               index=np.arange(10) * 2)
+        ProcessManager().service(DataStore)['test_input'] = self.df
+
+    def _execute(self, **kwargs):
+        from eskapade import ProcessManager, DataStore
+        from eskapade.analysis import ApplySelectionToDf
+
+        link = ApplySelectionToDf(readKey='test_input', storeKey='test_output', **kwargs)
+        link.initialize()
+        link.execute()
+
+        ds = ProcessManager().service(DataStore)
+        self.assertEqual(ds['n_test_output'], len(ds['test_output']))
+        return ds['test_output']
+
+    def test_execute(self):
+        for combine in (False, True):
+            # --- same result as consecutive queries
+            df_exp = self.df.query('a > 0').query('c != "z"')[['a', 'c']]
+            df = self._execute(querySet=['a > 0', 'c != "z"'], selectColumns=['a', 'c'], combineQueries=combine)
+            pd.testing.assert_frame_equal(df, df_exp)
+
+            # --- index of selected rows
+            index = self._execute(querySet=['a > 0', 'c != "z"'], storeIndex=True, combineQueries=combine)
+            pd.testing.assert_index_equal(index, df_exp.index)
+
+            # --- failing query
+            with self.assertRaises(ValueError):
+                self._execute(querySet=['a > 0', 'd > 0'], combineQueries=combine)
+            df = self._execute(querySet=['a > 0', 'd > 0'], continueIfFailure=True, combineQueries=combine)
+            self.assertListEqual(df.columns.tolist(), ['a', 'b', 'c'])
+            self.assertEqual(len(df), 0)
+
+    def test_sequential_queries(self):
+        # --- queries that are not element-wise depend on the previous selection
+        df_exp = self.df.query('a > 0').query('b > b.mean()')
+        df = self._execute(querySet=['a > 0', 'b > b.mean()'])
+        pd.testing.assert_frame_equal(df, df_exp)
+        df = self._execute(querySet=['a > 0', 'b > b.mean()'], combineQueries=True)
+        pd.testing.assert_frame_equal(df, self.df[(self.df.a > 0) & (self.df.b > self.df.b.mean())])
+
+    def test_nullable_boolean_mask(self):
+        from eskapade import ProcessManager, DataStore
+
+        # --- missing values do not select rows
+        df = self.df.assign(d=pd.array([True, None] * 5, dtype='boolean'))
+        ProcessManager().service(DataStore)['test_input'] = df
+        for combine in (True, False):
+            df_sel = self._execute(querySet=['d', 'a > 0'], combineQueries=combine)
+            pd.testing.assert_frame_equal(df_sel, df[df.d.fillna(False) & (df.a > 0)])
+
+    def tearDown(self):
+        from eskapade.core import execution
+        execution.reset_eskapade()
@@ -1,10 +1,12 @@
 import unittest
 import numpy as np
+import pandas as pd
 
 from collections import Counter
 
 from eskapade.tests.observers import TestCaseObservable
-from eskapade.analysis.histogram import Histogram, ValueCounts
+from eskapade.analysis.histogram import (Histogram, ValueCounts, timestamps_to_ns, values_to_bin_index,
+                                         values_to_bin_center)
 
 
 class HistogramTest(unittest.TestCase, TestCaseObservable):
@@ -24,6 +26,46 @@ class HistogramTest(unittest.TestCase, TestCaseObservable):
         v, b = np.histogram(data, bins=bins)
         self.assertTrue(np.allclose(np.divide(v, v.sum()), values, rtol=0, atol=0.02))
 
+    def test_sampler(self):
+        size = 100000
+
+        # --- numeric: values within bins, with the same sampler for consecutive simulations
+        h = Histogram(([1, 0, 3, 4], [0, 1, 2, 4, 8]), variable='x')
+        sampler = h.sampler()
+        self.assertIs(h.sampler(), sampler)
+        data, h_sim = h.simulate(size)
+        self.assertTrue(0 <= data.min() and data.max() < 8)
+        self.assertEqual(len(np.unique(data)), size)
+        v, b = np.histogram(data, bins=[0, 1, 2, 4, 8])
+        np.testing.assert_array_equal(h_sim.get_bin_vals()[0], v)
+        self.assertTrue(np.allclose(v / size, [.125, 0, .375, .5], rtol=0, atol=0.01))
+        data2, h_sim = h.simulate(size, make_hist=False)
+        self.assertIsNone(h_sim)
+        self.assertFalse(np.array_equal(data, data2))
+
+        # --- seeded streams: global NumPy random state by default, independent streams of different histograms
+        np.testing.assert_array_equal(h.simulate(10, random_state=42)[0], h.simulate(10, random_state=42)[0])
+        np.random.seed(42)
+        data = Histogram(([1, 2], [0, 1, 2]), variable='y').sampler().sample(10)
+        np.random.seed(42)
+        np.testing.assert_array_equal(Histogram(([1, 2], [0, 1, 2]), variable='y').sampler().sample(10), data)
+        h1, h2 = Histogram(([1, 1], [0, 1, 2]), variable='x'), Histogram(([2, 1], [0, 1, 2]), variable='x')
+        data1, data2 = h1.simulate(size, random_state=1)[0], h2.simulate(size, random_state=1)[0]
+        self.assertLess(abs(np.corrcoef(data1, data2)[0, 1]), 0.02)
+
+        # --- histogram pickled without samplers
+        del h1._samplers
+        h1.remove_keys_of_inconsistent_type()
+        self.assertEqual(len(h1.simulate(10)[0]), 10)
+
+        # --- categorical: alias table
+        h = Histogram({'a': 1, 'b': 0, 'c': 3, 'd': 6}, variable='c')
+        data, h_sim = h.simulate(size)
+        self.assertSetEqual(set(data), {'a', 'c', 'd'})
+        vals, labels = h_sim.get_bin_vals()
+        self.assertListEqual(labels.tolist(), ['a', 'c', 'd'])
+        self.assertTrue(np.allclose(vals, [.1, .3, .6], rtol=0, atol=0.01))
+
     def test_to_normalized(self):
         bins = [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10]
         values = [1, 2, 3, 4, 5, 4, 3, 2, 1, 1]
@@ -210,5 +252,90 @@ class HistogramTest(unittest.TestCase, TestCaseObservable):
         self.assertIsInstance(h_bin_edges, np.ndarray)
         self.assertListEqual(h_bin_edges.tolist(), bin_edges)
 
+    def test_add(self):
+        bin_specs = {'bin_width': 1, 'bin_offset': 0}
+        h1 = Histogram({0: 1, 1: 2}, variable='x', bin_specs=bin_specs)
+        h2 = Histogram({1: 3, 4: 1}, variable='x', bin_specs=bin_specs)
+        h = h1 + h2
+
+        self.assertIsInstance(h, Histogram)
+        self.assertListEqual(h.get_bin_labels(), [0, 1, 4])
+        self.assertListEqual(h.bin_entries().tolist(), [1, 5, 1])
+        with self.assertRaises(RuntimeError):
+            h1 + Histogram({0: 1}, variable='y', bin_specs=bin_specs)
+
+        vc = ValueCounts(('x', 'y'), counts={(0, 'a'): 1, (1, 'b'): 2}) + ValueCounts(('y', 'x'), counts={('a', 0): 4})
+        self.assertDictEqual(vc.counts, {(0, 'a'): 5, (1, 'b'): 2})
+
+    def test_value_counts_projection(self):
+        counts = {(0, 'a'): 1, (0, 'b'): 2, (1, 'a'): 3, (2, None): 4, (2.0, 'b'): 5}
+        vc = ValueCounts(('x', 'y'), counts=counts)
+
+        # projection and selection
+        self.assertDictEqual(vc.create_sub_counts('x').counts, {(0,): 3, (1,): 3, (2,): 9})
+        self.assertDictEqual(vc.create_sub_counts('y', sel={'x': [0, 1]}).counts, {('a',): 4, ('b',): 2})
+        self.assertListEqual(vc.get_values(('x',)), [(0,), (1,), (2,)])
+        self.assertEqual(vc.create_sub_counts('y').num_nonone_bins, 2)
+        self.assertEqual(vc.sum_counts, 15)
+
+        # bin-count lookups
+        h = Histogram(vc, variable='x', bin_specs={'bin_width': 1, 'bin_offset': 0})
+        self.assertListEqual(h.get_bin_counts([2, 0, 5, -1, 1.]).tolist(), [9, 3, 0, 0, 3])
+
+    def test_bulk_lookups(self):
+        values = [-3.5, -1, 0, 0.2, 0.5, 1.9, 2, 3.99, 4, 9, np.nan]
+        for bin_specs in ({'bin_width': 1, 'bin_offset': 0.5}, {'bin_edges': [-1, 0, 0.5, 2, 4]}):
+            h = Histogram(dict((i, i + 1) for i in range(4)), variable='x', bin_specs=bin_specs)
+            for greater_equal in (False, True):
+                labels = h.values_to_bin_labels(values[:-1], greater_equal=greater_equal)
+                self.assertIsInstance(labels, np.ndarray)
+                self.assertListEqual(labels.tolist(),
+                                     [h.value_to_bin_label(v, greater_equal=greater_equal) for v in values[:-1]])
+            self.assertListEqual(h.get_hist_vals(values[:-1]).tolist(), [h.get_hist_val(v) for v in values[:-1]])
+            self.assertEqual(h.get_hist_vals(values)[-1], 0)
+
+        # categorical histogram
+        h = Histogram({'a': 3, 'b': 5}, variable='c')
+        self.assertListEqual(h.get_hist_vals(['b', 'c', 'a']).tolist(), [5, 0, 3])
+
     def tearDown(self):
         pass
+
+
+class BinningFunctionsTest(unittest.TestCase):
+
+    def test_values_to_bin_index(self):
+        from eskapade.analysis.links.value_counter import value_to_bin_index
+
+        floats = pd.Series([0.3, -1.2, 5.5, np.nan, np.inf, 7.])
+        idx = values_to_bin_index(floats, bin_width=2, bin_offset=0.5)
+        exp = floats.apply(value_to_bin_index, bin_width=2, bin_offset=0.5).values
+        np.testing.assert_array_equal(idx, exp)
+
+        ints = pd.Series([1, -3, 7, 10])
+        idx = values_to_bin_index(ints, bin_width=3, bin_offset=1)
+        self.assertEqual(idx.dtype, np.int64)
+        self.assertListEqual(idx.tolist(), ints.apply(value_to_bin_index, bin_width=3, bin_offset=1).tolist())
+
+    def test_values_to_bin_center(self):
+        from eskapade.analysis.links.value_counter import value_to_bin_center
+
+        floats = pd.Series([0.3, -1.2, 5.5, np.nan, 7.])
+        centers = values_to_bin_center(floats, bin_width=2, bin_offset=0.5)
+        exp = floats.apply(value_to_bin_center, bin_width=2, bin_offset=0.5).values
+        np.testing.assert_array_equal(centers, exp)
+
+        ints = pd.Series([1, -3, 7, 10])
+        centers = values_to_bin_center(ints, bin_width=3, bin_offset=1)
+        self.assertListEqual(centers.tolist(), ints.apply(value_to_bin_center, bin_width=3, bin_offset=1).tolist())
+
+    def test_timestamps(self):
+        ts = pd.Series(pd.to_datetime(['2017-01-01', None, '2010-01-05']))
+        ns = timestamps_to_ns(ts)
+        self.assertListEqual(ns.tolist(), [pd.Timestamp('2017-01-01').value, 0, pd.Timestamp('2010-01-05').value])
+
+        idx = values_to_bin_index(ts, bin_width=np.timedelta64(1, 'D'), bin_offset=np.datetime64('2010-01-04'))
+        self.assertEqual(idx[2], 1)
+        idx_ns = values_to_bin_index(ns, bin_width=pd.Timedelta(days=1).value,
+                                     bin_offset=pd.Timestamp('2010-01-04').value)
+        np.testing.assert_array_equal(idx, idx_ns)
@@ -0,0 +1,76 @@
+import unittest
+import numpy as np
+import pandas as pd
+
+from eskapade.tests.observers import TestCaseObservable
+
+
+class HistogramReducerTest(unittest.TestCase, TestCaseObservable):
+
+    def setUp(self):
+        self.df = pd.DataFrame({'x': np.arange(20) * 0.5, 'c': list('abcde') * 4})
+
+    def _fill(self, link_cls, df, columns=('x', 'c'), **kwargs):
+        from eskapade import ProcessManager, DataStore
+
+        ds = ProcessManager().service(DataStore)
+        ds['data'] = df
+        link = link_cls(read_key='data', columns=list(columns), bin_specs={'x': {'bin_width': 2, 'bin_offset': 0}},
+                        **kwargs)
+        link.initialize()
+        link.execute()
+        link.finalize()
+        return ds
+
+    def test_value_counter(self):
+        from eskapade.analysis import ValueCounter, HistogramReducer
+
+        ds = self._fill(ValueCounter, self.df, store_key_hists='hists')
+        full = ds['hists']
+        for it, idx in enumerate((slice(0, 7), slice(7, 20))):
+            ds = self._fill(ValueCounter, self.df[idx], store_key_partial='part_{:d}'.format(it))
+
+        reducer = HistogramReducer(read_keys=['part_0', 'part_1'], store_key_hists='merged',
+                                   store_key_counts='merged_counts')
+        reducer.initialize()
+        reducer.execute()
+        self.assertEqual(ds['merged_counts']['c'].counts, dict(((v,), 4) for v in 'abcde'))
+        for col in ('x', 'c'):
+            self.assertListEqual(ds['merged'][col].get_bin_labels(), full[col].get_bin_labels())
+            self.assertListEqual(ds['merged'][col].bin_entries().tolist(), full[col].bin_entries().tolist())
+
+    def test_histogrammar_filler(self):
+        from eskapade.analysis import HistogrammarFiller, HistogramReducer
+
+        ds = self._fill(HistogrammarFiller, self.df, columns=['c'], store_key='hists')
+        full = dict((k, h.toJson()) for k, h in ds['hists'].items())
+        for it, idx in enumerate((slice(0, 7), slice(7, 20))):
+            ds = self._fill(HistogrammarFiller, self.df[idx], columns=['c'], store_key='hists_{:d}'.format(it),
+                            store_key_partial='part_{:d}'.format(it))
+
+        reducer = HistogramReducer(read_keys=['part_0', 'part_1'], store_key_hists='merged')
+        reducer.initialize()
+        reducer.execute()
+        self.assertSetEqual(set(ds['merged']), {'c'})
+        for col in ('c',):
+            self.assertEqual(ds['merged'][col].toJson(), full[col])
+            self.assertEqual(ds['merged'][col].n_dim, 1)
+            self.assertIs(ds['merged'][col].datatype, str)
+
+    def test_datatype_mismatch(self):
+        from eskapade.analysis import ValueCounter, HistogramReducer
+
+        # same column with integer and floating-point values
+        self._fill(ValueCounter, self.df.assign(x=np.arange(20)), store_key_partial='part_0')
+        ds = self._fill(ValueCounter, self.df, store_key_partial='part_1')
+        self.assertIsNot(ds['part_0']['datatype']['x'], ds['part_1']['datatype']['x'])
+
+        reducer = HistogramReducer(read_keys=['part_0', 'part_1'], store_key_hists='merged')
+        reducer.initialize()
+        with self.assertRaises(RuntimeError):
+            reducer.execute()
+        self.assertNotIn('merged', ds)
+
+    def tearDown(self):
+        from eskapade.core import execution
+        execution.reset_eskapade()
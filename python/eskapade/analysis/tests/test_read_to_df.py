@@ -0,0 +1,202 @@
+import unittest
+import os
+import gzip
+import bz2
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+
+from eskapade.tests.observers import TestCaseObservable
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+
+class ReadToDfTest(unittest.TestCase, TestCaseObservable):
+
+    def setUp(self):
+        # --- write files with distinguishable contents
+        self.tmp_dir = tempfile.mkdtemp()
+        self.paths = []
+        for i in range(4):
+            path = os.path.join(self.tmp_dir, 'file_{:d}.csv'.format(i))
+            pd.DataFrame({'file': [i] * (5 + i), 'row': range(5 + i)}).to_csv(path, index=False)
+            self.paths.append(path)
+
+    def _read_all(self, **kwargs):
+        from eskapade import ProcessManager, DataStore, ConfigObject
+        from eskapade.analysis import ReadToDf
+
+        ds = ProcessManager().service(DataStore)
+        settings = ProcessManager().service(ConfigObject)
+
+        kwargs.setdefault('reader', 'csv')
+        link = ReadToDf(key='test_output', path=self.paths, **kwargs)
+        link.initialize()
+        dfs = []
+        while True:
+            link.execute()
+            dfs.append(ds['test_output'])
+            if not settings.get('chainRepeatRequestBy_' + link.name):
+                break
+        link.finalize()
+
+        return dfs, ds.get('n_sum_test_output', len(dfs[0]))
+
+    def test_prefetch(self):
+        for kwargs in (dict(itr_over_files=True), dict(chunksize=3)):
+            dfs, n_sum = self._read_all(**kwargs)
+            dfs_pf, n_sum_pf = self._read_all(prefetch=2, prefetch_workers=3, **kwargs)
+
+            # same datasets in same order
+            self.assertEqual(n_sum_pf, n_sum)
+            self.assertEqual(len(dfs_pf), len(dfs))
+            for df, df_pf in zip(dfs, dfs_pf):
+                self.assertListEqual(df_pf['file'].tolist(), df['file'].tolist())
+                self.assertListEqual(df_pf['row'].tolist(), df['row'].tolist())
+
+    def test_decompression(self):
+        # --- write compressed files: multi-member gzip and single-stream bzip2
+        df_exp = pd.concat(pd.read_csv(p) for p in self.paths)
+        csv_data = [open(p, 'rb').read() for p in self.paths]
+        gz_path = os.path.join(self.tmp_dir, 'data.csv.gz')
+        with open(gz_path, 'wb') as gz_file:
+            gz_file.write(gzip.compress(csv_data[0]))
+            for data in csv_data[1:]:
+                gz_file.write(gzip.compress(data.split(b'\n', 1)[1]))
+        bz2_path = os.path.join(self.tmp_dir, 'data.csv.bz2')
+        with open(bz2_path, 'wb') as bz2_file:
+            bz2_file.write(bz2.compress(b''.join([csv_data[0]] + [d.split(b'\n', 1)[1] for d in csv_data[1:]])))
+
+        for path in (gz_path, bz2_path):
+            self.paths = [path]
+            for workers in (0, 1, 3):
+                for kwargs in (dict(), dict(chunksize=4)):
+                    dfs, n_sum = self._read_all(decompress_workers=workers, **kwargs)
+                    df = pd.concat(dfs)
+                    self.assertEqual(n_sum, len(df_exp))
+                    self.assertListEqual(df['file'].tolist(), df_exp['file'].tolist())
+                    self.assertListEqual(df['row'].tolist(), df_exp['row'].tolist())
+
+    def test_decompression_stop(self):
+        import mock
+        from eskapade.analysis.decompression import DecompressedStream, CODECS
+
+        # --- single-member file with magic bytes in stored data: no members are decompressed ahead
+        data = b'start' + CODECS['gz'][0] + b'end' * 1000
+        gz_path = os.path.join(self.tmp_dir, 'data.gz')
+        with open(gz_path, 'wb') as gz_file:
+            gz_file.write(gzip.compress(data, compresslevel=0))
+        with mock.patch.object(DecompressedStream, '_decompress_member') as mock_member:
+            stream = DecompressedStream(gz_path, workers=3)
+            self.assertEqual(stream.read(), data)
+            stream.close()
+            mock_member.assert_not_called()
+
+        # --- decompression of chunked file is stopped at finalize, also if not all chunks were read
+        gz_path = os.path.join(self.tmp_dir, 'data.csv.gz')
+        with open(gz_path, 'wb') as gz_file:
+            gz_file.write(gzip.compress(open(self.paths[0], 'rb').read()))
+        self.paths = [gz_path]
+        with mock.patch.object(DecompressedStream, 'close', autospec=True,
+                               side_effect=DecompressedStream.close) as mock_close:
+            from eskapade.analysis import ReadToDf
+            link = ReadToDf(key='test_output', path=self.paths, reader='csv', chunksize=2, decompress_workers=1)
+            link.initialize()
+            link.execute()
+            mock_close.assert_not_called()
+            link.finalize()
+            mock_close.assert_called_once()
+
+    @unittest.skipIf(pyarrow is None, 'pyarrow not available')
+    def test_columnar(self):
+        from eskapade.analysis.links.read_to_df import pandasReader
+        from eskapade.analysis.columnar import query_to_filters, select_row_groups
+
+        # --- write files with multiple row groups/record batches
+        df = pd.DataFrame({'x': np.arange(100), 'y': np.arange(100) % 7, 'z': ['a', 'b'] * 50})
+        pq_path = os.path.join(self.tmp_dir, 'data.parquet')
+        df.to_parquet(pq_path, row_group_size=10)
+        ft_path = os.path.join(self.tmp_dir, 'data.feather')
+        df.to_feather(ft_path, chunksize=10)
+
+        # --- row-group pruning
+        filters = query_to_filters('x >= 25 and 3 < y and (x < 45) & (z != "c") and x != @x_max')
+        self.assertListEqual(sorted(filters), [('x', '<', 45), ('x', '>=', 25), ('y', '>', 3), ('z', '!=', 'c')])
+        self.assertListEqual(select_row_groups(pyarrow.parquet.ParquetFile(pq_path), filters), [2, 3, 4])
+
+        # --- literals that cannot be converted are left to the query
+        self.assertListEqual(query_to_filters('x >= 25 and z in {["a"]} and y == {[1]: 2}'), [('x', '>=', 25)])
+        query = 'x < 15 and x in [[1], 2, 12]'
+        self.assertListEqual(query_to_filters(query), [('x', 'in', [[1], 2, 12]), ('x', '<', 15)])
+        pd.testing.assert_frame_equal(pandasReader(pq_path, None, query_set=[query]), df.query(query))
+
+        # --- same selection as querying full dataframe
+        queries = ['x >= 25 and x < 45', 'y > 3']
+        df_exp = df.query(queries[0]).query(queries[1])[['z']]
+        for path in (pq_path, ft_path):
+            pd.testing.assert_frame_equal(pandasReader(path, None, usecols=['z'], query_set=queries), df_exp)
+            chunks = list(pandasReader(path, None, usecols=['z'], query_set=queries, chunksize=4))
+            self.assertListEqual([len(c) for c in chunks], [4, 4, 1])
+            pd.testing.assert_frame_equal(pd.concat(chunks), df_exp)
+
+        # --- iterate over chunks with link
+        self.paths = [pq_path]
+        dfs, n_sum = self._read_all(reader='parquet', chunksize=30, usecols=['x'])
+        self.assertListEqual([len(d) for d in dfs], [30, 30, 30, 10])
+        self.assertListEqual(pd.concat(dfs)['x'].tolist(), df['x'].tolist())
+
+    def test_map_reduce(self):
+        from eskapade import ProcessManager, DataStore, ConfigObject, StatusCode, Link
+        from eskapade.analysis import ReadToDf, ValueCounter
+        from eskapade.core import execution
+
+        pm = ProcessManager()
+        settings = pm.service(ConfigObject)
+        settings['analysisName'] = 'test_map_reduce'
+        settings['doNotStoreResults'] = True
+        settings['mapReduceCombineKeys'] = ['counts']
+        chain = pm.add_chain('Read')
+        chain.add_link(ReadToDf(name='read', key='test_output', path=self.paths, reader='csv', shard=True))
+        chain.add_link(ReadToDf(name='read_few', key='few_files', path=self.paths[:2], reader='csv', shard=True))
+        chain.add_link(ReadToDf(name='read_lookup', key='lookup', path=self.paths[0], reader='csv'))
+
+        # worker-specific objects: only the registered key is combined
+        class StoreCounts(Link):
+            def execute(self):
+                ds = pm.service(DataStore)
+                ds['counts'] = {'rows': len(ds['test_output'])}
+                ds['mean_row'] = ds['test_output']['row'].mean()
+                return StatusCode.Success
+        chain.add_link(StoreCounts('store_counts'))
+
+        # objects stored at finalize are combined as well
+        chain.add_link(ValueCounter(name='count_files', read_key='test_output', columns=['file'],
+                                    store_key_counts='file_counts', store_at_finalize=True))
+        settings['mapReduceCombineKeys'].append('file_counts')
+
+        status = execution.run_map_reduce(3)
+        self.assertEqual(status, StatusCode.Success)
+
+        # data of all files combined; the lookup table is read by every worker and not combined
+        ds = pm.service(DataStore)
+        df = ds['test_output']
+        self.assertListEqual(sorted(df['file'].unique().tolist()), [0, 1, 2, 3])
+        self.assertEqual(len(df), 5 + 6 + 7 + 8)
+        self.assertEqual(ds['n_test_output'], len(df))
+        self.assertEqual(len(ds['few_files']), 5 + 6)
+        self.assertEqual(ds['n_few_files'], 5 + 6)
+        self.assertEqual(len(ds['lookup']), 5)
+        self.assertEqual(ds['n_lookup'], 5)
+        self.assertDictEqual(ds['counts'], {'rows': len(df)})
+        self.assertDictEqual(ds['file_counts']['file'].counts, dict(((i,), 5 + i) for i in range(4)))
+        # not combined: value of first worker, which reads files 0 and 3
+        self.assertAlmostEqual(ds['mean_row'], (sum(range(5)) + sum(range(8))) / 13.)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+        from eskapade.core import execution
+        execution.reset_eskapade()
@@ -0,0 +1,86 @@
+import unittest
+import numpy as np
+import pandas as pd
+
+from eskapade.tests.observers import TestCaseObservable
+
+
+class StatisticsTest(unittest.TestCase, TestCaseObservable):
+
+    def setUp(self):
+        # --- setup a dummy data frame with missing values
+        rng = np.random.RandomState(42)
+        n = 1000
+        self.df = pd.DataFrame({'x': rng.normal(size=n), 'i': rng.randint(0, 20, n),
+                                't': pd.Timestamp('2017-01-01') + pd.to_timedelta(rng.randint(0, 10 ** 6, n), 's'),
+                                'c': rng.choice(list('abc'), n)})
+        self.df.loc[::7, 'x'] = np.nan
+        self.df.loc[::11, 't'] = pd.NaT
+
+    def test_column_stats(self):
+        from eskapade.analysis.statistics import column_stats, numeric_values, weighted_quantile, QUANT_PROBS
+
+        values = np.column_stack([numeric_values(self.df[c]) for c in ('x', 'i', 't')])
+        weights = np.arange(len(values)) % 3 + 1.
+        for w in (None, weights):
+            stats = column_stats(values, w, QUANT_PROBS)
+            for it in range(values.shape[1]):
+                filled = ~np.isnan(values[:, it])
+                col, col_w = values[filled, it], w[filled] if w is not None else None
+                self.assertEqual(stats['n_filled'][it], filled.sum())
+                self.assertAlmostEqual(stats['mean'][it] / np.average(col, weights=col_w), 1.)
+                self.assertAlmostEqual(stats['std'][it] / np.sqrt(np.cov(col, aweights=col_w, ddof=0)), 1.)
+
+                # quantiles by sorting
+                sorted_idx = np.argsort(col)
+                sorted_w = col_w[sorted_idx] if w is not None else np.ones(len(col))
+                pn = (np.cumsum(sorted_w) - 0.5 * sorted_w) / sorted_w.sum()
+                np.testing.assert_allclose(stats['quantiles'][:, it], np.interp(QUANT_PROBS, pn, col[sorted_idx]))
+                np.testing.assert_allclose(weighted_quantile(col, col_w, QUANT_PROBS), stats['quantiles'][:, it])
+
+    def test_frame_stats(self):
+        from eskapade.analysis.statistics import ArrayStats, FrameStats
+
+        frame_stats = FrameStats(self.df, labels={'x': 'X'})
+        frame_stats.create_stats()
+        hists = frame_stats.make_histograms(var_bins={'i': 10}, default_bins=20)
+        for col in self.df.columns:
+            stats = ArrayStats(self.df, col, label='X' if col == 'x' else '')
+            hist = stats.make_histogram(var_bins=10 if col == 'i' else 20, create_mpv_stat=False)
+            np.testing.assert_array_equal(hists[col][0], hist[0])
+            self.assertEqual(len(hists[col][1]), len(hist[1]))
+            self.assertListEqual(frame_stats[col].stat_vars, stats.stat_vars + ['mpv'])
+            self.assertEqual(frame_stats[col].print_lines[:3], stats.print_lines[:3])
+
+    def test_stream_stats(self):
+        from eskapade.analysis.statistics import FrameStats, StreamStats, NUM_STAT_VARS
+
+        frame_stats = FrameStats(self.df)
+        frame_stats.create_stats()
+
+        # --- summaries of chunks, partly merged from summaries of other chunks
+        stream_stats = StreamStats(sketch_size=50, random_state=42)
+        other_stats = StreamStats(sketch_size=50, random_state=43)
+        for it, start in enumerate(range(0, len(self.df), 150)):
+            (stream_stats if it % 2 else other_stats).update(self.df.iloc[start:start + 150])
+        stream_stats.merge(other_stats)
+        stream_stats.create_stats()
+        hists = stream_stats.make_histograms()
+
+        for col in self.df.columns:
+            exact, approx = frame_stats[col].stat_vals, stream_stats[col].stat_vals
+            for stat_var in ('count', 'filled', 'nan'):
+                self.assertEqual(exact.get(stat_var), approx.get(stat_var))
+            self.assertAlmostEqual(exact['distinct'][0] / approx['distinct'][0], 1., delta=0.05)
+            if col == 'c':
+                self.assertEqual(sum(hists[col][0]), exact['filled'][0])
+                continue
+            exact_vals = [exact[v][0].value if col == 't' and v != 'std' else exact[v][0] for v in NUM_STAT_VARS]
+            approx_vals = [approx[v][0].value if col == 't' and v != 'std' else approx[v][0] for v in NUM_STAT_VARS]
+            np.testing.assert_allclose(approx_vals[:4], exact_vals[:4], rtol=1e-9)
+            spread = exact_vals[-1] - exact_vals[4]
+            np.testing.assert_allclose(approx_vals[4:], exact_vals[4:], rtol=0, atol=0.1 * spread)
+
+    def tearDown(self):
+        from eskapade.core import execution
+        execution.reset_eskapade()
@@ -168,26 +168,34 @@ class RandomSeeds:
 # configuration variables
 CONFIG_VARS = collections.OrderedDict()
 CONFIG_VARS['run'] = ['analysisName', 'version', 'macro', 'batchMode', 'interactive', 'logLevel', 'logFormat',
-                      'doCodeProfiling']
+                      'doCodeProfiling', 'doLinkProfiling', 'mapReduceWorkers', 'mapReduceCombineKeys', 'reduceMacro']
 CONFIG_VARS['chains'] = ['beginWithChain', 'endWithChain', 'storeResultsEachChain', 'storeResultsOneChain',
-                         'doNotStoreResults']
+                         'doNotStoreResults', 'storeResultsFormat', 'storeResultsLinkUnmodified', 'parallelChains',
+                         'parallelChainsMode']
 CONFIG_VARS['file_io'] = ['esRoot', 'resultsDir', 'dataDir', 'macrosDir', 'templatesDir']
+CONFIG_VARS['data_store'] = ['dataStoreSpillDir', 'dataStoreSpillThreshold', 'dataStoreMemoryBudget']
 CONFIG_VARS['db_io'] = ['all_mongo_collections']
 CONFIG_VARS['rand_gen'] = ['seeds']
 CONFIG_TYPES = dict(version=int, batchMode=bool, interactive=bool, storeResultsEachChain=bool, doNotStoreResults=bool,
-                    all_mongo_collections=list)
+                    storeResultsLinkUnmodified=bool, all_mongo_collections=list, doLinkProfiling=bool,
+                    mapReduceWorkers=int, mapReduceCombineKeys=list, parallelChains=int, dataStoreSpillThreshold=int,
+                    dataStoreMemoryBudget=int)
 CONFIG_DEFAULTS = dict(version=0, batchMode=True, interactive=False, logLevel=logging.INFO,
                        logFormat='%(asctime)s %(levelname)s [%(module)s]: %(message)s',
-                       doCodeProfiling=None, storeResultsEachChain=False, doNotStoreResults=False, esRoot='',
-                       resultsDir='results', dataDir='data', macrosDir='tutorials', templatesDir='templates',
-                       seeds=RandomSeeds())
+                       doCodeProfiling=None, doLinkProfiling=False, mapReduceWorkers=0, storeResultsEachChain=False,
+                       doNotStoreResults=False, storeResultsFormat='pickle', storeResultsLinkUnmodified=False,
+                       parallelChains=0, parallelChainsMode='process', esRoot='', resultsDir='results', dataDir='data',
+                       macrosDir='tutorials', templatesDir='templates',
+                       dataStoreSpillThreshold=2 ** 26, seeds=RandomSeeds())
 
 # user options in command-line arguments
 USER_OPTS = collections.OrderedDict()
 USER_OPTS['run'] = ['analysis_name', 'analysis_version', 'batch_mode', 'interactive', 'log_level', 'log_format',
-                    'unpickle_config', 'profile', 'conf_var']
-USER_OPTS['chains'] = ['begin_with', 'end_with', 'single_chain', 'store_all', 'store_one', 'store_none']
+                    'unpickle_config', 'profile', 'profile_links', 'map_reduce', 'reduce_macro', 'conf_var']
+USER_OPTS['chains'] = ['begin_with', 'end_with', 'single_chain', 'store_all', 'store_one', 'store_none',
+                       'store_format', 'parallel_chains', 'parallel_mode']
 USER_OPTS['file_io'] = ['results_dir', 'data_dir', 'macros_dir', 'templates_dir']
+USER_OPTS['data_store'] = ['spill_dir', 'memory_budget']
 USER_OPTS['rand_gen'] = ['seed']
 USER_OPTS_SHORT = dict(analysis_name='n', analysis_version='v', interactive='i', log_level='L', conf_var='c',
                        begin_with='b', end_with='e', single_chain='s')
@@ -211,6 +219,13 @@ USER_OPTS_KWARGS = dict(analysis_name=dict(help='set name of analysis in run',
                                      choices=['stdname', 'nfl', 'pcalls', 'file', 'calls', 'time', 'line',
                                               'cumulative', 'module', 'name'],
                                      metavar='{stdname,nfl,pcalls,file,calls,time,line,cumulative,module,name}'),
+                        profile_links=dict(help='report timing and memory usage of chains and links',
+                                           action='store_true'),
+                        map_reduce=dict(help='run chains in N map processes, with input split over processes',
+                                        type=int,
+                                        metavar='N'),
+                        reduce_macro=dict(help='run chains of REDUCE_MACRO on combined output of map processes',
+                                          metavar='REDUCE_MACRO'),
                         conf_var=dict(help='set configuration variable',
                                       action='append',
                                       metavar='KEY=VALUE'),
@@ -226,6 +241,15 @@ USER_OPTS_KWARGS = dict(analysis_name=dict(help='set name of analysis in run',
                                        metavar='CHAIN_NAME'),
                         store_none=dict(help='do not store run-process services',
                                         action='store_true'),
+                        store_format=dict(help='set storage format of run-process services',
+                                          choices=['pickle', 'columnar'],
+                                          metavar='{pickle,columnar}'),
+                        parallel_chains=dict(help='execute independent chains concurrently with N workers',
+                                             type=int,
+                                             metavar='N'),
+                        parallel_mode=dict(help='execute concurrent chains in threads or forked processes',
+                                           choices=['thread', 'process'],
+                                           metavar='{thread,process}'),
                         results_dir=dict(help='set directory path for results output',
                                          metavar='RESULTS_DIR'),
                         data_dir=dict(help='set directory path for data',
@@ -234,13 +258,22 @@ USER_OPTS_KWARGS = dict(analysis_name=dict(help='set name of analysis in run',
                                         metavar='MACROS_DIR'),
                         templates_dir=dict(help='set directory path for template files',
                                            metavar='TEMPLATES_DIR'),
+                        spill_dir=dict(help='spill large data-store objects to memory-mapped files in SPILL_DIR',
+                                       metavar='SPILL_DIR'),
+                        memory_budget=dict(help='set memory budget in bytes for large data-store objects',
+                                           type=int,
+                                           metavar='BYTES'),
                         seed=dict(help='set seed for random-number generation',
                                   action='append',
                                   metavar='KEY=SEED'))
 USER_OPTS_CONF_KEYS = dict(analysis_name='analysisName', analysis_version='analysisVersion', batch_mode='batchMode',
                            log_level='logLevel', log_format='logFormat', profile='doCodeProfiling',
+                           profile_links='doLinkProfiling', map_reduce='mapReduceWorkers', reduce_macro='reduceMacro',
                            begin_with='beginWithChain', end_with='endWithChain', store_all='storeResultsEachChain',
-                           store_one='storeResultsOneChain', store_none='doNotStoreResults', seed='seeds')
+                           store_one='storeResultsOneChain', store_none='doNotStoreResults',
+                           store_format='storeResultsFormat', parallel_chains='parallelChains',
+                           parallel_mode='parallelChainsMode', spill_dir='dataStoreSpillDir',
+                           memory_budget='dataStoreMemoryBudget', seed='seeds')
 
 
 def set_opt_var(opt_key, settings, args):
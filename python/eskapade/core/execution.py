@@ -17,10 +17,17 @@ import logging
 import cProfile
 import pstats
 import io
+import numbers
+import multiprocessing
+from collections import Counter, OrderedDict
+from functools import reduce
+
+import numpy as np
+import pandas as pd
 
 import eskapade.utils
 from .process_manager import ProcessManager
-from .process_services import ConfigObject
+from .process_services import ConfigObject, DataStore
 
 proc_mgr = ProcessManager()
 
@@ -87,6 +94,10 @@ def run_eskapade(settings=None):
     if not settings['analysisName']:
         raise RuntimeError('analysis name is not set')
 
+    # split input over worker processes for a map/reduce run
+    if settings.get('mapReduceWorkers'):
+        return run_map_reduce(settings['mapReduceWorkers'])
+
     # standard execution from now on
 
     # initialize
@@ -124,3 +135,206 @@ def run_eskapade(settings=None):
     log.info('\n\n * * * Leaving Eskapade. Bye! * * *\n')
 
     return status
+
+
+def _combine_arrays(objs):
+    """Concatenate data frames, series, or arrays"""
+
+    if isinstance(objs[0], (pd.DataFrame, pd.Series)):
+        return pd.concat(objs)
+    return np.concatenate(objs)
+
+
+def _combine_dicts(objs):
+    """Combine dictionaries by combining the objects per key"""
+
+    keys = OrderedDict((k, None) for obj in objs for k in obj)
+    combined = [(k, combine_objects([obj[k] for obj in objs if k in obj])) for k in keys]
+    try:
+        return type(objs[0])(combined)
+    except TypeError:
+        return dict(combined)
+
+
+def _combine_root_objects(objs):
+    """Add ROOT histograms"""
+
+    combined = objs[0].Clone()
+    for obj in objs[1:]:
+        combined.Add(obj)
+    return combined
+
+
+# combiners of map outputs: the first combiner with a predicate that holds for the outputs is used
+MAP_REDUCE_COMBINERS = [(lambda o: isinstance(o, (pd.DataFrame, pd.Series, np.ndarray)), _combine_arrays),
+                        (lambda o: isinstance(o, Counter), lambda objs: reduce(lambda a, b: a + b, objs)),
+                        (lambda o: isinstance(o, dict), _combine_dicts),
+                        (lambda o: isinstance(o, list), lambda objs: [v for obj in objs for v in obj]),
+                        (lambda o: isinstance(o, numbers.Number) and not isinstance(o, bool), sum),
+                        (lambda o: hasattr(o, 'Add') and hasattr(o, 'Clone'), _combine_root_objects),
+                        (lambda o: type(o).__module__.split('.')[0] not in ('builtins', 'numpy', 'pandas')
+                         and hasattr(type(o), '__add__'), lambda objs: reduce(lambda a, b: a + b, objs))]
+
+
+def combine_objects(objs):
+    """Combine outputs of map workers
+
+    Data frames and arrays are concatenated, counters and numbers are
+    summed, dictionaries are combined per key, lists are concatenated, and
+    histograms (ROOT, Histogrammar, Eskapade) and other objects with an add
+    operator are added.
+
+    :param list objs: outputs of the workers, in worker order
+    :returns: combined output
+    :raises: TypeError if the objects cannot be combined
+    """
+
+    if len(objs) == 1:
+        return objs[0]
+    for predicate, combiner in MAP_REDUCE_COMBINERS:
+        if all(predicate(o) for o in objs):
+            return combiner(objs)
+    raise TypeError('unable to combine objects of type "{}"'.format(type(objs[0]).__name__))
+
+
+def combine_outputs(outputs, combine_keys=()):
+    """Combine data-store objects set by map workers
+
+    Only objects with the specified keys are combined, with
+    combine_objects.  Other objects, e.g. settings or lookup tables that
+    every worker computes or reads, are taken from the first worker that
+    set them, with a warning if more than one worker set them.
+
+    :param list outputs: dictionaries of objects set by the workers, in worker order
+    :param combine_keys: keys of objects that are combined with combine_objects
+    :returns: combined objects
+    :rtype: OrderedDict
+    :raises: RuntimeError if objects with specified keys cannot be combined
+    """
+
+    log = logging.getLogger(__name__)
+    combined, not_combined = OrderedDict(), []
+    for key in OrderedDict((k, None) for objs in outputs for k in objs):
+        objs = [objs[key] for objs in outputs if key in objs]
+        if key in combine_keys:
+            try:
+                combined[key] = combine_objects(objs)
+            except TypeError as exc:
+                log.critical('Unable to combine outputs "%s" of map workers: %s', str(key), str(exc))
+                raise RuntimeError('unable to combine outputs of map workers')
+        else:
+            combined[key] = objs[0]
+            if len(objs) > 1:
+                not_combined.append(str(key))
+    if not_combined:
+        log.warning('Outputs of map workers not combined, taken from first worker: %s', ', '.join(not_combined))
+    return combined
+
+
+def _run_map_worker(shard, n_shards):
+    """Execute chains in a map worker for one part of the input
+
+    The process manager is initialized, executes its chains and is
+    finalized before the data-store objects set by the worker are
+    collected.
+
+    :param int shard: index of input part
+    :param int n_shards: number of input parts
+    :returns: status of the execution and data-store objects set by the worker
+    :rtype: (StatusCode, dict)
+    """
+
+    # do not persist results of the worker
+    settings = proc_mgr.service(ConfigObject)
+    settings['doNotStoreResults'] = True
+
+    # select input part
+    for chain in proc_mgr.chains:
+        for link in chain.links:
+            if link.num_shards():
+                link.select_shard(shard, n_shards)
+
+    # run chains and collect output
+    ds = proc_mgr.service(DataStore)
+    ds.reset_modified_keys()
+    status = proc_mgr.initialize()
+    if not status.isFailure():
+        status = proc_mgr.execute_all()
+    if not status.isFailure():
+        status = proc_mgr.finalize()
+    if status.isFailure():
+        return status, None
+    unmodified = ds.unmodified_keys()
+    return status, OrderedDict((k, ds[k]) for k in ds.keys() if k not in unmodified)
+
+
+def run_map_reduce(n_workers):
+    """Run chains in map/reduce mode
+
+    The chains of the configuration macro, which has been executed, are
+    run in forked worker processes.  The input of the links that split
+    their input, e.g. the files of ReadToDf with shard set, is split over
+    the workers.  The data-store objects set by the workers are combined
+    with combine_outputs in the process manager: the outputs of these links
+    and the objects with keys in the mapReduceCombineKeys setting are
+    combined.  If a reduce macro is configured, its chains are run on the
+    combined data store.
+
+    :param int n_workers: maximum number of worker processes
+    :returns: status of the execution
+    :rtype: StatusCode
+    """
+
+    log = logging.getLogger(__name__)
+    settings = proc_mgr.service(ConfigObject)
+
+    # determine number of workers from input parts
+    n_shards = max([link.num_shards() or 0 for chain in proc_mgr.chains for link in chain.links] + [0])
+    if not n_shards:
+        log.critical('No links with input that is split over map workers, e.g. ReadToDf with shard set')
+        raise RuntimeError('no input for map/reduce run')
+    n_workers = min(n_workers, n_shards)
+    log.info('Running map step with %d workers', n_workers)
+
+    # run map step
+    with multiprocessing.get_context('fork').Pool(n_workers) as pool:
+        results = pool.starmap(_run_map_worker, [(shard, n_workers) for shard in range(n_workers)])
+    for shard, (status, _) in enumerate(results):
+        if status.isFailure():
+            log.error('Map worker %d failed with status "%s"', shard, str(status))
+            return status
+
+    # combine map outputs in data store
+    combine_keys = set(settings.get('mapReduceCombineKeys') or [])
+    for chain in proc_mgr.chains:
+        for link in chain.links:
+            if link.num_shards() and link.data_keys():
+                combine_keys |= link.data_keys()[1]
+    ds = proc_mgr.service(DataStore)
+    ds.update(combine_outputs([objs for _, objs in results], combine_keys))
+
+    # run reduce step
+    last_map_chain = proc_mgr.chains[-1].name if proc_mgr.chains else None
+    proc_mgr.remove_chains()
+    if settings.get('reduceMacro'):
+        log.info('Running reduce step')
+        proc_mgr.execute_macro(settings['reduceMacro'])
+    status = proc_mgr.initialize()
+    if status.isFailure():
+        return status
+    if proc_mgr.chains:
+        status = proc_mgr.execute_all()
+        if status.isFailure():
+            return status
+    elif not settings.get('doNotStoreResults') and last_map_chain:
+        # persist combined output with the name of the last map chain
+        proc_mgr.persist_services(io_conf=settings.io_conf(), chain=last_map_chain,
+                                  backend=settings.get('storeResultsFormat'))
+
+    status = proc_mgr.finalize()
+    if status.isFailure():
+        return status
+
+    log.info('\n\n * * * Leaving Eskapade. Bye! * * *\n')
+
+    return status
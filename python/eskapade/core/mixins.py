@@ -1,11 +1,12 @@
 # **********************************************************************************
 # * Project: Eskapade - A python-based package for data analysis                   *
-# * Classes: ArgumentsMixin, LoggingMixin                                          *
+# * Classes: ArgumentsMixin, LoggingMixin, TimerMixin                              *
 # * Created: 2016/11/08                                                            *
 # * Description:                                                                   *
 # *          Base classes of Link                                                  *
 # *          ArgumentsMixin: allows attributes to be accessed as dict items.       *
 # *          LoggingMixin: logger functionality for the class.                     *
+# *          TimerMixin: wall time, CPU time and memory usage of the class.        *
 # *                                                                                *
 # * Authors:                                                                       *
 # *      KPMG Big Data team, Amstelveen, The Netherlands                           *
@@ -16,8 +17,30 @@
 # **********************************************************************************
 
 import logging
+import sys
+import time
 import timeit
 
+try:
+    import resource
+except ImportError:
+    # resource usage is not available on all platforms
+    resource = None
+
+
+def peak_rss():
+    """Get peak resident set size of the current process
+
+    :returns: peak RSS in bytes; zero if not available
+    :rtype: int
+    """
+
+    if resource is None:
+        return 0
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return max_rss if sys.platform == 'darwin' else max_rss * 1024
+
 
 class ArgumentsMixin(object):
     """Mixin base class for argument parsing
@@ -142,7 +165,12 @@ class LoggingMixin(object):
 
 
 class TimerMixin(object):
-    """Mixin base class for timing"""
+    """Mixin base class for timing
+
+    Besides the wall time, the timer keeps track of the CPU time, the
+    increase of the peak resident set size of the process and the number
+    of timed intervals.
+    """
 
     def __init__(self):
         """Initialize timer"""
@@ -150,6 +178,11 @@ class TimerMixin(object):
         self._start_time = 0.
         self._stop_time = 0.
         self._total_time = 0.
+        self._start_cpu_time = 0.
+        self._total_cpu_time = 0.
+        self._start_rss = 0
+        self._rss_delta = 0
+        self._n_timer_calls = 0
 
     def start_timer(self):
         """Start run timer
@@ -162,6 +195,8 @@ class TimerMixin(object):
         :rtype: float
         """
 
+        self._start_cpu_time = time.process_time()
+        self._start_rss = peak_rss()
         self._start_time = timeit.default_timer()
         return self._start_time
 
@@ -180,6 +215,9 @@ class TimerMixin(object):
 
         diff_time = self._stop_time - (start_time if start_time is not None else self._start_time)
         self._total_time += diff_time
+        self._total_cpu_time += time.process_time() - self._start_cpu_time
+        self._rss_delta += max(peak_rss() - self._start_rss, 0)
+        self._n_timer_calls += 1
 
         return diff_time
 
@@ -191,3 +229,30 @@ class TimerMixin(object):
         """
 
         return self._total_time
+
+    def total_cpu_time(self):
+        """Return the total CPU time
+
+        :returns: total CPU time of the process in seconds
+        :rtype: float
+        """
+
+        return self._total_cpu_time
+
+    def peak_rss_delta(self):
+        """Return the increase of the peak resident set size
+
+        :returns: total increase of the peak RSS of the process in bytes
+        :rtype: int
+        """
+
+        return self._rss_delta
+
+    def n_timer_calls(self):
+        """Return the number of timed intervals
+
+        :returns: number of times the timer was stopped
+        :rtype: int
+        """
+
+        return self._n_timer_calls
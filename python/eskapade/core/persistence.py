@@ -4,7 +4,7 @@
 # * Created: 2016/11/08                                                            *
 # * Description:                                                                   *
 # *      Utility class and functions to get correct io path,                       *
-# *      used for persistence of results                                           *
+# *      used for persistence of results, and columnar persistence of objects      *
 # *                                                                                *
 # * Authors:                                                                       *
 # *      KPMG Big Data team, Amstelveen, The Netherlands                           *
@@ -17,9 +17,14 @@
 import os
 import re
 import glob
+import pickle
+import shutil
 import logging
 from collections import defaultdict
 
+import numpy as np
+import pandas as pd
+
 # IO locations
 IO_LOCS = dict(results='results_dir', data='data_dir', macros='macros_dir', input_data='data_dir',
                records='data_dir', ana_results='results_dir', ana_plots='results_dir', proc_service_data='results_dir',
@@ -55,6 +60,20 @@ def create_dir(dir_path):
     os.makedirs(dir_path)
 
 
+def remove_file(file_path):
+    """Function to remove file before it is written
+
+    Persisted files may be hard-linked from other storage directories.
+    Removing the file breaks the link, such that writing the new file does
+    not change the linked copies.
+
+    :param str file_path: file path
+    """
+
+    if os.path.lexists(file_path):
+        os.unlink(file_path)
+
+
 def io_dir(io_type, io_conf):
     """Functions to construct I/O paths
 
@@ -152,3 +171,225 @@ class IoConfig(dict):
         # initialize dictionary
         dict.__init__(self, **input_config)
         self['analysis_version'] = str(self['analysis_version'])
+
+
+class ColumnarStore(object):
+    """Columnar persistence of a dictionary of objects
+
+    Objects are stored per key in a directory.  NumPy arrays and the
+    columns of Pandas data frames and series with a NumPy data type are
+    stored as binary ".npy" files, which can be memory-mapped when they are
+    loaded.  All other objects and columns are pickled.  A manifest
+    describes the stored objects, such that keys can be loaded
+    individually.
+
+    >>> store = ColumnarStore('/path/to/dir')
+    >>> store.write({'df': df, 'arr': arr, 'n_df': 42})
+    >>> df = store.load('df', mmap_mode='c')
+    """
+
+    manifest_name = 'manifest.pkl'
+
+    def __init__(self, dir_path):
+        """Initialize columnar store
+
+        :param str dir_path: path of storage directory
+        """
+
+        self.dir_path = dir_path
+        self._manifest = None
+
+    @property
+    def manifest(self):
+        """Descriptions of stored objects by key
+
+        :rtype: dict
+        """
+
+        if self._manifest is None:
+            manifest_path = os.path.join(self.dir_path, self.manifest_name)
+            if not os.path.isfile(manifest_path):
+                log.critical('no manifest found in columnar store "%s"', self.dir_path)
+                raise RuntimeError('no manifest found in columnar store')
+            with open(manifest_path, 'rb') as manifest_file:
+                self._manifest = pickle.load(manifest_file)
+        return self._manifest
+
+    def keys(self):
+        """Get keys of stored objects
+
+        :rtype: list
+        """
+
+        return list(self.manifest['objects'].keys())
+
+    def write(self, objs, prev_store=None, unchanged=()):
+        """Write objects to store
+
+        Objects that did not change since they were written to a previous
+        store are not serialized again: their files are hard-linked from the
+        previous store.  The manifest is written after all objects are
+        stored, so an incompletely written store cannot be loaded.
+
+        :param dict objs: objects to store by key
+        :param ColumnarStore prev_store: store to which unchanged objects were written previously
+        :param unchanged: keys of objects that did not change since they were written to previous store
+        """
+
+        create_dir(self.dir_path)
+        prev_keys = set(prev_store.keys()) if prev_store is not None else set()
+        manifest = dict(objects={})
+        for obj_idx, key in enumerate(objs.keys()):
+            if key in unchanged and key in prev_keys:
+                manifest['objects'][key] = self.link_object(prev_store, key, str(obj_idx))
+            else:
+                manifest['objects'][key] = self.write_object(objs[key], str(obj_idx))
+        remove_file(os.path.join(self.dir_path, self.manifest_name))
+        with open(os.path.join(self.dir_path, self.manifest_name), 'wb') as manifest_file:
+            pickle.dump(manifest, manifest_file, protocol=pickle.HIGHEST_PROTOCOL)
+        self._manifest = manifest
+
+    def link_object(self, prev_store, key, base_name):
+        """Link files of object from previous store
+
+        Files are hard-linked if possible and copied otherwise, e.g. if the
+        stores are on different file systems.
+
+        :param ColumnarStore prev_store: store in which object was written
+        :param key: key of object in previous store
+        :param str base_name: base name of object files
+        :returns: description of stored object
+        :rtype: dict
+        """
+
+        def link_file(file_name):
+            new_name = base_name + file_name[file_name.index('.'):]
+            src = os.path.join(prev_store.dir_path, file_name)
+            dst = os.path.join(self.dir_path, new_name)
+            remove_file(dst)
+            try:
+                os.link(src, dst)
+            except OSError:
+                shutil.copyfile(src, dst)
+            return new_name
+
+        entry = dict(prev_store.manifest['objects'][key])
+        if 'files' in entry:
+            entry['files'] = [link_file(f) for f in entry['files']]
+        for file_key in ('file', 'index'):
+            if file_key in entry:
+                entry[file_key] = link_file(entry[file_key])
+        return entry
+
+    def write_object(self, obj, base_name):
+        """Write single object to store
+
+        :param obj: object to store
+        :param str base_name: base name of object files
+        :returns: description of stored object
+        :rtype: dict
+        """
+
+        if isinstance(obj, pd.DataFrame):
+            cols = [self._write_array(obj.iloc[:, col_idx].values, '{0:s}.{1:d}'.format(base_name, col_idx))
+                    for col_idx in range(obj.shape[1])]
+            return dict(kind='frame', files=cols, columns=obj.columns,
+                        index=self._write_pickle(obj.index, base_name + '.index'))
+        if isinstance(obj, pd.Series):
+            return dict(kind='series', file=self._write_array(obj.values, base_name), name=obj.name,
+                        index=self._write_pickle(obj.index, base_name + '.index'))
+        if isinstance(obj, np.ndarray) and type(obj) in (np.ndarray, np.memmap):
+            return dict(kind='ndarray', file=self._write_array(obj, base_name))
+        return dict(kind='pickle', file=self._write_pickle(obj, base_name))
+
+    def load(self, key, mmap_mode=None):
+        """Load stored object
+
+        :param key: key of stored object
+        :param str mmap_mode: memory-map mode for NumPy arrays, e.g. "r" or "c"; default is None (read into memory)
+        :returns: loaded object
+        """
+
+        return self.load_entry(self.manifest['objects'][key], mmap_mode)
+
+    def load_entry(self, entry, mmap_mode=None):
+        """Load object from its description
+
+        :param dict entry: description of stored object, as returned by write_object
+        :param str mmap_mode: memory-map mode for NumPy arrays
+        :returns: loaded object
+        """
+
+        kind = entry['kind']
+        if kind == 'frame':
+            # do not copy (memory-mapped) columns into consolidated blocks
+            index = self._read_file(entry['index'])
+            cols = [self._read_file(f, mmap_mode) for f in entry['files']]
+            df = pd.DataFrame(dict(enumerate(cols)), index=index, columns=range(len(cols)), copy=False)
+            df.columns = entry['columns']
+            return df
+        if kind == 'series':
+            return pd.Series(self._read_file(entry['file'], mmap_mode), index=self._read_file(entry['index']),
+                             name=entry['name'])
+        return self._read_file(entry['file'], mmap_mode)
+
+    def load_all(self, mmap_mode=None):
+        """Load all stored objects
+
+        :param str mmap_mode: memory-map mode for NumPy arrays
+        :returns: loaded objects by key
+        :rtype: dict
+        """
+
+        return dict((key, self.load(key, mmap_mode)) for key in self.keys())
+
+    def files(self, key):
+        """Get names of files of stored object
+
+        :param key: key of stored object
+        :rtype: list
+        """
+
+        return self.entry_files(self.manifest['objects'][key])
+
+    @staticmethod
+    def entry_files(entry):
+        """Get names of files of stored object from its description
+
+        :param dict entry: description of stored object, as returned by write_object
+        :rtype: list
+        """
+
+        return entry.get('files', []) + [entry[k] for k in ('file', 'index') if k in entry]
+
+    def _write_array(self, arr, base_name):
+        """Write array to binary file, or to Pickle file if it has no NumPy data type"""
+
+        if not isinstance(arr, np.ndarray) or arr.dtype.hasobject:
+            return self._write_pickle(arr, base_name)
+        file_name = base_name + '.npy'
+        remove_file(os.path.join(self.dir_path, file_name))
+        np.save(os.path.join(self.dir_path, file_name), arr, allow_pickle=False)
+        return file_name
+
+    def _write_pickle(self, obj, base_name):
+        """Write object to Pickle file"""
+
+        file_name = base_name + '.pkl'
+        remove_file(os.path.join(self.dir_path, file_name))
+        with open(os.path.join(self.dir_path, file_name), 'wb') as obj_file:
+            pickle.dump(obj, obj_file, protocol=pickle.HIGHEST_PROTOCOL)
+        return file_name
+
+    def _read_file(self, file_name, mmap_mode=None):
+        """Read object from binary or Pickle file"""
+
+        path = os.path.join(self.dir_path, file_name)
+        if file_name.endswith('.npy'):
+            return np.load(path, mmap_mode=mmap_mode, allow_pickle=False)
+        with open(path, 'rb') as obj_file:
+            return pickle.load(obj_file)
+
+
+# persistence backends for process services that are persisted by key
+PERSIST_BACKENDS = dict(columnar=ColumnarStore)
@@ -15,14 +15,20 @@
 # * LICENSE.                                                                       *
 # **********************************************************************************
 
+import concurrent.futures
+import csv
 import importlib
+import json
+import multiprocessing
 import os
 import glob
+import shutil
+from collections import OrderedDict
 
 from . import persistence
 from .mixins import LoggingMixin, TimerMixin
 from .definitions import StatusCode
-from .process_services import ProcessService, ConfigObject
+from .process_services import ProcessService, ConfigObject, DataStore
 from .run_elements import Chain
 
 
@@ -212,7 +218,7 @@ class ProcessManager(LoggingMixin, TimerMixin):
             io_conf['analysis_version'] = '0'
         return io_conf
 
-    def import_services(self, io_conf, chain=None, force=None, no_force=[]):
+    def import_services(self, io_conf, chain=None, force=None, no_force=[], lazy=False):
         """Import process services from files
 
         :param dict io_conf: I/O config as returned by ConfigObject.io_conf
@@ -220,6 +226,7 @@ class ProcessManager(LoggingMixin, TimerMixin):
         :param force: force import if service already registered
         :type force: bool or list
         :param list no_force: do not force import of services in this list
+        :param bool lazy: load contents of services persisted per key only when they are accessed
         """
 
         # parse I/O config
@@ -244,9 +251,11 @@ class ProcessManager(LoggingMixin, TimerMixin):
             # use data from latest chain if not specified
             chain = 'latest'
 
-        # get list of persisted files
+        # get list of persisted files and backend directories
         base_path = persistence.io_dir('proc_service_data', io_conf)
         serv_paths = glob.glob('{0:s}/{1:s}/*.pkl'.format(base_path, chain))
+        serv_paths += sorted(p for p in glob.glob('{0:s}/{1:s}/*.*'.format(base_path, chain))
+                             if os.path.isdir(p) and os.path.splitext(p)[1][1:] in persistence.PERSIST_BACKENDS)
         self.log().debug('Importing process services from "%s/%s" (found %d files)', base_path, chain, len(serv_paths))
 
         # read and register services
@@ -271,16 +280,24 @@ class ProcessManager(LoggingMixin, TimerMixin):
                     self.log().debug('Service "%s" already registered; skipping import of "%s"', str(cls), path)
                     continue
 
-            # read service instance from file
-            inst = cls.import_from_file(path)
+            # read service instance from file or backend directory
+            if os.path.isdir(path):
+                inst = cls.import_from_dir(path, backend=os.path.splitext(path)[1][1:], lazy=lazy)
+            else:
+                inst = cls.import_from_file(path)
             if inst:
                 self.service(inst)
 
-    def persist_services(self, io_conf, chain=None):
+    def persist_services(self, io_conf, chain=None, backend=None, link_unmodified=False):
         """Persist process services in files
 
+        Services that can be persisted per key are stored in a directory with
+        the specified persistence backend.  All other services are pickled.
+
         :param dict io_conf: I/O config as returned by ConfigObject.io_conf
         :param str chain: name of chain for which data is persisted
+        :param str backend: persistence backend for services persisted per key, e.g. "columnar"
+        :param bool link_unmodified: link the pickled data store of the previous chain if it was not modified
         """
 
         # parse I/O config
@@ -316,13 +333,25 @@ class ProcessManager(LoggingMixin, TimerMixin):
         try:
             for path in serv_paths:
                 os.remove(path)
+            for path in glob.glob('{}/*.*'.format(chain_path)):
+                if os.path.isdir(path) and os.path.splitext(path)[1][1:] in persistence.PERSIST_BACKENDS:
+                    shutil.rmtree(path)
         except Exception as exc:
             self.log().critical('Unable to remove previously persisted process services')
             raise exc
 
         # persist services
+        if backend and backend != 'pickle' and backend not in persistence.PERSIST_BACKENDS:
+            self.log().critical('Unknown persistence backend: "%s"', backend)
+            raise RuntimeError('unknown persistence backend specified')
         for cls in self.get_services():
-            self.service(cls).persist_in_file('{0:s}/{1:s}.pkl'.format(chain_path, str(cls)))
+            if backend in persistence.PERSIST_BACKENDS and cls.persist_by_key:
+                self.service(cls).persist_in_dir('{0:s}/{1:s}.{2:s}'.format(chain_path, str(cls), backend), backend)
+            elif cls is DataStore:
+                self.service(cls).persist_in_file('{0:s}/{1:s}.pkl'.format(chain_path, str(cls)),
+                                                  link_unmodified=link_unmodified)
+            else:
+                self.service(cls).persist_in_file('{0:s}/{1:s}.pkl'.format(chain_path, str(cls)))
 
     def execute_macro(self, filename, copyfile=True):
         """Execute an input python configuration file
@@ -476,6 +505,13 @@ class ProcessManager(LoggingMixin, TimerMixin):
                 chain.prevChainName = prevChainName
             prevChainName = chain.name
 
+        # spill large data-store objects to memory-mapped files if configured
+        settings = self.service(ConfigObject)
+        if settings.get('dataStoreSpillDir'):
+            self.service(DataStore).enable_spill(settings['dataStoreSpillDir'],
+                                                 threshold=settings.get('dataStoreSpillThreshold', 2 ** 26),
+                                                 memory_budget=settings.get('dataStoreMemoryBudget'))
+
         # End by print the status of the processManager and the configuration
         # object.
         self.Print()
@@ -498,6 +534,17 @@ class ProcessManager(LoggingMixin, TimerMixin):
         total_time = self.stop_timer()
         self.log().info('Total runtime: {0:.2f} seconds'.format(total_time))
 
+        # report which lazily imported data were actually used
+        if DataStore in self.get_services():
+            self.service(DataStore).print_access_stats()
+
+        # report timing and memory usage of chains and links if configured
+        settings = self.service(ConfigObject)
+        if settings.get('doLinkProfiling'):
+            self.print_profile_report()
+            if not settings.get('doNotStoreResults'):
+                self.persist_profile_report(settings.io_conf())
+
         self.log().debug('Done finalizing process manager')
 
         return StatusCode.Success
@@ -523,6 +570,77 @@ class ProcessManager(LoggingMixin, TimerMixin):
         self.log().info('  Number of registered chains: %d', len(self.chains))
         self.print_chains()
 
+    # columns of profiling report
+    PROFILE_COLUMNS = ('chain', 'link', 'wall_time', 'cpu_time', 'rss_delta', 'n_calls', 'n_rows')
+
+    def profile_report(self):
+        """Get timing and memory usage of executed chains and links
+
+        The report contains one record per chain, followed by the records
+        of the links in the chain.  Chain records have an empty link name.
+        The wall time and CPU time are in seconds and the increase of the
+        peak resident set size (RSS) is in bytes.  For chains, the number of
+        calls is the number of (repeated) executions.  For links, it is the
+        number of execute calls.  The number of rows is determined by
+        Link.count_rows.
+
+        :returns: profiling records
+        :rtype: list
+        """
+
+        report = []
+        for chain in self.chains:
+            if not chain.n_executions:
+                continue
+            report.append(OrderedDict(chain=chain.name, link='', wall_time=chain.total_time(),
+                                      cpu_time=chain.total_cpu_time(), rss_delta=chain.peak_rss_delta(),
+                                      n_calls=chain.n_executions,
+                                      n_rows=max([link.n_rows_processed for link in chain.links] or [0])))
+            for link in chain.links:
+                report.append(OrderedDict(chain=chain.name, link=link.name, wall_time=link.total_time(),
+                                          cpu_time=link.total_cpu_time(), rss_delta=link.peak_rss_delta(),
+                                          n_calls=link.n_timer_calls(), n_rows=link.n_rows_processed))
+        return report
+
+    def print_profile_report(self):
+        """Print timing and memory usage of executed chains and links"""
+
+        report = self.profile_report()
+        if not report:
+            return
+
+        self.log().info('Profile of executed chains and links')
+        self.log().info('  {0:<40s} {1:>10s} {2:>10s} {3:>10s} {4:>7s} {5:>12s}'
+                        .format('chain/link', 'wall [s]', 'CPU [s]', 'RSS [MB]', 'calls', 'rows'))
+        for rec in report:
+            name = '  ' + rec['link'] if rec['link'] else rec['chain']
+            self.log().info('  {0:<40s} {1:>10.3f} {2:>10.3f} {3:>10.1f} {4:>7d} {5:>12d}'
+                            .format(name[:40], rec['wall_time'], rec['cpu_time'], rec['rss_delta'] / 2 ** 20,
+                                    rec['n_calls'], rec['n_rows']))
+
+    def persist_profile_report(self, io_conf, file_name='profile_report'):
+        """Write timing and memory usage of executed chains and links to JSON and CSV files
+
+        :param dict io_conf: I/O configuration
+        :param str file_name: base name of output files
+        :returns: paths of JSON and CSV files
+        :rtype: tuple
+        """
+
+        report = self.profile_report()
+        json_path = persistence.io_path('results_data', io_conf, file_name + '.json')
+        csv_path = persistence.io_path('results_data', io_conf, file_name + '.csv')
+
+        self.log().debug('Writing profiling report to "%s" and "%s"', json_path, csv_path)
+        with open(json_path, 'w') as json_file:
+            json.dump(report, json_file, indent=2)
+        with open(csv_path, 'w', newline='') as csv_file:
+            writer = csv.DictWriter(csv_file, fieldnames=self.PROFILE_COLUMNS)
+            writer.writeheader()
+            writer.writerows(report)
+
+        return json_path, csv_path
+
     def print_services(self):
         """Print registered process services"""
 
@@ -577,13 +695,17 @@ class ProcessManager(LoggingMixin, TimerMixin):
         if begin > 0:
             # import services from previous chain, persisted in a previous run
             try:
-                self.import_services(io_conf=settings.io_conf(), chain=self.chains[begin].prevChainName, force=False)
+                self.import_services(io_conf=settings.io_conf(), chain=self.chains[begin].prevChainName, force=False,
+                                     lazy=True)
             except Exception as exc:
                 self.log().error('Unable to import services persisted for "%s":', self.chains[begin].prevChainName)
                 self.log().error('Caught exception: "%s"', str(exc))
                 return StatusCode.Failure
 
         # execute chains
+        if settings.get('parallelChains'):
+            return self.execute_parallel(self.chains[begin:end], settings['parallelChains'],
+                                         settings.get('parallelChainsMode', 'process'))
         for chain in self.chains[begin:end]:
             # execute chain and check exit status
             status = self.execute(chain)
@@ -591,17 +713,145 @@ class ProcessManager(LoggingMixin, TimerMixin):
             if status.isFailure():
                 return status
 
-            # check if we need to persist process services
-            if settings.get('doNotStoreResults'):
-                # never persist anything
-                continue
-            if not (settings.get('storeResultsEachChain') or chain == self.chains[end - 1]
-                    or settings.get('storeResultsOneChain') == chain.name):
-                # do not persist the output of this chain
+            # persist process services with the output of this chain if configured
+            self.persist_chain_output(chain)
+
+        self.log().debug('Done executing process manager')
+
+        return status
+
+    def persist_chain_output(self, chain):
+        """Persist process services with the output of chain if configured
+
+        :param chain: executed chain
+        """
+
+        settings = self.service(ConfigObject)
+
+        # check if we need to persist process services
+        if settings.get('doNotStoreResults'):
+            # never persist anything
+            return
+        last_chain = self.chains[self.get_chain_idx(settings['endWithChain'])] if settings.get('endWithChain') \
+            else self.chains[-1]
+        if not (settings.get('storeResultsEachChain') or chain == last_chain
+                or settings.get('storeResultsOneChain') == chain.name):
+            # do not persist the output of this chain
+            return
+
+        # persist process services with the output of this chain
+        self.persist_services(io_conf=settings.io_conf(), chain=chain.name,
+                              backend=settings.get('storeResultsFormat'),
+                              link_unmodified=settings.get('storeResultsLinkUnmodified'))
+
+    @staticmethod
+    def chain_dependencies(chains):
+        """Get dependencies between chains
+
+        A chain depends on an earlier chain if it reads a data-store key that
+        the earlier chain stores, if it stores a key that the earlier chain
+        reads, or if both chains store the same key.  Keys are obtained from
+        the links with Link.data_keys.  A chain with a link of which the
+        keys are unknown is a barrier: it depends on all earlier chains and
+        all later chains depend on it.
+
+        :param list chains: chains in order of execution
+        :returns: for each chain, the indices of the earlier chains it depends on
+        :rtype: list
+        """
+
+        keys = [ch.data_keys() for ch in chains]
+        deps = []
+        barrier = None
+        for idx, chain_keys in enumerate(keys):
+            if chain_keys is None:
+                deps.append(set(range(idx)))
+                barrier = idx
                 continue
+            read_keys, store_keys = chain_keys
+            chain_deps = set(pidx for pidx, prev_keys in enumerate(keys[:idx]) if prev_keys is not None
+                             and ((read_keys | store_keys) & prev_keys[1] or store_keys & prev_keys[0]))
+            if barrier is not None:
+                chain_deps.add(barrier)
+            deps.append(chain_deps)
+        return deps
+
+    def execute_parallel(self, chains, n_workers, mode='process'):
+        """Execute independent chains concurrently
+
+        Dependencies between chains are determined with chain_dependencies.
+        Chains of which the dependencies have been executed are executed
+        together in a pool of threads or processes, also if they come after
+        chains that still have to be executed.  The data-store objects that
+        a chain sets or deletes are kept aside until the output of all
+        earlier chains has been merged into the data store.  Outputs are
+        merged strictly in the order of the chains, and after merging the
+        output of a chain, process services are persisted if configured, so
+        persisted results are the same as in serial execution.  Execution
+        stops at the first failing chain, in which case the failure status
+        is returned and the output of later chains is discarded, as in
+        serial execution.  Other effects of later chains that were already
+        executed, such as written files, are not undone.
+
+        In thread mode, chains share the process services of the process
+        manager, so links must be thread safe.  Only the objects of the
+        keys that chains report with data_keys are merged.  In process mode,
+        chains are executed in forked processes and all data-store objects
+        they set or delete are merged.  Other changes to process services
+        and links in the forked processes are not kept.
+
+        :param list chains: chains in order of execution
+        :param int n_workers: number of workers in pool
+        :param str mode: type of pool, "thread" or "process"
+        :returns: status code of execution attempt
+        :rtype: StatusCode
+        """
+
+        if mode not in ('thread', 'process'):
+            self.log().critical('Unknown parallel-execution mode: "%s"', mode)
+            raise RuntimeError('unknown parallel-execution mode specified')
 
-            # persist process services with the output of this chain
-            self.persist_services(io_conf=settings.io_conf(), chain=chain.name)
+        status = StatusCode.Success
+        ds = self.service(DataStore)
+        deps = self.chain_dependencies(chains)
+        prev_chain_name = self.prevChainName
+        outputs = {}
+        n_merged = 0
+        while n_merged < len(chains):
+            # execute chains of which the dependencies are merged, up to the first chain known to fail
+            n_max = min([idx for idx, (st, _) in outputs.items() if st.isFailure()] + [len(chains)])
+            batch = [idx for idx in range(n_merged, n_max)
+                     if idx not in outputs and all(d < n_merged for d in deps[idx])]
+            self.log().debug('Executing chains %s concurrently', ', '.join('"{}"'.format(chains[idx].name)
+                                                                          for idx in batch))
+            if len(batch) == 1:
+                outputs[batch[0]] = (self.execute(chains[batch[0]]), None)
+            elif mode == 'thread':
+                store_keys = [chains[idx].data_keys()[1] for idx in batch]
+                snapshot = dict((k, dict.get(ds, k, _MISSING)) for keys in store_keys for k in keys)
+                with concurrent.futures.ThreadPoolExecutor(n_workers) as pool:
+                    statuses = list(pool.map(self.execute, [chains[idx] for idx in batch]))
+                for idx, st, keys in zip(batch, statuses, store_keys):
+                    outputs[idx] = (st, _take_chain_output(ds, keys, snapshot))
+            else:
+                ctx = multiprocessing.get_context('fork')
+                with concurrent.futures.ProcessPoolExecutor(n_workers, mp_context=ctx) as pool:
+                    outputs.update(zip(batch, pool.map(_execute_chain_in_process,
+                                                       [self.chains.index(chains[idx]) for idx in batch])))
+            self.prevChainName = prev_chain_name
+
+            # merge outputs in chain order
+            while n_merged in outputs:
+                chain = chains[n_merged]
+                status, output = outputs.pop(n_merged)
+                n_merged += 1
+                chain.exitStatus = status
+                if output is not None:
+                    _merge_chain_output(ds, *output)
+                if status.isFailure():
+                    return status
+                self.prevChainName = prev_chain_name = chain.name
+                self.persist_chain_output(chain)
 
         self.log().debug('Done executing process manager')
 
@@ -677,3 +927,66 @@ class ProcessManager(LoggingMixin, TimerMixin):
         # re-initialize
         self._initialized = False
         self.__init__()
+
+
+# marker of keys that are not in the data store
+_MISSING = object()
+
+
+def _take_chain_output(ds, keys, snapshot):
+    """Take objects set by a concurrently executed chain from the data store
+
+    The objects of the specified keys that differ from the snapshot are
+    returned and the keys are restored to their state in the snapshot.
+
+    :param DataStore ds: data store
+    :param set keys: keys stored by chain
+    :param dict snapshot: objects in data store before execution of chain
+    :returns: data-store objects set by chain and keys deleted by chain
+    :rtype: (OrderedDict, set)
+    """
+
+    objs = OrderedDict((k, ds[k]) for k in list(ds.keys())
+                       if k in keys and dict.__getitem__(ds, k) is not snapshot[k])
+    deleted = set(k for k in keys if snapshot[k] is not _MISSING and k not in ds)
+    for key in keys:
+        obj = dict.get(ds, key, _MISSING)
+        if obj is snapshot[key]:
+            continue
+        if snapshot[key] is _MISSING:
+            del ds[key]
+        else:
+            ds[key] = snapshot[key]
+    return objs, deleted
+
+
+def _merge_chain_output(ds, objs, deleted):
+    """Merge output of a concurrently executed chain into the data store
+
+    :param DataStore ds: data store
+    :param dict objs: data-store objects set by chain
+    :param set deleted: keys deleted by chain
+    """
+
+    for key in deleted:
+        if key in ds:
+            del ds[key]
+    ds.update(objs)
+
+
+def _execute_chain_in_process(chain_idx):
+    """Execute chain in a forked process
+
+    :param int chain_idx: index of chain in process manager
+    :returns: exit status of chain, and data-store objects set by chain and keys deleted by chain
+    :rtype: (StatusCode, (OrderedDict, set))
+    """
+
+    proc_mgr = ProcessManager()
+    ds = proc_mgr.service(DataStore)
+    keys = set(ds.keys())
+    ds.reset_modified_keys()
+    status = proc_mgr.execute(proc_mgr.chains[chain_idx])
+    unmodified = ds.unmodified_keys()
+    objs = OrderedDict((k, ds[k]) for k in ds.keys() if k not in unmodified)
+    return status, (objs, keys - set(ds.keys()))
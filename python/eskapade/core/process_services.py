@@ -16,6 +16,17 @@ import logging
 import os
 import pickle
 import re
+import shutil
+import sys
+import tempfile
+import timeit
+import weakref
+from collections import Counter, OrderedDict
+from collections.abc import ItemsView, ValuesView
+from itertools import count
+
+import numpy as np
+import pandas as pd
 
 import eskapade.utils
 from . import persistence
@@ -37,11 +48,18 @@ class ProcessServiceMeta(type):
 
         return self._persist
 
+    @property
+    def persist_by_key(self):
+        """Flag to indicate if service can be persisted per key with a persistence backend"""
+
+        return self._persist_by_key
+
 
 class ProcessService(LoggingMixin, metaclass=ProcessServiceMeta):
     """Base class for process services"""
 
     _persist = False
+    _persist_by_key = False
 
     def __init__(self):
         """Initialize service instance"""
@@ -120,6 +138,8 @@ class ProcessService(LoggingMixin, metaclass=ProcessServiceMeta):
         """Persist service instance in Pickle file
 
         :param str file_path: path of Pickle file
+        :returns: True if service was persisted
+        :rtype: bool
         """
 
         # check if service can be persisted
@@ -127,16 +147,19 @@ class ProcessService(LoggingMixin, metaclass=ProcessServiceMeta):
             self.log().debug('Persisting service instance "%s" in file "%s"', str(self), file_path)
         else:
             self.log().debug('Not persisting service "%s"', str(type(self)))
-            return
+            return False
 
         try:
-            # try to persist
+            # try to persist; remove existing file first, which may be linked from another directory
+            persistence.remove_file(file_path)
             with open(file_path, 'wb') as inst_file:
                 pickle.dump(self, inst_file)
         except Exception as exc:
             # give warning if persisting failed
             self.log().warning('Failed to persist service instance "%s" in file "%s":', str(self), file_path)
             self.log().warning('Caught exception "%s"', str(exc))
+            return False
+        return True
 
 
 class ConfigObject(ProcessService, dict):
@@ -308,9 +331,454 @@ class DataStore(ProcessService, dict):
     And reload from the pickle file with:
 
     >>> ds = DataStore.import_from_file(file_path)
+
+    Large data frames and arrays are more efficiently persisted per key in
+    a columnar format, in a directory of binary files:
+
+    >>> ds.persist_in_dir(dir_path, backend='columnar')
+    >>> ds = DataStore.import_from_dir(dir_path, backend='columnar')
+
+    The data store keeps track of the keys that were set since it was last
+    persisted or imported.  Objects that were not set again are not
+    serialized again, but linked from the previous storage.  Objects that
+    are modified in place should therefore be stored again, or marked as
+    modified explicitly:
+
+    >>> ds['df'].drop('col', axis=1, inplace=True)
+    >>> ds.mark_modified('df')
+
+    To limit memory usage, large numeric data frames and arrays can be
+    spilled to memory-mapped files in a scratch directory.  Objects are
+    spilled in least-recently-used order when their total size exceeds the
+    memory budget:
+
+    >>> ds.enable_spill('/path/to/scratch', threshold=2 ** 26, memory_budget=2 ** 32)
     """
 
     _persist = True
+    _persist_by_key = True
+
+    # statistics of objects imported lazily from a persistence backend; filled on import
+    _access_stats = None
+
+    # keys set since the data store was last persisted or imported, and location of that storage;
+    # all keys are considered modified if no storage location is known
+    _modified_keys = None
+    _storage = None
+    # settings and bookkeeping for spilling objects to memory-mapped files; set by enable_spill
+    _spill = None
+
+    _bookkeeping_attrs = ('_access_stats', '_modified_keys', '_storage', '_spill')
+
+    def __setitem__(self, key, obj):
+        """Set object in data store and mark key as modified"""
+
+        dict.__setitem__(self, key, obj)
+        if self._modified_keys is not None:
+            self._modified_keys.add(key)
+        if self._spill is not None:
+            self._register_spill(key, obj)
+
+    def __delitem__(self, key):
+        """Remove object from data store and mark key as modified"""
+
+        dict.__delitem__(self, key)
+        if self._modified_keys is not None:
+            self._modified_keys.add(key)
+        if self._spill is not None:
+            self._release_spill(key)
+
+    def clear(self):
+        """Remove all objects from data store"""
+
+        for key in list(self.keys()):
+            del self[key]
+
+    def popitem(self):
+        """Remove and return (key, object) pair"""
+
+        if not self:
+            raise KeyError('popitem(): data store is empty')
+        key = next(reversed(list(self.keys())))
+        return key, self.pop(key)
+
+    def update(self, *args, **kwargs):
+        """Update data store and mark updated keys as modified"""
+
+        for key, obj in dict(*args, **kwargs).items():
+            self[key] = obj
+
+    def setdefault(self, key, default=None):
+        """Set object in data store if key does not exist"""
+
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def mark_modified(self, *keys):
+        """Mark keys as modified since last persistence
+
+        Objects that are changed in place are not detected as modified and
+        are not serialized again when the data store is persisted, unless
+        they are marked explicitly.
+
+        :param keys: keys of modified objects
+        """
+
+        if self._modified_keys is not None:
+            self._modified_keys.update(keys)
+
+    def unmodified_keys(self):
+        """Get keys that were not set or deleted since data store was last persisted or imported
+
+        :returns: unmodified keys
+        :rtype: set
+        """
+
+        if self._modified_keys is None:
+            return set()
+        return set(self.keys()) - self._modified_keys
+
+    def reset_modified_keys(self):
+        """Start tracking of modified keys from the current contents"""
+
+        self._modified_keys = set()
+
+    def enable_spill(self, scratch_dir, threshold=2 ** 26, memory_budget=None):
+        """Enable spilling of large objects to memory-mapped files
+
+        Numeric data frames and arrays with a size of at least the threshold
+        are candidates for spilling.  If their total size exceeds the memory
+        budget, the least recently used candidates are written to binary
+        files in the scratch directory and are replaced by objects that are
+        backed by memory maps of these files.  Without a budget, candidates
+        are spilled immediately.  Reading spilled objects does not copy the
+        data, and the operating system can page them out of memory.
+
+        :param str scratch_dir: directory in which spill files are created
+        :param int threshold: minimum size of spilled objects in bytes
+        :param int memory_budget: maximum total size of candidates kept in memory in bytes
+        """
+
+        if self._spill is not None:
+            self.log().debug('Spilling of data store "%s" already enabled', str(self))
+            return
+
+        persistence.create_dir(scratch_dir)
+        spill_path = tempfile.mkdtemp(prefix='data_store_', dir=scratch_dir)
+        self._spill = dict(store=persistence.ColumnarStore(spill_path), threshold=threshold,
+                           memory_budget=memory_budget if memory_budget else 0, lru=OrderedDict(), entries={},
+                           file_idx=count(), cleanup=weakref.finalize(self, shutil.rmtree, spill_path, True))
+        self.log().debug('Spilling objects of data store "%s" to directory "%s"', str(self), spill_path)
+
+        for key in list(self.keys()):
+            self._register_spill(key, dict.__getitem__(self, key))
+
+    def spilled_keys(self):
+        """Get keys of objects spilled to memory-mapped files
+
+        :rtype: set
+        """
+
+        return set(self._spill['entries']) if self._spill is not None else set()
+
+    @staticmethod
+    def _spill_size(obj):
+        """Get size in memory of object that can be spilled, or None if object cannot be spilled"""
+
+        if type(obj) is np.ndarray and not obj.dtype.hasobject:
+            return obj.nbytes
+        if isinstance(obj, pd.DataFrame) and all(isinstance(dt, np.dtype) and not dt.hasobject for dt in obj.dtypes):
+            return int(obj.memory_usage(index=False).sum())
+        return None
+
+    def _register_spill(self, key, obj):
+        """Register object as candidate for spilling and spill objects if memory budget is exceeded"""
+
+        self._release_spill(key)
+        size = self._spill_size(obj)
+        if size is None or size < self._spill['threshold']:
+            return
+
+        lru = self._spill['lru']
+        lru[key] = size
+        while lru and sum(lru.values()) > self._spill['memory_budget']:
+            self._spill_object(lru.popitem(last=False)[0])
+
+    def _spill_object(self, key):
+        """Replace object by memory-mapped copy"""
+
+        spill = self._spill
+        entry = spill['store'].write_object(dict.__getitem__(self, key), str(next(spill['file_idx'])))
+        dict.__setitem__(self, key, spill['store'].load_entry(entry, mmap_mode='r+'))
+        spill['entries'][key] = entry
+        self.log().debug('Spilled object "%s" to memory-mapped file', str(key))
+
+    def _release_spill(self, key):
+        """Remove key from spill bookkeeping and remove its spill files"""
+
+        self._spill['lru'].pop(key, None)
+        entry = self._spill['entries'].pop(key, None)
+        if entry is None:
+            return
+        for file_name in persistence.ColumnarStore.entry_files(entry):
+            try:
+                # memory maps that are still in use remain valid on POSIX systems
+                os.remove(os.path.join(self._spill['store'].dir_path, file_name))
+            except OSError:
+                pass
+
+    def _set_storage(self, path, backend=None):
+        """Set location of persisted data store and reset modified keys"""
+
+        self._storage = (os.path.realpath(path), backend)
+        self._modified_keys = set()
+
+    def __getstate__(self):
+        """Get state for pickling, without bookkeeping of storage"""
+
+        return dict((k, v) for k, v in self.__dict__.items() if k not in self._bookkeeping_attrs)
+
+    def __getitem__(self, key):
+        """Get object from data store
+
+        Objects that were imported lazily are loaded from their persistence
+        backend when they are accessed for the first time.
+        """
+
+        obj = dict.__getitem__(self, key)
+        if isinstance(obj, PersistedObject):
+            obj = self._load_persisted(key, obj)
+        if self._spill is not None and key in self._spill['lru']:
+            self._spill['lru'].move_to_end(key)
+        if self._access_stats and key in self._access_stats:
+            self._access_stats[key]['reads'][self._accessor_name()] += 1
+        return obj
+
+    def __iter__(self):
+        """Iterate over keys in data store
+
+        Defining iteration explicitly makes dict(data_store), copy, and
+        unpacking get the objects with __getitem__, so that lazily imported
+        objects are loaded instead of returning their placeholders.
+        """
+
+        return dict.__iter__(self)
+
+    def __eq__(self, other):
+        """Compare contents with lazily imported objects loaded"""
+
+        self.load_persisted()
+        if isinstance(other, DataStore):
+            other.load_persisted()
+        return dict.__eq__(self, other)
+
+    def __ne__(self, other):
+        """Compare contents with lazily imported objects loaded"""
+
+        eq = self.__eq__(other)
+        return eq if eq is NotImplemented else not eq
+
+    def get(self, key, default=None):
+        """Get object from data store if key exists"""
+
+        return self[key] if key in self else default
+
+    def items(self):
+        """Get view of (key, object) pairs in data store"""
+
+        return ItemsView(self)
+
+    def values(self):
+        """Get view of objects in data store"""
+
+        return ValuesView(self)
+
+    def pop(self, key, *args):
+        """Remove object from data store and return it"""
+
+        if key in self:
+            obj = self[key]
+            del self[key]
+            return obj
+        return dict.pop(self, key, *args)
+
+    def _load_persisted(self, key, placeholder):
+        """Load lazily imported object from its persistence backend"""
+
+        start_time = timeit.default_timer()
+        obj = placeholder.load()
+        load_time = timeit.default_timer() - start_time
+        dict.__setitem__(self, key, obj)
+        if self._access_stats and key in self._access_stats:
+            self._access_stats[key]['load_time'] = load_time
+        self.log().debug('Loaded object "%s" from persistence backend in %.3f seconds', str(key), load_time)
+        return obj
+
+    @staticmethod
+    def _accessor_name():
+        """Get name of the link that accesses the data store"""
+
+        from .run_elements import Link
+        frame = sys._getframe(2)
+        while frame is not None:
+            obj = frame.f_locals.get('self')
+            if isinstance(obj, Link):
+                return obj.name
+            frame = frame.f_back
+        return ''
+
+    def load_persisted(self):
+        """Load all lazily imported objects from their persistence backends"""
+
+        for key in list(self.keys()):
+            obj = dict.__getitem__(self, key)
+            if isinstance(obj, PersistedObject):
+                self._load_persisted(key, obj)
+
+    @classmethod
+    def import_from_dir(cls, dir_path, backend='columnar', mmap_mode='c', lazy=False):
+        """Import data store from directory of a persistence backend
+
+        If the import is lazy, only the manifest of the persisted objects is
+        read.  Objects are loaded on first access and access statistics are
+        kept, which can be printed with print_access_stats.
+
+        :param str dir_path: path of storage directory
+        :param str backend: name of persistence backend, e.g. "columnar"
+        :param str mmap_mode: memory-map mode for arrays; default is "c" (copy-on-write)
+        :param bool lazy: load objects only when they are accessed
+        :returns: imported data store
+        :rtype: DataStore
+        :raises: RuntimeError
+        """
+
+        cls.log().debug('Importing data store from directory "%s" (backend "%s")', dir_path, backend)
+        if not os.path.isdir(dir_path):
+            cls.log().critical('Specified path for importing "%s" instance is not a directory: "%s"', str(cls),
+                               dir_path)
+            raise RuntimeError('invalid directory path specified for importing process service')
+
+        store = persistence.PERSIST_BACKENDS[backend](dir_path)
+        inst = cls.create()
+        if not lazy:
+            dict.update(inst, store.load_all(mmap_mode=mmap_mode))
+            inst._set_storage(dir_path, backend)
+            return inst
+
+        inst._access_stats = {}
+        for key in store.keys():
+            dict.__setitem__(inst, key, PersistedObject(store, key, mmap_mode))
+            inst._access_stats[key] = dict(load_time=None, reads=Counter())
+        cls.log().debug('Lazily imported %d objects', len(inst._access_stats))
+        inst._set_storage(dir_path, backend)
+        return inst
+
+    @classmethod
+    def import_from_file(cls, file_path):
+        """Import data store from a Pickle file
+
+        :param str file_path: path of Pickle file
+        :returns: imported data store
+        :rtype: DataStore
+        """
+
+        inst = super(DataStore, cls).import_from_file(file_path)
+        if inst is not None:
+            inst._set_storage(file_path)
+        return inst
+
+    def persist_in_file(self, file_path, link_unmodified=False):
+        """Persist data store in Pickle file
+
+        If linking is enabled and no keys were set or deleted since the data
+        store was last persisted in a Pickle file, that file is linked
+        instead.  Objects that were changed in place must then be marked with
+        mark_modified.  Lazily imported objects are loaded before persisting.
+
+        :param str file_path: path of Pickle file
+        :param bool link_unmodified: link previous file if data store was not modified
+        :returns: True if data store was persisted
+        :rtype: bool
+        """
+
+        if link_unmodified and self._modified_keys is not None and not self._modified_keys and self._storage \
+                and self._storage[1] is None and os.path.isfile(self._storage[0]) \
+                and self._storage[0] != os.path.realpath(file_path):
+            self.log().debug('Data store "%s" not modified; linking "%s"', str(self), self._storage[0])
+            if self._link_file(self._storage[0], file_path):
+                self._set_storage(file_path)
+                return True
+
+        self.load_persisted()
+        if not ProcessService.persist_in_file(self, file_path):
+            return False
+        self._set_storage(file_path)
+        return True
+
+    def persist_in_dir(self, dir_path, backend='columnar'):
+        """Persist data store per key in directory of a persistence backend
+
+        Objects that were not set since the data store was last persisted
+        with the same backend are linked from the previous directory.
+
+        :param str dir_path: path of storage directory
+        :param str backend: name of persistence backend, e.g. "columnar"
+        """
+
+        self.log().debug('Persisting data store "%s" in directory "%s" (backend "%s")', str(self), dir_path, backend)
+        store_cls = persistence.PERSIST_BACKENDS[backend]
+        prev_store, unchanged = None, set()
+        if self._storage and self._storage[1] == backend and os.path.isdir(self._storage[0]) \
+                and self._storage[0] != os.path.realpath(dir_path):
+            prev_store = store_cls(self._storage[0])
+            unchanged = self.unmodified_keys()
+            self.log().debug('Linking %d unmodified objects from "%s"', len(unchanged), self._storage[0])
+
+        # load lazily imported objects that are not linked
+        for key in set(self.keys()) - unchanged:
+            obj = dict.__getitem__(self, key)
+            if isinstance(obj, PersistedObject):
+                self._load_persisted(key, obj)
+
+        try:
+            store_cls(dir_path).write(dict(dict.items(self)), prev_store=prev_store, unchanged=unchanged)
+            self._set_storage(dir_path, backend)
+        except Exception as exc:
+            # give warning if persisting failed
+            self.log().warning('Failed to persist data store "%s" in directory "%s":', str(self), dir_path)
+            self.log().warning('Caught exception "%s"', str(exc))
+
+    def _link_file(self, src, dst):
+        """Hard-link file, or copy file if linking is not possible"""
+
+        try:
+            persistence.remove_file(dst)
+            os.link(src, dst)
+        except OSError:
+            try:
+                shutil.copyfile(src, dst)
+            except OSError:
+                return False
+        return True
+
+    def print_access_stats(self):
+        """Print access statistics of lazily imported objects"""
+
+        if not self._access_stats:
+            return
+
+        loaded = sorted(k for k, st in self._access_stats.items() if st['load_time'] is not None)
+        self.log().info('Lazily imported objects in data store: {0:d} of {1:d} loaded ({2:.2f} seconds)'
+                        .format(len(loaded), len(self._access_stats),
+                                sum(self._access_stats[k]['load_time'] for k in loaded)))
+        for key in loaded:
+            stats = self._access_stats[key]
+            readers = ', '.join('{0:s} ({1:d})'.format(l if l else '-', n) for l, n in sorted(stats['reads'].items()))
+            self.log().info('  {0:s}: loaded in {1:.2f} seconds; read by {2:s}'.format(str(key), stats['load_time'],
+                                                                                       readers))
+        for key in sorted(set(self._access_stats) - set(loaded)):
+            self.log().debug('  {0:s}: not loaded'.format(str(key)))
 
     def Print(self):
         """Print a summary the data store contents"""
@@ -321,5 +789,29 @@ class DataStore(ProcessService, dict):
 
         max_key_len = max(len(k) for k in self.keys())
         for key in sorted(self.keys()):
+            obj = dict.__getitem__(self, key)
             self.log().info('  {{0:<{:d}s}}  <{{1:s}}.{{2:s}} at {{3:x}}>'.format(max_key_len).format(key,
-                type(self[key]).__module__, type(self[key]).__name__, id(self[key])))
+                type(obj).__module__, type(obj).__name__, id(obj)))
+
+
+class PersistedObject(object):
+    """Placeholder for an object in the data store that is loaded on first access"""
+
+    __slots__ = ('store', 'key', 'mmap_mode')
+
+    def __init__(self, store, key, mmap_mode=None):
+        """Initialize placeholder
+
+        :param store: persistence-backend store of the object
+        :param key: key of the object in the store
+        :param str mmap_mode: memory-map mode for arrays
+        """
+
+        self.store = store
+        self.key = key
+        self.mmap_mode = mmap_mode
+
+    def load(self):
+        """Load object from persistence backend"""
+
+        return self.store.load(self.key, mmap_mode=self.mmap_mode)
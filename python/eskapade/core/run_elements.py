@@ -15,6 +15,9 @@
 
 import os
 
+import numpy as np
+import pandas as pd
+
 from eskapade.core.definitions import StatusCode
 from eskapade.core import persistence
 from eskapade.core.mixins import LoggingMixin, ArgumentsMixin, TimerMixin
@@ -93,6 +96,8 @@ class Link(ArgumentsMixin, LoggingMixin, TimerMixin):
         self.ifInputMissing = StatusCode.Failure
         # return code by store()
         self.ifOutputExists = StatusCode.Success
+        # number of data rows processed by execute()
+        self.n_rows_processed = 0
 
     def __str__(self):
         """String of the link"""
@@ -122,6 +127,73 @@ class Link(ArgumentsMixin, LoggingMixin, TimerMixin):
             line += type(item) if not hasattr(item, '__str__') else str(item)
             self.log().debug(line)
 
+    # attributes with keys of data-store objects that are read and stored by links
+    read_key_attrs = ('read_key', 'readKey', 'key', 'keys', 'keySet')
+    store_key_attrs = ('store_key', 'storeKey', 'write_key', 'key')
+
+    def data_keys(self):
+        """Get keys of data-store objects that are read and stored by the link
+
+        The keys are used to determine dependencies between chains, so they
+        must be complete.  By default they are unknown.  Links that know
+        which keys they access should override this method, e.g. with
+        attr_data_keys if these are exactly the keys in their attributes.
+
+        :returns: read keys and store keys; None if the keys are unknown
+        :rtype: (set, set)
+        """
+
+        return None
+
+    def attr_data_keys(self):
+        """Get data-store keys from the key attributes of the link
+
+        Keys are collected from the attributes in read_key_attrs and
+        store_key_attrs and from attributes with names that start with
+        "read_key" or "store_key".  The link may access other keys as well.
+
+        :returns: read keys and store keys
+        :rtype: (set, set)
+        """
+
+        def collect(key):
+            if isinstance(key, Link):
+                key = key.store_key
+            if isinstance(key, str):
+                return {key} if key else set()
+            if isinstance(key, (list, tuple, set)):
+                return set().union(*(collect(k) for k in key))
+            return set()
+
+        attrs = vars(self)
+        read_attrs = set(self.read_key_attrs) | set(a for a in attrs if a.startswith('read_key'))
+        store_attrs = set(self.store_key_attrs) | set(a for a in attrs if a.startswith('store_key'))
+        read_keys = set().union(*(collect(attrs.get(a)) for a in read_attrs))
+        store_keys = set().union(*(collect(attrs.get(a)) for a in store_attrs))
+        return read_keys, store_keys
+
+    def num_shards(self):
+        """Get number of parts in which the input of the link can be split
+
+        Links that read input data, e.g. from files, can override this
+        method and select_shard to split their input over the workers of a
+        map/reduce run.
+
+        :returns: number of input parts; None if input cannot be split
+        :rtype: int
+        """
+
+        return None
+
+    def select_shard(self, shard, n_shards):
+        """Select part of the input of the link
+
+        :param int shard: index of selected part
+        :param int n_shards: number of parts in which the input is split
+        """
+
+        pass
+
     def __ret_data_list(self, ds, dlist):
         """Internal method used by load method"""
 
@@ -298,8 +370,44 @@ class Link(ArgumentsMixin, LoggingMixin, TimerMixin):
         # Stop the timer when the link is done
         self.stop_timer()
 
+        # count processed rows only for the profiling report
+        from eskapade.core.process_manager import ProcessManager
+        from eskapade.core.process_services import ConfigObject
+        pm = ProcessManager()
+        if ConfigObject in pm.get_services() and pm.service(ConfigObject).get('doLinkProfiling'):
+            self.n_rows_processed += self.count_rows()
+
         return status
 
+    def count_rows(self):
+        """Count number of data rows processed in an execute call
+
+        By default, the rows of the data frames and arrays in the data store
+        that are read by the link are counted.  If the link does not read
+        such objects, the rows of the stored objects are counted.  Links
+        can override this method to provide a more accurate number.
+
+        :returns: number of processed rows
+        :rtype: int
+        """
+
+        from eskapade.core.process_manager import ProcessManager
+        from eskapade.core.process_services import DataStore
+
+        pm = ProcessManager()
+        if DataStore not in pm.get_services():
+            return 0
+        ds = pm.service(DataStore)
+
+        def rows(keys):
+            # use dict access to leave placeholders and access statistics untouched
+            objs = (dict.get(ds, key) for key in keys)
+            return sum(obj.shape[0] for obj in objs if isinstance(obj, (pd.DataFrame, pd.Series, np.ndarray))
+                       and obj.ndim > 0)
+
+        read_keys, store_keys = self.data_keys() or self.attr_data_keys()
+        return rows(read_keys) or rows(store_keys - read_keys)
+
     def finalize_link(self):
         """Finalizing the link
 
@@ -400,6 +508,25 @@ class Chain(LoggingMixin, TimerMixin):
         self.prevChainName = ''
         self.links = []
         self.exitStatus = StatusCode.Undefined
+        # number of executions, larger than one if the chain is repeated
+        self.n_executions = 0
+
+    def data_keys(self):
+        """Get keys of data-store objects that are read and stored by the links in the chain
+
+        :returns: read keys and store keys; None if the keys of any link are unknown
+        :rtype: (set, set)
+        """
+
+        read_keys, store_keys = set(), set()
+        for link in self.links:
+            keys = link.data_keys()
+            if keys is None:
+                return None
+            link_read_keys, link_store_keys = keys
+            read_keys |= link_read_keys
+            store_keys |= link_store_keys
+        return read_keys, store_keys
 
     def initialize(self):
         """Initialize internal variables and links
@@ -439,6 +566,7 @@ class Chain(LoggingMixin, TimerMixin):
         status = StatusCode.Success
 
         self.log().debug('Now executing chain "%s"' % self.name)
+        self.n_executions += 1
 
         # execution
         for mod in self.links:
@@ -1,7 +1,7 @@
 import unittest
 import mock
 
-from ..run_elements import Chain
+from ..run_elements import Chain, Link
 from ..process_services import ProcessService, ConfigObject
 from ..process_manager import ProcessManager
 
@@ -24,6 +24,33 @@ class ProcessServiceMock(ProcessService):
     pass
 
 
+class IncrementLink(Link):
+    """Link that stores the incremented value of its input"""
+
+    def __init__(self, name, read_key, store_key):
+        Link.__init__(self, name)
+        self.read_key = read_key
+        self.store_key = store_key
+
+    def data_keys(self):
+        return self.attr_data_keys()
+
+    def execute(self):
+        from eskapade import StatusCode, DataStore
+        ds = ProcessManager().service(DataStore)
+        ds[self.store_key] = ds[self.read_key] + 1
+        return StatusCode.Success
+
+
+class FailingIncrementLink(IncrementLink):
+    """Link that stores the incremented value of its input and fails"""
+
+    def execute(self):
+        from eskapade import StatusCode
+        IncrementLink.execute(self)
+        return StatusCode.Failure
+
+
 # test with the real Chain class, Chain class not mocked
 class ProcessManagerTest(unittest.TestCase):
     def setUp(self):
@@ -228,6 +255,179 @@ class ProcessManagerTest(unittest.TestCase):
         executed_chains = [arg[0][0] for arg in mock_execute.call_args_list]
         self.assertIn(c4, executed_chains)
 
+    def test_chain_dependencies(self):
+        chains = [Chain(str(it)) for it in range(4)]
+        chains[0].add_link(IncrementLink('l0', read_key='a', store_key='b'))
+        chains[1].add_link(IncrementLink('l1', read_key='a', store_key='c'))
+        chains[2].add_link(IncrementLink('l2', read_key='b', store_key='d'))
+        chains[3].add_link(IncrementLink('l3', read_key='e', store_key='a'))
+        deps = ProcessManager.chain_dependencies(chains)
+        self.assertListEqual(deps, [set(), set(), {0}, {0, 1}])
+
+        # chains with links of which the keys are unknown are barriers
+        self.assertIsNone(Link('unknown').data_keys())
+        chains.insert(2, Chain('barrier'))
+        chains[2].add_link(Link('unknown'))
+        chains.append(Chain('4'))
+        chains[-1].add_link(IncrementLink('l4', read_key='f', store_key='g'))
+        deps = ProcessManager.chain_dependencies(chains)
+        self.assertListEqual(deps, [set(), set(), {0, 1}, {0, 2}, {0, 1, 2}, {2}])
+
+    def test_chain_dependencies_links(self):
+        from eskapade.analysis import ReadToDf, ApplySelectionToDf
+        from eskapade.visualization import DfSummary, CorrelationSummary
+
+        chains = [Chain(str(it)) for it in range(5)]
+        chains[0].add_link(ReadToDf(key='df1', path='df1.csv'))
+        chains[1].add_link(ReadToDf(key='df2', path='df2.csv'))
+        chains[2].add_link(DfSummary(read_key='df1'))
+        chains[3].add_link(CorrelationSummary(read_key='df2', write_key='cors'))
+        chains[4].add_link(ApplySelectionToDf(readKey='df1', storeKey='sel', querySet=['x > 0']))
+        deps = ProcessManager.chain_dependencies(chains)
+        self.assertListEqual(deps, [set(), set(), {0}, {1}, {0}])
+
+    def test_execute_parallel(self):
+        from eskapade import StatusCode, DataStore, ProcessManager
+
+        for mode in ('thread', 'process'):
+            pm = ProcessManager()
+            pm.service(ConfigObject)['doNotStoreResults'] = True
+            ds = pm.service(DataStore)
+            ds['a'] = 0
+            for it, (rk, sk) in enumerate([('a', 'b'), ('a', 'c'), ('b', 'd'), ('c', 'e')]):
+                pm.add_chain(str(it)).add_link(IncrementLink('l{:d}'.format(it), read_key=rk, store_key=sk))
+            status = pm.execute_parallel(pm.chains, 2, mode)
+            self.assertEqual(status, StatusCode.Success)
+            self.assertDictEqual(dict(ds), dict(a=0, b=1, c=1, d=2, e=2))
+            self.assertListEqual(list(ds.keys()), ['a', 'b', 'c', 'd', 'e'])
+            self.assertTrue(all(ch.exitStatus == StatusCode.Success for ch in pm.chains))
+            pm.reset()
+
+    def test_execute_parallel_failure(self):
+        from eskapade import StatusCode, DataStore, ProcessManager
+
+        for mode in ('thread', 'process'):
+            pm = ProcessManager()
+            pm.service(ConfigObject)['doNotStoreResults'] = True
+            ds = pm.service(DataStore)
+            ds['a'] = 0
+            ds['c'] = 0
+            pm.add_chain('0').add_link(IncrementLink('l0', read_key='a', store_key='b'))
+            pm.add_chain('1').add_link(FailingIncrementLink('l1', read_key='a', store_key='d'))
+            pm.add_chain('2').add_link(IncrementLink('l2', read_key='a', store_key='c'))
+            pm.add_chain('3').add_link(IncrementLink('l3', read_key='a', store_key='e'))
+            self.assertFalse(any(pm.chain_dependencies(pm.chains)))
+            status = pm.execute_parallel(pm.chains, 2, mode)
+
+            # output of later chains is discarded, as in serial execution
+            self.assertEqual(status, StatusCode.Failure)
+            self.assertDictEqual(dict(ds), dict(a=0, b=1, c=0, d=1))
+            self.assertListEqual([ch.exitStatus for ch in pm.chains[:2]], [StatusCode.Success, StatusCode.Failure])
+            pm.reset()
+
+    @mock.patch('eskapade.core.process_manager.ProcessManager.persist_chain_output')
+    def test_execute_parallel_order(self, mock_persist):
+        from eskapade import StatusCode, DataStore, ProcessManager
+
+        for mode in ('thread', 'process'):
+            pm = ProcessManager()
+            ds = pm.service(DataStore)
+            ds['a'] = 0
+            persisted = []
+            mock_persist.side_effect = lambda ch: persisted.append((ch.name, pm.prevChainName, list(ds.keys())))
+
+            # independent last chain is executed with the first chain, but merged and persisted last
+            pm.add_chain('0').add_link(IncrementLink('l0', read_key='a', store_key='b'))
+            pm.add_chain('1').add_link(IncrementLink('l1', read_key='b', store_key='c'))
+            pm.add_chain('2').add_link(IncrementLink('l2', read_key='a', store_key='d'))
+            self.assertListEqual(pm.chain_dependencies(pm.chains), [set(), {0}, set()])
+            status = pm.execute_parallel(pm.chains, 2, mode)
+            self.assertEqual(status, StatusCode.Success)
+            self.assertListEqual(persisted, [('0', '0', ['a', 'b']), ('1', '1', ['a', 'b', 'c']),
+                                             ('2', '2', ['a', 'b', 'c', 'd'])])
+            self.assertDictEqual(dict(ds), dict(a=0, b=1, c=2, d=1))
+
+            # output of later chains in earlier batches is discarded after failure
+            pm.reset()
+            ds = pm.service(DataStore)
+            ds['a'] = 0
+            del persisted[:]
+            pm.add_chain('0').add_link(IncrementLink('l0', read_key='a', store_key='b'))
+            pm.add_chain('1').add_link(FailingIncrementLink('l1', read_key='b', store_key='c'))
+            pm.add_chain('2').add_link(IncrementLink('l2', read_key='a', store_key='d'))
+            status = pm.execute_parallel(pm.chains, 2, mode)
+            self.assertEqual(status, StatusCode.Failure)
+            self.assertDictEqual(dict(ds), dict(a=0, b=1, c=2))
+            self.assertListEqual(persisted, [('0', '0', ['a', 'b'])])
+            self.assertEqual(pm.prevChainName, '0')
+            self.assertListEqual([ch.exitStatus for ch in pm.chains],
+                                 [StatusCode.Success, StatusCode.Failure, StatusCode.Undefined])
+            pm.reset()
+
+    def test_execute_parallel_links(self):
+        import pandas as pd
+        from eskapade import StatusCode, DataStore, ProcessManager
+        from eskapade.analysis import ApplySelectionToDf
+        from eskapade.core_ops import DsToDs
+
+        for mode in ('thread', 'process'):
+            pm = ProcessManager()
+            pm.service(ConfigObject)['doNotStoreResults'] = True
+            ds = pm.service(DataStore)
+            ds['df'] = pd.DataFrame({'x': range(5)})
+            ds['obj'] = 'obj'
+            pm.add_chain('select').add_link(ApplySelectionToDf(readKey='df', storeKey='sel', querySet=['x > 1']))
+            pm.add_chain('move').add_link(DsToDs(readKey='obj', storeKey='moved'))
+            self.assertFalse(any(pm.chain_dependencies(pm.chains)))
+            status = pm.execute_parallel(pm.chains, 2, mode)
+
+            # moved object is deleted from data store
+            self.assertEqual(status, StatusCode.Success)
+            self.assertListEqual(list(ds.keys()), ['df', 'sel', 'n_sel', 'moved'])
+            self.assertListEqual(ds['sel']['x'].tolist(), [2, 3, 4])
+            self.assertEqual(ds['moved'], 'obj')
+            pm.reset()
+
+    def test_profile_report(self):
+        import json
+        import tempfile
+        import shutil
+        import numpy as np
+        from eskapade import StatusCode, DataStore, ProcessManager
+
+        pm = ProcessManager()
+        pm.service(DataStore)['a'] = np.zeros(10)
+        chain = pm.add_chain('profile')
+        chain.add_link(IncrementLink('l0', read_key='a', store_key='b'))
+        chain.add_link(IncrementLink('l1', read_key='b', store_key='c'))
+        pm.add_chain('skipped')
+        pm.service(ConfigObject)['doLinkProfiling'] = True
+        self.assertEqual(pm.execute(chain), StatusCode.Success)
+
+        report = pm.profile_report()
+        self.assertListEqual([(r['chain'], r['link']) for r in report],
+                             [('profile', ''), ('profile', 'l0'), ('profile', 'l1')])
+        self.assertListEqual([(r['n_calls'], r['n_rows']) for r in report], [(1, 10), (1, 10), (1, 10)])
+        self.assertTrue(all(r['wall_time'] >= 0. and r['cpu_time'] >= 0. and r['rss_delta'] >= 0 for r in report))
+        self.assertGreaterEqual(report[0]['wall_time'], report[1]['wall_time'] + report[2]['wall_time'])
+
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            io_conf = dict(results_dir=tmp_dir, analysis_name='profile', analysis_version=0)
+            json_path, csv_path = pm.persist_profile_report(io_conf)
+            with open(json_path) as json_file:
+                self.assertListEqual(json.load(json_file), [dict(r) for r in report])
+            with open(csv_path) as csv_file:
+                self.assertEqual(len(csv_file.readlines()), 1 + len(report))
+        finally:
+            shutil.rmtree(tmp_dir)
+
+        # rows are only counted with link profiling
+        pm.service(ConfigObject)['doLinkProfiling'] = False
+        self.assertEqual(pm.execute(chain), StatusCode.Success)
+        self.assertListEqual([link.n_rows_processed for link in chain.links], [10, 10])
+        pm.reset()
+
     @mock.patch('eskapade.core.run_elements.Chain.initialize')
     @mock.patch('eskapade.core.run_elements.Chain.execute')
     @mock.patch('eskapade.core.run_elements.Chain.finalize')
@@ -1,5 +1,10 @@
 import unittest
 import mock
+import os
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
 
 from ..definitions import (LOG_LEVELS, CONFIG_VARS, CONFIG_TYPES, CONFIG_DEFAULTS, USER_OPTS, USER_OPTS_CONF_KEYS,
                            CONFIG_OPTS_SETTERS, RandomSeeds, set_opt_var, set_log_level_opt, set_begin_end_chain_opt,
@@ -411,3 +416,135 @@ class DataStoreTest(unittest.TestCase):
         """Test value of data-store persist flag"""
 
         self.assertTrue(DataStore._persist, 'unexpected value for data-store persist flag')
+
+        self.assertTrue(DataStore._persist_by_key, 'unexpected value for data-store persist-by-key flag')
+
+    def test_persist_in_dir(self):
+        """Test columnar persistence of data store"""
+
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+
+        ds = DataStore()
+        ds['df'] = pd.DataFrame({'num': np.arange(4), 'str': list('abcd'),
+                                 'ts': pd.date_range('2017-01-01', periods=4)}, index=list('wxyz'))
+        ds['arr'] = np.arange(6.).reshape(2, 3)
+        ds['obj'] = {'foo': 'bar'}
+        ds.persist_in_dir(tmp_dir + '/ds.columnar')
+        ds_ = DataStore.import_from_dir(tmp_dir + '/ds.columnar')
+
+        self.assertIsInstance(ds_, DataStore)
+        self.assertSetEqual(set(ds_.keys()), {'df', 'arr', 'obj'})
+        pd.testing.assert_frame_equal(ds_['df'], ds['df'])
+        np.testing.assert_array_equal(ds_['arr'], ds['arr'])
+        self.assertDictEqual(ds_['obj'], ds['obj'])
+
+    def test_lazy_import(self):
+        """Test lazy import of data store from persistence backend"""
+
+        from ..process_services import PersistedObject
+
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+
+        ds = DataStore()
+        ds['arr'] = np.arange(6.)
+        ds['obj'] = {'foo': 'bar'}
+        ds.persist_in_dir(tmp_dir + '/ds.columnar')
+        ds_ = DataStore.import_from_dir(tmp_dir + '/ds.columnar', lazy=True)
+
+        # objects are only loaded on access
+        self.assertSetEqual(set(ds_.keys()), {'arr', 'obj'})
+        self.assertIsInstance(dict.__getitem__(ds_, 'obj'), PersistedObject)
+        self.assertDictEqual(ds_.get('obj'), ds['obj'])
+        self.assertDictEqual(dict.__getitem__(ds_, 'obj'), ds['obj'])
+        self.assertIsInstance(dict.__getitem__(ds_, 'arr'), PersistedObject)
+        self.assertIsNotNone(ds_._access_stats['obj']['load_time'])
+        self.assertIsNone(ds_._access_stats['arr']['load_time'])
+        np.testing.assert_array_equal(dict(ds_.items())['arr'], ds['arr'])
+
+        # placeholders are not returned by any accessor
+        for get_objs in (lambda d: dict(d), lambda d: {**d}, lambda d: d.copy(), lambda d: dict(d.items()),
+                         lambda d: dict(zip(d.keys(), d.values())), lambda d: dict((k, d.pop(k)) for k in list(d))):
+            ds_ = DataStore.import_from_dir(tmp_dir + '/ds.columnar', lazy=True)
+            objs = get_objs(ds_)
+            self.assertSetEqual(set(objs), {'arr', 'obj'})
+            self.assertFalse(any(isinstance(obj, PersistedObject) for obj in objs.values()))
+        ds_ = DataStore.import_from_dir(tmp_dir + '/ds.columnar', lazy=True)
+        self.assertEqual(ds_.popitem()[1], ds['obj'])
+        del ds['arr']
+        ds.persist_in_dir(tmp_dir + '/ds_obj.columnar')
+        ds_ = DataStore.import_from_dir(tmp_dir + '/ds_obj.columnar', lazy=True)
+        self.assertTrue(ds_ == {'obj': {'foo': 'bar'}})
+        self.assertFalse(ds_ != {'obj': {'foo': 'bar'}})
+
+    def test_incremental_persistence(self):
+        """Test linking of unmodified objects when persisting data store"""
+
+        from ..persistence import ColumnarStore
+
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+
+        ds = DataStore()
+        ds['arr'] = np.arange(6.)
+        ds['obj'] = {'foo': 'bar'}
+        ds.persist_in_dir(tmp_dir + '/1.columnar')
+        self.assertSetEqual(ds.unmodified_keys(), {'arr', 'obj'})
+        ds['obj'] = {'foo': 'baz'}
+        self.assertSetEqual(ds.unmodified_keys(), {'arr'})
+        ds.persist_in_dir(tmp_dir + '/2.columnar')
+
+        # unmodified object is linked, modified object is written
+        store1, store2 = ColumnarStore(tmp_dir + '/1.columnar'), ColumnarStore(tmp_dir + '/2.columnar')
+        inode = lambda st, k: os.stat(os.path.join(st.dir_path, st.files(k)[0])).st_ino
+        self.assertEqual(inode(store2, 'arr'), inode(store1, 'arr'))
+        self.assertNotEqual(inode(store2, 'obj'), inode(store1, 'obj'))
+        np.testing.assert_array_equal(store2.load('arr'), ds['arr'])
+        self.assertDictEqual(store2.load('obj'), ds['obj'])
+
+        # unmodified data store is linked when pickled, if requested
+        ds.persist_in_file(tmp_dir + '/1.pkl')
+        ds.persist_in_file(tmp_dir + '/2.pkl')
+        self.assertNotEqual(os.stat(tmp_dir + '/2.pkl').st_ino, os.stat(tmp_dir + '/1.pkl').st_ino)
+        ds.persist_in_file(tmp_dir + '/3.pkl', link_unmodified=True)
+        self.assertEqual(os.stat(tmp_dir + '/3.pkl').st_ino, os.stat(tmp_dir + '/2.pkl').st_ino)
+        ds_ = DataStore.import_from_file(tmp_dir + '/3.pkl')
+        self.assertDictEqual(ds_['obj'], ds['obj'])
+        self.assertSetEqual(ds_.unmodified_keys(), {'arr', 'obj'})
+
+        # deleted keys modify the data store; linked files are not overwritten
+        ds_.pop('obj')
+        ds_.persist_in_file(tmp_dir + '/2.pkl', link_unmodified=True)
+        self.assertNotIn('obj', DataStore.import_from_file(tmp_dir + '/2.pkl'))
+        self.assertIn('obj', DataStore.import_from_file(tmp_dir + '/3.pkl'))
+        ds_.clear()
+        self.assertSetEqual(ds_.unmodified_keys(), set())
+        self.assertSetEqual(ds_._modified_keys, {'arr'})
+
+    def test_spill(self):
+        """Test spilling of large objects to memory-mapped files"""
+
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+
+        ds = DataStore()
+        ds['small'] = np.arange(10.)
+        ds['arr'] = np.arange(1000.)
+        ds.enable_spill(tmp_dir, threshold=4000, memory_budget=24000)
+        ds['df'] = pd.DataFrame({'x': np.arange(1000.), 'y': np.arange(1000)})
+        ds['obj'] = ['foo'] * 1000
+        self.assertSetEqual(ds.spilled_keys(), set())
+
+        # least recently used object is spilled if budget is exceeded
+        ds['arr']
+        ds['arr2'] = np.ones(1000)
+        self.assertSetEqual(ds.spilled_keys(), {'df'})
+        self.assertIsInstance(ds['df']['x'].values.base, np.memmap)
+        np.testing.assert_array_equal(ds['df']['y'].values, np.arange(1000))
+        np.testing.assert_array_equal(ds['arr'], np.arange(1000.))
+
+        # replaced objects are no longer spilled
+        ds['df'] = 42
+        self.assertSetEqual(ds.spilled_keys(), set())
+        self.assertEqual(ds['df'], 42)
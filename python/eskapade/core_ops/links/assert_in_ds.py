@@ -38,6 +38,11 @@ class AssertInDs(Link):
 
         return
 
+    def data_keys(self):
+        """Get keys of data-store objects that are read by AssertInDs"""
+
+        return self.attr_data_keys()
+
     def execute(self):
         """ Execute AssertInDs """
 
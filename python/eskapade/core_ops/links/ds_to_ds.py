@@ -54,6 +54,14 @@ class DsToDs(Link):
         
         return StatusCode.Success
 
+    def data_keys(self):
+        """Get keys of data-store objects that are read and stored by DsToDs"""
+
+        store_keys = {self.storeKey} if self.copy or (self.move and not self.remove) else set()
+        if not self.copy or self.columnsToAdd is not None:
+            store_keys.add(self.readKey)
+        return {self.readKey}, store_keys
+
     def execute(self):
         """ Execute DsToDs """
 
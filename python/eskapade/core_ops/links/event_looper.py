@@ -15,9 +15,21 @@
 # **********************************************************************************
 
 
+import os
 import sys
-import copy
-from eskapade import StatusCode, Link, DataStore, ProcessManager
+import heapq
+import itertools
+import pickle
+import tempfile
+from collections import defaultdict
+from eskapade import StatusCode, Link, DataStore, ProcessManager, ConfigObject
+
+# number of lines per pickled block in spill files
+SPILL_BLOCK_SIZE = 1024
+
+# default number of lines per sorted run and maximum number of runs merged at once in external sort
+SORT_RUN_SIZE = 100000
+MERGE_FAN_IN = 64
 
 
 class EventLooper(Link):
@@ -28,6 +40,14 @@ class EventLooper(Link):
 
         Input lines are taken from sys.stdin, processed, and printed on screen.
 
+        If batch_size is set, lines are read and processed in batches of this
+        size.  Collected lines are then stored per batch: each execution
+        stores the next batch and requests a repeat of the chain by a
+        RepeatChain link, listening to "chainRepeatRequestBy_<name>", until
+        all lines have been stored.  Sorting is done by an external merge
+        sort and unique lines are selected per hash partition, using
+        temporary files, so memory use does not grow with the input size.
+
         :param str name: name of link
         :param str filename: file name where the strings are located (txt or similar). Default is None. (optional)
         :param str storeKey: key to collect in datastore. If set lines are collected. (optional)
@@ -35,6 +55,11 @@ class EventLooper(Link):
         :param bool sort: if true, sort lines before storage (optional)
         :param bool unique: if true, keep only unique lines before storage (optional),
         :param list skip_line_beginning_with: skip line if it starts with any of the list. input is list of strings. Default is ['#'] (optional)
+        :param int batch_size: number of lines per batch. Default is None (no batches). (optional)
+        :param list batch_processor_set: list of functions to apply to batches (lists) of lines, after the line processors; requires batch_size (optional)
+        :param int n_spill_partitions: number of hash partitions to select unique lines in batch mode. Default is 16. (optional)
+        :param int sort_run_size: number of lines per sorted run of the external sort in batch mode, and maximum number of lines of a hash partition that is deduplicated in memory. Default is 100000. (optional)
+        :param int merge_fan_in: maximum number of sorted runs merged at once; more runs are merged in several passes. Default is 64. (optional)
         """
 
         # initialize Link
@@ -48,7 +73,12 @@ class EventLooper(Link):
                              line_processor_set=[],
                              sort=False,
                              unique=False,
-                             skip_line_beginning_with=['#'])
+                             skip_line_beginning_with=['#'],
+                             batch_size=None,
+                             batch_processor_set=[],
+                             n_spill_partitions=16,
+                             sort_run_size=SORT_RUN_SIZE,
+                             merge_fan_in=MERGE_FAN_IN)
         
         # process keyword arguments
         self.check_extra_kwargs(kwargs)
@@ -61,6 +91,12 @@ class EventLooper(Link):
         # collect lines for storage
         self._collect = False
 
+        # batch mode: iterator over lines to store, next line, and spill files
+        self._output = None
+        self._next_line = None
+        self._n_sum_lines = 0
+        self._spill_dir = None
+
 
     def initialize(self):
         """ Perform basic checks of configured attributes
@@ -83,42 +119,55 @@ class EventLooper(Link):
             # successful, so switch linestream to file.
             self._linestream = self._f
 
+        if self.batch_size is not None:
+            assert isinstance(self.batch_size, int) and self.batch_size > 0, 'batch_size needs to be a positive integer.'
+        else:
+            assert not self.batch_processor_set, 'batch_processor_set requires batch_size.'
+        assert isinstance(self.n_spill_partitions, int) and self.n_spill_partitions > 0, \
+            'n_spill_partitions needs to be a positive integer.'
+        assert isinstance(self.sort_run_size, int) and self.sort_run_size > 0, \
+            'sort_run_size needs to be a positive integer.'
+        assert isinstance(self.merge_fan_in, int) and self.merge_fan_in > 1, \
+            'merge_fan_in needs to be an integer larger than one.'
+
         return StatusCode.Success
 
         
+    def data_keys(self):
+        """Get keys of data-store objects that are stored by EventLooper"""
+
+        return set(), {self.storeKey, 'n_' + self.storeKey, 'n_sum_' + self.storeKey} if self.storeKey else set()
+
     def execute(self):
         """Process all incoming lines.
 
         No output is printed except for lines that are passed on, 
         such that the output lines can be picked up again by another parser.
         """
+        if self.batch_size is not None:
+            return self._execute_batch()
+
         lines = []
 
         # default line stream is set to sys.stdin 
         # print or collect (processed) lines
-        for line in self._linestream: 
-            line = line.strip()
-            # skip empty and comment lines
-            if len(line)==0: continue
-            if any(line.startswith(c) for c in self.skip_line_beginning_with):
-                continue
-            myline = copy.deepcopy(line)
+        for line in self._lines():
             for func in self.line_processor_set:
-                myline = func(myline)
+                line = func(line)
             if not self._collect:
-                print (myline)
+                print (line)
             else:
-                lines.append(myline)
+                lines.append(line)
 
         if not self._collect:
             return StatusCode.Success
 
         # perform basic operations before storage, if desired:
-        # sorting and unique set.
-        if self.sort:
-            lines = sorted(lines)
+        # unique set and sorting.
         if self.unique:
             lines = list(set(lines))
+        if self.sort:
+            lines = sorted(lines)
 
         ds = ProcessManager().service(DataStore)
         ds[self.storeKey] = lines
@@ -126,10 +175,195 @@ class EventLooper(Link):
 
         return StatusCode.Success
 
+    def _lines(self):
+        """Iterate over stripped input lines, skipping empty and comment lines"""
+
+        for line in self._linestream:
+            line = line.strip()
+            if len(line) == 0:
+                continue
+            if any(line.startswith(c) for c in self.skip_line_beginning_with):
+                continue
+            yield line
+
+    def _batches(self):
+        """Iterate over batches of processed lines"""
+
+        lines = self._lines()
+        while True:
+            batch = list(itertools.islice(lines, self.batch_size))
+            if not batch:
+                return
+            for func in self.line_processor_set:
+                batch = [func(line) for line in batch]
+            for func in self.batch_processor_set:
+                batch = list(func(batch))
+            yield batch
+
+    def _execute_batch(self):
+        """Process lines in batches
+
+        Prints all lines, or stores the next batch of lines and requests a
+        repeat of the chain if more lines are left.
+        """
+
+        if not self._collect:
+            for batch in self._batches():
+                print('\n'.join(str(line) for line in batch))
+            return StatusCode.Success
+
+        # set up iterator over lines to store at first execution
+        if self._output is None:
+            if self.sort:
+                self._output = self._external_sort(line for batch in self._batches() for line in batch)
+            elif self.unique:
+                self._output = self._hash_unique()
+            else:
+                self._output = (line for batch in self._batches() for line in batch)
+            self._next_line = next(self._output, _END_OF_LINES)
+
+        # take next batch of lines
+        lines = []
+        while self._next_line is not _END_OF_LINES and len(lines) < self.batch_size:
+            lines.append(self._next_line)
+            self._next_line = next(self._output, _END_OF_LINES)
+        self._n_sum_lines += len(lines)
+
+        # pass on if more lines are coming up to the (possible) repeater at the end of chain
+        settings = ProcessManager().service(ConfigObject)
+        settings['chainRepeatRequestBy_' + self.name] = self._next_line is not _END_OF_LINES
+
+        ds = ProcessManager().service(DataStore)
+        ds[self.storeKey] = lines
+        ds['n_' + self.storeKey] = len(lines)
+        ds['n_sum_' + self.storeKey] = self._n_sum_lines
+        self.log().debug('Stored next <%d> lines; summing up to <%d>.', len(lines), self._n_sum_lines)
+
+        return StatusCode.Success
+
+    def _spill_dir_path(self):
+        """Get path of temporary directory for spill files"""
+
+        if self._spill_dir is None:
+            self._spill_dir = tempfile.TemporaryDirectory(prefix='eskapade_{}_'.format(self.name))
+        return self._spill_dir.name
+
+    def _spill_file(self):
+        """Open new temporary file to spill lines to"""
+
+        return tempfile.TemporaryFile(dir=self._spill_dir_path())
+
+    @staticmethod
+    def _spill(spill_file, lines):
+        """Write lines to spill file in blocks"""
+
+        lines = iter(lines)
+        for block in iter(lambda: list(itertools.islice(lines, SPILL_BLOCK_SIZE)), []):
+            pickle.dump(block, spill_file, pickle.HIGHEST_PROTOCOL)
+
+    def _write_run(self, lines):
+        """Write lines to new spill file that is closed after writing
+
+        :returns: path of spill file
+        """
+
+        fd, path = tempfile.mkstemp(dir=self._spill_dir_path())
+        with open(fd, 'wb') as run_file:
+            self._spill(run_file, lines)
+        return path
+
+    def _read_run(self, path):
+        """Iterate over lines in spill file written by _write_run and remove it afterwards"""
+
+        yield from self._read_spill(open(path, 'rb'))
+        os.remove(path)
+
+    @staticmethod
+    def _read_spill(spill_file):
+        """Iterate over lines in spill file, reading one block at a time"""
+
+        spill_file.seek(0)
+        try:
+            while True:
+                yield from pickle.load(spill_file)
+        except EOFError:
+            pass
+        finally:
+            spill_file.close()
+
+    def _external_sort(self, lines):
+        """Iterate over sorted lines
+
+        Runs of sort_run_size sorted lines are spilled to temporary files,
+        which are merged.  If there are more than merge_fan_in runs, groups
+        of runs are first merged into longer runs, so that no more than
+        merge_fan_in files are open at once.  With unique set, duplicate
+        lines are skipped.
+
+        :param lines: iterable of lines to sort
+        """
+
+        # write sorted runs
+        runs = []
+        lines = iter(lines)
+        for run in iter(lambda: list(itertools.islice(lines, self.sort_run_size)), []):
+            run.sort()
+            runs.append(self._write_run(self._unique_sorted(run) if self.unique else run))
+
+        # merge runs in passes of at most merge_fan_in runs
+        while len(runs) > self.merge_fan_in:
+            self.log().debug('Merging %d sorted runs of lines into longer runs', len(runs))
+            runs = [self._write_run(self._merge_runs(runs[start:start + self.merge_fan_in]))
+                    for start in range(0, len(runs), self.merge_fan_in)]
+        self.log().debug('Merging %d sorted runs of lines', len(runs))
+        yield from self._merge_runs(runs)
+
+    def _merge_runs(self, runs):
+        """Iterate over merged lines of sorted runs"""
+
+        lines = heapq.merge(*[self._read_run(run) for run in runs])
+        return self._unique_sorted(lines) if self.unique else lines
+
+    @staticmethod
+    def _unique_sorted(lines):
+        """Iterate over sorted lines, skipping duplicates"""
+
+        return (line for line, _ in itertools.groupby(lines))
+
+    def _hash_unique(self):
+        """Iterate over unique lines
+
+        Lines are spilled to temporary files by hash value, so equal lines
+        end up in the same partition.  The unique lines of the partitions
+        are selected one partition at a time.  Partitions with more than
+        sort_run_size lines are not loaded at once, but deduplicated with
+        the external sort, so memory usage does not grow with the input.
+        """
+
+        parts = [self._spill_file() for _ in range(self.n_spill_partitions)]
+        n_part_lines = [0] * len(parts)
+        for batch in self._batches():
+            part_lines = defaultdict(list)
+            for line in dict.fromkeys(batch):
+                part_lines[hash(line) % len(parts)].append(line)
+            for index, lines in part_lines.items():
+                self._spill(parts[index], lines)
+                n_part_lines[index] += len(lines)
+
+        for part, n_lines in zip(parts, n_part_lines):
+            if n_lines > self.sort_run_size:
+                yield from self._external_sort(self._read_spill(part))
+            else:
+                yield from dict.fromkeys(self._read_spill(part))
 
     def finalize(self):
-        """Close open file if present
+        """Close open file and remove temporary files, if present
         """
+        self._output = None
+        if self._spill_dir is not None:
+            self._spill_dir.cleanup()
+            self._spill_dir = None
+
         if self._f is not None:
             try:
                 self._f.close()
@@ -137,3 +371,7 @@ class EventLooper(Link):
                 return StatusCode.Recoverable
                 
         return StatusCode.Success
+
+
+# marker for end of lines to store
+_END_OF_LINES = object()
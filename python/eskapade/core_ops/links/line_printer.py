@@ -44,6 +44,11 @@ class LinePrinter(Link):
 
         return StatusCode.Success
 
+    def data_keys(self):
+        """Get keys of data-store objects that are read by LinePrinter"""
+
+        return self.attr_data_keys()
+
     def execute(self):
         """Execute LinePrinter
 
@@ -0,0 +1,79 @@
+import unittest
+import os
+import random
+import tempfile
+
+from eskapade.tests.observers import TestCaseObservable
+
+
+class EventLooperTest(unittest.TestCase, TestCaseObservable):
+
+    def setUp(self):
+        # --- write file with (duplicate) input lines and comments
+        random.seed(42)
+        fd, self.path = tempfile.mkstemp(suffix='.txt')
+        with os.fdopen(fd, 'w') as lines_file:
+            lines_file.write('# comment\n\n')
+            lines_file.write('\n'.join('line {:d}'.format(random.randint(0, 300)) for _ in range(1000)))
+
+    def _collect(self, **kwargs):
+        from eskapade import ProcessManager, DataStore, ConfigObject
+        from eskapade.core_ops.links import EventLooper
+
+        ds = ProcessManager().service(DataStore)
+        settings = ProcessManager().service(ConfigObject)
+        ds.pop('n_sum_lines', None)
+
+        link = EventLooper(filename=self.path, storeKey='lines', line_processor_set=[str.upper], **kwargs)
+        link.initialize()
+        batches = []
+        while True:
+            link.execute()
+            batches.append(ds['lines'])
+            if not settings.get('chainRepeatRequestBy_' + link.name):
+                break
+        link.finalize()
+        self.assertEqual(ds.get('n_sum_lines', ds['n_lines']), sum(len(b) for b in batches))
+
+        return batches
+
+    def test_batches(self):
+        lines = self._collect()[0]
+        self.assertEqual(len(lines), 1000)
+
+        # --- same lines in batches of bounded size
+        batches = self._collect(batch_size=64)
+        self.assertTrue(all(len(b) == 64 for b in batches[:-1]))
+        self.assertListEqual([line for b in batches for line in b], lines)
+
+        # --- sorted and unique lines
+        for sort, unique in ((True, False), (False, True), (True, True)):
+            lines = self._collect(sort=sort, unique=unique)[0]
+            batches = self._collect(sort=sort, unique=unique, batch_size=64, n_spill_partitions=3)
+            lines_batch = [line for b in batches for line in b]
+            if sort:
+                self.assertListEqual(lines_batch, lines)
+            else:
+                self.assertListEqual(sorted(lines_batch), sorted(lines))
+
+    def test_multi_pass_sort(self):
+        for unique in (False, True):
+            lines = self._collect(sort=True, unique=unique)[0]
+
+            # --- sorted runs smaller than batches, merged in several passes
+            batches = self._collect(sort=True, unique=unique, batch_size=64, sort_run_size=30, merge_fan_in=3)
+            self.assertListEqual([line for b in batches for line in b], lines)
+
+    def test_bounded_unique(self):
+        lines = self._collect(unique=True)[0]
+
+        # --- hash partitions larger than sorted runs are deduplicated with the external sort
+        batches = self._collect(unique=True, batch_size=64, n_spill_partitions=2, sort_run_size=30, merge_fan_in=3)
+        lines_batch = [line for b in batches for line in b]
+        self.assertEqual(len(lines_batch), len(set(lines_batch)))
+        self.assertListEqual(sorted(lines_batch), sorted(lines))
+
+    def tearDown(self):
+        os.remove(self.path)
+        from eskapade.core import execution
+        execution.reset_eskapade()
@@ -16,7 +16,28 @@
 import pandas as pd
 import numpy as np
 import ast
+import re
+from collections import Counter
 
+# lower-case strings interpreted as nan
+NAN_STRINGS = frozenset(('', 'none', 'nan'))
+
+# regular expressions for strings with simple literals, as interpreted by ast.literal_eval
+INT_LITERAL = re.compile(r'[ \t]*[+-]?(?:0+|[1-9][0-9]{0,17})[ \t]*')
+FLOAT_LITERAL = re.compile(r'[ \t]*[+-]?(?:(?:[0-9]+\.[0-9]*|\.[0-9]+)(?:[eE][+-]?[0-9]+)?|[0-9]+[eE][+-]?[0-9]+)[ \t]*')
+BOOL_LITERAL = re.compile(r'[ \t]*(?:True|False)[ \t]*')
+
+# regular expression for strings that may contain other literals: strings with quotes or comments and strings
+# with only characters of numbers and containers that do not start with a name other than True, False, and None
+MAYBE_LITERAL = re.compile(r'.*[\'"#].*|\s*(?:True|False|None|[0-9_.,:+\-()\[\]{}\\])[0-9A-Za-z_.,:+\-()\[\]{}\s\\]*',
+                           re.DOTALL | re.ASCII)
+
+# range of 64-bit integers
+_INT64_MIN, _INT64_MAX = np.iinfo(np.int64).min, np.iinfo(np.int64).max
+
+# regular expressions for strings that are converted by int() and float()
+INT_STRING = re.compile(r'[ \t\n\r]*[+-]?[0-9]{1,18}[ \t\n\r]*')
+FLOAT_STRING = re.compile(r'[ \t\n\r]*[+-]?(?:[0-9]+\.?[0-9]*|\.[0-9]+)(?:[eE][+-]?[0-9]+)?[ \t\n\r]*')
 
 def check_nan(val):
     """Check input value for not a number
@@ -182,3 +203,278 @@ CONV_FUNCS = {str: to_str,
               float: to_float,
               np.float64: to_float,
               np.datetime64: to_date_time}
+
+
+def element_types(values):
+    """Get types of the elements of an array
+
+    :param values: array of values
+    :returns: types of values
+    :rtype: numpy.ndarray
+    """
+
+    return pd.Series(values, dtype=object, copy=False).map(type).values
+
+
+def _identity(val):
+    """Return input value"""
+
+    return val
+
+
+def _type_mask(types, *type_list):
+    """Get mask of elements with one of the specified types"""
+
+    return np.fromiter((t in type_list for t in types), dtype=bool, count=len(types))
+
+
+def _str_mask(values, types=None):
+    """Get mask and positions of string elements"""
+
+    types = element_types(values) if types is None else types
+    mask = _type_mask(types, str)
+    return mask, np.flatnonzero(mask)
+
+
+def _fullmatch(strs, pattern):
+    """Get mask of strings that match compiled pattern"""
+
+    return np.fromiter(map(bool, map(pattern.fullmatch, strs)), dtype=bool, count=len(strs))
+
+
+def _str_match(values, types, pattern):
+    """Get mask of string elements that match pattern"""
+
+    mask = _type_mask(types, str)
+    if mask.any():
+        mask[mask] = _fullmatch(values[mask], pattern)
+    return mask
+
+
+def _set_values(out, pos, vals):
+    """Set values of object array at positions"""
+
+    for p, v in zip(pos, vals):
+        out[p] = v
+
+
+def infer_column(values, index=None, name=None):
+    """Create column from values with data type as inferred by pandas.Series.apply
+
+    :param numpy.ndarray values: object array of column values
+    :param index: index of column
+    :param name: name of column
+    :returns: column with inferred data type
+    :rtype: pandas.Series
+    """
+
+    is_null = pd.isnull(values)
+    has_null = is_null.any()
+    non_null = values[~is_null]
+    kind = pd.api.types.infer_dtype(non_null, skipna=False)
+    dtype = None
+    if kind == 'floating':
+        dtype = np.float64
+    elif kind in ('integer', 'mixed-integer-float'):
+        # integers out of the int64 range are left to pandas
+        int_mask = _type_mask(element_types(non_null), int)
+        if all(_INT64_MIN <= v <= _INT64_MAX for v in non_null[int_mask]):
+            dtype = np.float64 if has_null or kind != 'integer' else np.int64
+    elif kind == 'string':
+        dtype = object
+    elif kind == 'boolean' and not has_null:
+        dtype = bool
+    if dtype is None:
+        # other columns (mixed types, complex numbers, large integers) are inferred by pandas itself, as in apply
+        return pd.Series(values, index=index, name=name, dtype=object, copy=False).map(_identity)
+    if dtype is not object:
+        return pd.Series(values.astype(dtype), index=index, name=name)
+    return pd.Series(values, index=index, name=name, dtype=dtype)
+
+
+def check_nan_column(col):
+    """Check values in column for not a number
+
+    Vectorized equivalent of col.apply(check_nan).
+
+    :param pandas.Series col: column to be checked for nans
+    :returns: true for nan values
+    :rtype: numpy.ndarray
+    """
+
+    is_nan = col.isnull().values.copy()
+    if col.dtype == object and len(col):
+        str_mask = _str_mask(col.values)[0]
+        if str_mask.any():
+            strs = col.values[str_mask]
+            is_nan[str_mask] = np.fromiter(map(NAN_STRINGS.__contains__, map(str.lower, map(str.strip, strs))),
+                                           dtype=bool, count=len(strs))
+    return is_nan
+
+
+def convert_column(col):
+    """Convert values in column to interpreted data types
+
+    Vectorized equivalent of col.apply(convert).  Strings with integer,
+    float, and boolean literals are converted directly.  Only strings that
+    may contain other literals are interpreted with ast.literal_eval.
+
+    :param pandas.Series col: column to be interpreted
+    :returns: interpreted column
+    :rtype: pandas.Series
+    """
+
+    if col.dtype != object:
+        return col.copy()
+
+    values = col.values.copy()
+    str_mask, str_pos = _str_mask(values)
+    if not len(str_pos):
+        return infer_column(values, col.index, col.name)
+
+    strs = values[str_pos]
+    is_int = _fullmatch(strs, INT_LITERAL)
+    is_float = ~is_int & _fullmatch(strs, FLOAT_LITERAL)
+    is_bool = ~is_int & ~is_float & _fullmatch(strs, BOOL_LITERAL)
+    if is_int.any():
+        _set_values(values, str_pos[is_int], (int(v) for v in strs[is_int]))
+    if is_float.any():
+        _set_values(values, str_pos[is_float], strs[is_float].astype(np.float64).tolist())
+    if is_bool.any():
+        _set_values(values, str_pos[is_bool], (v.strip(' \t') == 'True' for v in strs[is_bool]))
+
+    # interpret remaining strings only if they may contain a literal
+    rest_pos = str_pos[~(is_int | is_float | is_bool)]
+    rest_pos = rest_pos[_fullmatch(values[rest_pos], MAYBE_LITERAL)]
+    _set_values(values, rest_pos, [convert(v) for v in values[rest_pos]])
+
+    return infer_column(values, col.index, col.name)
+
+
+def column_type_counts(col):
+    """Count types of values in column
+
+    Vectorized equivalent of Counter(col.apply(type).value_counts().to_dict()).
+
+    :param pandas.Series col: input column
+    :returns: type counts
+    :rtype: collections.Counter
+    """
+
+    if not len(col):
+        return Counter()
+    if col.dtype.kind in 'biuf':
+        return Counter({col.iloc[:1].apply(type).iloc[0]: len(col)})
+    return Counter(map(type, col.astype(object).values))
+
+
+def _convert_column(col, fnc, convert_fncs, kwargs):
+    """Convert column values with vectorized functions for selected types
+
+    :param pandas.Series col: column to be converted
+    :param fnc: element-wise conversion function for remaining values
+    :param list convert_fncs: (mask function, array conversion function) pairs
+    :param dict kwargs: keyword arguments of conversion function
+    :returns: converted column
+    :rtype: pandas.Series
+    """
+
+    values = col.astype(object).values
+    out = np.empty(len(values), dtype=object)
+    done = pd.isnull(values)
+    out[done] = kwargs['nan']
+    types = element_types(values)
+    for mask_fnc, conv_fnc in convert_fncs:
+        pos = np.flatnonzero(~done)
+        mask = mask_fnc(values[pos], types[pos])
+        if not mask.any():
+            continue
+        try:
+            _set_values(out, pos[mask], conv_fnc(values[pos[mask]]))
+        except (OverflowError, TypeError, ValueError):
+            continue
+        done[pos[mask]] = True
+    rest = np.flatnonzero(~done)
+    _set_values(out, rest, [fnc(v, **kwargs) for v in values[rest]])
+
+    return infer_column(out, col.index, col.name)
+
+
+def to_str_column(col, **kwargs):
+    """Convert column values to string
+
+    Vectorized equivalent of col.apply(to_str, **kwargs).
+
+    :param pandas.Series col: column to be converted
+    :returns: converted column
+    :rtype: pandas.Series
+    """
+
+    convert_fncs = [(lambda v, t: _type_mask(t, str), lambda v: v)]
+    if kwargs.get('convert_inconsistent_dtypes', True):
+        convert_fncs.append((lambda v, t: np.ones(len(v), dtype=bool), lambda v: map(str, v)))
+    return _convert_column(col, to_str, convert_fncs, kwargs)
+
+
+def to_int_column(col, **kwargs):
+    """Convert column values to int
+
+    Vectorized equivalent of col.apply(to_int, **kwargs).
+
+    :param pandas.Series col: column to be converted
+    :returns: converted column
+    :rtype: pandas.Series
+    """
+
+    def from_float(v):
+        vals = v.astype(np.float64)
+        if not (np.abs(vals) < 2 ** 63).all():
+            raise OverflowError('float values out of int64 range')
+        return list(vals.astype(np.int64))
+
+    convert_fncs = [(lambda v, t: _type_mask(t, int, bool, np.int64), lambda v: list(v.astype(np.int64)))]
+    if kwargs.get('convert_inconsistent_dtypes', True):
+        convert_fncs += [(lambda v, t: _type_mask(t, float, np.float64), from_float),
+                         (lambda v, t: _str_match(v, t, INT_STRING), lambda v: list(v.astype(np.int64)))]
+    return _convert_column(col, to_int, convert_fncs, kwargs)
+
+
+def to_float_column(col, **kwargs):
+    """Convert column values to float
+
+    Vectorized equivalent of col.apply(to_float, **kwargs).
+
+    :param pandas.Series col: column to be converted
+    :returns: converted column
+    :rtype: pandas.Series
+    """
+
+    convert_fncs = [(lambda v, t: _type_mask(t, float, np.float64), lambda v: list(v.astype(np.float64)))]
+    if kwargs.get('convert_inconsistent_dtypes', True):
+        convert_fncs += [(lambda v, t: _type_mask(t, int, bool, np.int64), lambda v: list(v.astype(np.float64))),
+                         (lambda v, t: _str_match(v, t, FLOAT_STRING), lambda v: list(v.astype(np.float64)))]
+    return _convert_column(col, to_float, convert_fncs, kwargs)
+
+
+def bool_to_str_column(col, **kwargs):
+    """Convert column values from boolean to string
+
+    Vectorized equivalent of col.apply(bool_to_str, **kwargs).
+
+    :param pandas.Series col: column to be converted
+    :returns: converted column
+    :rtype: pandas.Series
+    """
+
+    if kwargs.get('convert_inconsistent_dtypes', True):
+        convert_fncs = [(lambda v, t: np.ones(len(v), dtype=bool), lambda v: map(str, v))]
+    else:
+        convert_fncs = [(lambda v, t: _type_mask(t, bool, np.bool_), lambda v: map(str, v))]
+    return _convert_column(col, bool_to_str, convert_fncs, kwargs)
+
+
+# vectorized equivalents of conversion functions
+COLUMN_CONV_FUNCS = {to_str: to_str_column,
+                     to_int: to_int_column,
+                     to_float: to_float_column,
+                     bool_to_str: bool_to_str_column}
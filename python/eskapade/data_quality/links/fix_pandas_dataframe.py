@@ -23,7 +23,8 @@ from collections import Counter
 #import fastnumbers
 
 from eskapade import ProcessManager, ConfigObject, Link, DataStore, StatusCode
-from eskapade.data_quality.dq_helper import check_nan, convert, CONV_FUNCS
+from eskapade.data_quality.dq_helper import CONV_FUNCS, COLUMN_CONV_FUNCS
+from eskapade.data_quality.dq_helper import check_nan_column, convert_column, column_type_counts
 
 
 class FixPandasDataFrame(Link):
@@ -89,6 +90,12 @@ class FixPandasDataFrame(Link):
         :param list var_bool_to_int: convert boolean column to int (default is conversion of boolean to string)
         :param bool inplace: replace original columns; overwrites store_key to read_key (default is False)
         :param str store_key: key of output data to store in data store
+        :param int infer_sample_size: if set, infer column data types from the first, last, and randomly selected
+                                      infer_sample_size non-nan rows of the first dataframe; the data types are
+                                      re-assessed on the full column only if converting it to the inferred type
+                                      introduces nans; columns of next dataframes are only converted to the
+                                      inferred types, and marked as contaminated if that introduces nans
+                                      (default is None: use all rows)
         """
 
         # initialize Link, pass name from kwargs
@@ -115,7 +122,8 @@ class FixPandasDataFrame(Link):
                              inplace=False,
                              store_key='',
                              nan_dtype_map={},
-                             nan_default=np.nan)
+                             nan_default=np.nan,
+                             infer_sample_size=None)
 
         # check residual kwargs. exit if any present.
         self.check_extra_kwargs(kwargs)
@@ -126,6 +134,8 @@ class FixPandasDataFrame(Link):
                            self.var_nan, self.var_convert_func, self.var_convert_inconsistent_nans]
         self._df_orig_dtype = {}
         self._cnts = {}
+        self._sampled_columns = []
+        self._rng = None
 
         # set nans for individual data types
         if np.int64 not in self.nan_dtype_map:
@@ -173,8 +183,75 @@ class FixPandasDataFrame(Link):
             except BaseException:
                 raise TypeError('unknown assigned datatype to variable "%s"' % k)
 
+        # random generator for sampling rows to infer data types
+        if self.infer_sample_size:
+            settings = ProcessManager().service(ConfigObject)
+            self._rng = np.random.RandomState(settings['seeds'][self.name])
+
         return StatusCode.Success
 
+    def _sample_indices(self, n_rows):
+        """Get indices of sampled rows: first, last, and random rows"""
+
+        size = self.infer_sample_size
+        if n_rows <= 3 * size:
+            return np.arange(n_rows)
+        rand = size + self._rng.choice(n_rows - 2 * size, size, replace=False)
+        return np.concatenate([np.arange(size), np.sort(rand), np.arange(n_rows - size, n_rows)])
+
+    def _convert_dtype(self, column, col):
+        """Convert values in column to the data type of the column
+
+        :param pandas.Series column: column values
+        :param str col: column name
+        :returns: converted column and value of nans in converted column
+        :rtype: (pandas.Series, object)
+        """
+
+        dt = self.var_dtype[col]
+        self.log().debug('Converting rows in column "%s" to type "%s"', col, dt)
+        # pick conversion function of choice
+        if col in self.var_convert_func:
+            fnc = self.var_convert_func[col]
+        elif col in self.var_bool_to_int:
+            fnc = bool_to_int
+        elif dt in CONV_FUNCS:
+            fnc = CONV_FUNCS[dt]
+        else:
+            raise RuntimeError('Do not know how to convert column "%s"' % col)
+        # convert inconsistent dtypes?
+        convert_inconsistent_dtypes = self.var_convert_inconsistent_dtypes[
+            col] if col in self.var_convert_inconsistent_dtypes else self.convert_inconsistent_dtypes
+        convert_inconsistent_nans = self.var_convert_inconsistent_nans[
+            col] if col in self.var_convert_inconsistent_nans else self.convert_inconsistent_nans
+        fnc_kw = {}
+        fnc_kw['convert_inconsistent_dtypes'] = convert_inconsistent_dtypes
+        # pick nan of choice
+        if col in self.var_nan:
+            fnc_kw['nan'] = self.var_nan[col]
+            if convert_inconsistent_nans:
+                rdt = dt if col not in self.var_bool_to_int else np.int64
+                if not isinstance(self.var_nan[col], rdt):
+                    fnc_kw['nan'] = self.nan_dtype_map[rdt]
+                    self.log().warning('Chosen nan for col "%s" not of type "%s"; reverting to default nan: "%s"',
+                                       col, rdt, self.nan_dtype_map[dt])
+        else:
+            if convert_inconsistent_nans:
+                fnc_kw['nan'] = self.nan_dtype_map[dt]
+            else:
+                fnc_kw['nan'] = self.nan_default
+        # apply dtype fix here, on the full column at once if possible
+        if fnc in COLUMN_CONV_FUNCS:
+            return COLUMN_CONV_FUNCS[fnc](column, **fnc_kw), fnc_kw['nan']
+        return column.apply(fnc, **fnc_kw), fnc_kw['nan']
+
+    def data_keys(self):
+        """Get keys of data-store objects that are read and stored by FixPandasDataFrame"""
+
+        if self.inplace or self.store_key == self.read_key:
+            return {self.read_key}, {self.read_key}
+        return {self.read_key}, {self.store_key if self.store_key else self.read_key + '_fix'}
+
     def execute(self):
         """Execute FixPandasDataFrame
 
@@ -273,9 +350,11 @@ class FixPandasDataFrame(Link):
         #    check on nans
         n_df = len(df_.index)
         is_nan = pd.DataFrame(index=df_.index)
-        check_nan_func = check_nan if not self.check_nan_func else self.check_nan_func
         for col in self.fixed_columns:
-            is_nan[col] = df_[col].apply(check_nan_func)
+            if self.check_nan_func:
+                is_nan[col] = df_[col].apply(self.check_nan_func)
+            else:
+                is_nan[col] = check_nan_column(df_[col])
             n_nan = is_nan[col].values.sum()
             if n_nan:
                 self.log().debug('Column "%s" contains %d NaNs out of %d', col, n_nan, n_df)
@@ -289,12 +368,31 @@ class FixPandasDataFrame(Link):
         # 3. multiple datatypes in columns besides nans?
         #    find most common one per column
         keep = is_nan == False
+        sampled_now = []
+        convert_columns = []
         for col in self.fixed_columns:
-            if col in self.var_dtype:
+            if col in self.var_dtype and col not in self._sampled_columns:
+                continue
+            if col not in self.var_dtype and self.infer_sample_size:
+                # infer data type from a sample of the column
+                dfcol = df_[col][keep[col]]
+                sample = convert_column(dfcol.iloc[self._sample_indices(len(dfcol))])
+                dtype_cnt = normalized_type_counts(sample)
+                self._cnts[col] = dtype_cnt
+                self.var_dtype[col] = determine_preferred_dtype(dtype_cnt) if dtype_cnt else self._df_orig_dtype[col]
+                self._sampled_columns.append(col)
+                sampled_now.append(col)
+            if col in self._sampled_columns:
+                # data type inferred from a sample: only convert if pandas type differs
+                dt = df_[col].dtype.type
+                if dt is np.object_ and self.var_dtype[col] is np.bool_:
+                    df_[col] = convert_column(df_[col])
+                    dt = df_[col].dtype.type
+                if (str if dt is np.object_ else dt) is not self.var_dtype[col]:
+                    convert_columns.append(col)
                 continue
-            df_[col] = df_[col].apply(convert)  # fastnumbers.fast_real) #convert)
-            dfcol = df_[col][keep[col]]
-            dtype_cnt = Counter(dfcol.apply(type).value_counts().to_dict())
+            df_[col] = convert_column(df_[col])
+            dtype_cnt = normalized_type_counts(df_[col][keep[col]])
             # for bookkeeping
             self._cnts[col] = dtype_cnt
             if len(dtype_cnt) == 0:
@@ -304,20 +402,13 @@ class FixPandasDataFrame(Link):
                     self.var_dtype[col] = self._df_orig_dtype[col]
                 continue
             # store most common datatype
-            # first convert to consistent types
-            dtype_lst = list(dtype_cnt.keys())
-            for dtp in dtype_lst:
-                ndt = np.dtype(dtp).type
-                if ndt is np.str_ or ndt is np.object_:
-                    ndt = str
-                mc = dtype_cnt.pop(dtp)
-                dtype_cnt[ndt] += mc
             prefered_dtype = determine_preferred_dtype(dtype_cnt)
             if col not in self.var_dtype:
                 self.var_dtype[col] = prefered_dtype
-            if len(dtype_cnt) > 1:
+            if len(dtype_cnt) > 1 or self.var_dtype[col] != prefered_dtype:
                 self.log().warning('Found multiple types for column "%s"', col)
-                self.log().debug('Picked type "%s" for column "%s" (counts: %s)', prefered_dtype, col, str(dtype_cnt))
+                self.log().debug('Picked type "%s" for column "%s" (counts: %s)', self.var_dtype[col], col,
+                                 str(dtype_cnt))
                 if col not in self.contaminated_columns:
                     self.contaminated_columns.append(col)
 
@@ -326,41 +417,35 @@ class FixPandasDataFrame(Link):
                         ', '.join('"{}"'.format(c) for c in self.contaminated_columns))
 
         # 4. fix contamination in each column
-        for col in self.contaminated_columns:
-            dt = self.var_dtype[col]
-            self.log().debug('Converting rows in column "%s" to type "%s"', col, dt)
-            # pick conversion function of choice
-            if col in self.var_convert_func:
-                fnc = self.var_convert_func[col]
-            elif col in self.var_bool_to_int:
-                fnc = bool_to_int
-            elif dt in CONV_FUNCS:
-                fnc = CONV_FUNCS[dt]
-            else:
-                raise RuntimeError('Do not know how to convert column "%s"' % col)
-            # convert inconsistent dtypes?
-            convert_inconsistent_dtypes = self.var_convert_inconsistent_dtypes[
-                col] if col in self.var_convert_inconsistent_dtypes else self.convert_inconsistent_dtypes
-            convert_inconsistent_nans = self.var_convert_inconsistent_nans[
-                col] if col in self.var_convert_inconsistent_nans else self.convert_inconsistent_nans
-            fnc_kw = {}
-            fnc_kw['convert_inconsistent_dtypes'] = convert_inconsistent_dtypes
-            # pick nan of choice
-            if col in self.var_nan:
-                fnc_kw['nan'] = self.var_nan[col]
-                if convert_inconsistent_nans:
-                    rdt = dt if col not in self.var_bool_to_int else np.int64
-                    if not isinstance(self.var_nan[col], rdt):
-                        fnc_kw['nan'] = self.nan_dtype_map[rdt]
-                        self.log().warning('Chosen nan for col "%s" not of type "%s"; reverting to default nan: "%s"',
-                                           col, rdt, self.nan_dtype_map[dt])
-            else:
-                if convert_inconsistent_nans:
-                    fnc_kw['nan'] = self.nan_dtype_map[dt]
-                else:
-                    fnc_kw['nan'] = self.nan_default
-            # apply dtype fix here
-            df_[col] = df_[col].apply(fnc, **fnc_kw)
+        checked_columns = [c for c in convert_columns if c not in self.contaminated_columns]
+        for col in self.contaminated_columns + checked_columns:
+            column = df_[col]
+            df_[col], nan = self._convert_dtype(column, col)
+            if col not in checked_columns:
+                continue
+
+            # check for values that are inconsistent with the type inferred from a sample: these are converted to nans
+            is_nan = df_[col].isnull().values
+            if not pd.isnull(nan):
+                is_nan |= (df_[col].values == nan)
+            n_incons = int((is_nan & keep[col].values).sum())
+            if not n_incons:
+                continue
+            self.log().warning('Found %d values in column "%s" that are inconsistent with type "%s" inferred from '
+                               'sample', n_incons, col, self.var_dtype[col])
+            self.contaminated_columns.append(col)
+            if col not in sampled_now:
+                continue
+
+            # re-assess data type on the full column of the first dataframe
+            column = convert_column(column)
+            dtype_cnt = normalized_type_counts(column[keep[col]])
+            self._cnts[col] = dtype_cnt
+            prefered_dtype = determine_preferred_dtype(dtype_cnt)
+            self.log().debug('Picked type "%s" for column "%s" (counts: %s)', prefered_dtype, col, str(dtype_cnt))
+            if prefered_dtype is not self.var_dtype[col]:
+                self.var_dtype[col] = prefered_dtype
+                df_[col] = self._convert_dtype(column, col)[0]
 
         # storage
         ds[self.store_key] = df_
@@ -368,6 +453,18 @@ class FixPandasDataFrame(Link):
         return StatusCode.Success
 
 
+def normalized_type_counts(col):
+    """Count types of values in column, with types converted to consistent types"""
+
+    dtype_cnt = Counter()
+    for dtp, cnt in column_type_counts(col).items():
+        ndt = np.dtype(dtp).type
+        if ndt is np.str_ or ndt is np.object_:
+            ndt = str
+        dtype_cnt[ndt] += cnt
+    return dtype_cnt
+
+
 def determine_preferred_dtype(dtype_cnt):
     """Determine preferred column data type"""
 
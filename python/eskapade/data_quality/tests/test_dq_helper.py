@@ -0,0 +1,60 @@
+import unittest
+import numpy as np
+import pandas as pd
+
+from collections import Counter
+
+from eskapade.tests.observers import TestCaseObservable
+from eskapade.data_quality import dq_helper
+
+
+class DqHelperTest(unittest.TestCase, TestCaseObservable):
+
+    def setUp(self):
+        self.values = ['1', ' -2', '007', '1.5', '.5e1', 'True', 'None', 'nan', '', 'foo', '2017-1-1', '12/31',
+                       '[1, 2]', "'bar'", '1 # comment', 1, 2.5, np.nan, None, True]
+
+    def assertColumnEqual(self, col, col_exp):
+        self.assertEqual(col.dtype, col_exp.dtype)
+        for val, val_exp in zip(col.values, col_exp.values):
+            self.assertIs(type(val), type(val_exp))
+            if not (isinstance(val, float) and np.isnan(val) and np.isnan(val_exp)):
+                self.assertEqual(val, val_exp)
+
+    def test_check_nan_column(self):
+        col = pd.Series(self.values)
+        np.testing.assert_array_equal(dq_helper.check_nan_column(col), col.apply(dq_helper.check_nan).values)
+
+    def test_convert_column(self):
+        for values in (self.values, ['1', '2', '3'], ['1', '2.5', np.nan], ['True', 'False']):
+            col = pd.Series(values)
+            conv_col = dq_helper.convert_column(col)
+            conv_col_exp = col.apply(dq_helper.convert)
+            self.assertColumnEqual(conv_col, conv_col_exp)
+            self.assertEqual(dq_helper.column_type_counts(conv_col),
+                             Counter(conv_col_exp.apply(type).value_counts().to_dict()))
+
+    def test_convert_mixed_column(self):
+        big = str(10 ** 20)
+        for values in ([big, None], [big, np.nan], [big, '1.5'], [big, '(1+2j)'], [10 ** 20, 1j], [str(2 ** 63 + 1)],
+                       [str(2 ** 63 + 1), '1'], ['-' + big, '2'], [1, '1.5', '(2+1j)'], ['1j', None], ['1', None],
+                       ['True', None], ['True', '1'], [1, True], [None, np.nan], [None, None], []):
+            col = pd.Series(values, dtype=object)
+            conv_col = dq_helper.convert_column(col)
+            conv_col_exp = col.apply(dq_helper.convert)
+            self.assertEqual(conv_col.dtype, conv_col_exp.dtype, msg=repr(values))
+            self.assertEqual(repr(conv_col.tolist()), repr(conv_col_exp.tolist()), msg=repr(values))
+
+    def test_type_mask(self):
+        types = np.array([int, np.int64, float, str, np.int64], dtype=object)
+        np.testing.assert_array_equal(dq_helper._type_mask(types, int, np.int64), [True, True, False, False, True])
+        np.testing.assert_array_equal(dq_helper._type_mask(types[:0], str), [])
+
+    def test_column_conv_funcs(self):
+        for values in (self.values, [1.5, -2.7, np.nan], ['1', '2', np.nan]):
+            col = pd.Series(values)
+            for fnc, col_fnc in dq_helper.COLUMN_CONV_FUNCS.items():
+                for nan in (np.nan, -999, 'not_a_str'):
+                    for conv in (True, False):
+                        self.assertColumnEqual(col_fnc(col, nan=nan, convert_inconsistent_dtypes=conv),
+                                               col.apply(fnc, nan=nan, convert_inconsistent_dtypes=conv))
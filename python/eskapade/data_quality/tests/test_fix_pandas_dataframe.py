@@ -0,0 +1,73 @@
+import unittest
+import numpy as np
+import pandas as pd
+
+from eskapade.tests.observers import TestCaseObservable
+
+
+class FixPandasDataFrameTest(unittest.TestCase, TestCaseObservable):
+
+    def setUp(self):
+        n = 1000
+        self.df = pd.DataFrame({'a': np.arange(n).astype(str), 'b': ['{:.1f}'.format(v) for v in np.arange(n) / 2.],
+                                'c': np.where(np.arange(n) % 2, 'foo', 'bar'), 'd': ['1'] * n})
+        # contamination outside the first and last rows
+        self.df.loc[500, 'd'] = 'bar'
+
+    def _fix(self, dfs, **kwargs):
+        from eskapade import ProcessManager, DataStore
+        from eskapade.data_quality import FixPandasDataFrame
+
+        ds = ProcessManager().service(DataStore)
+        link = FixPandasDataFrame(read_key='input', store_key='output', **kwargs)
+        link.initialize()
+        dfs_fix = []
+        for df in dfs:
+            ds['input'] = df
+            link.execute()
+            dfs_fix.append(ds['output'])
+        return dfs_fix, link
+
+    def test_sampled_type_inference(self):
+        dfs = [self.df.iloc[250:750], self.df.iloc[500:]]
+        dfs_fix, link = self._fix([self.df] + dfs)
+        dfs_fix_smp, link_smp = self._fix([self.df] + dfs, infer_sample_size=10)
+
+        # same data types and contamination
+        self.assertDictEqual(link_smp.var_dtype, link.var_dtype)
+        self.assertDictEqual(link_smp.var_dtype, dict(a=np.int64, b=np.float64, c=str, d=np.int64))
+        self.assertListEqual(sorted(link_smp.contaminated_columns), ['d'])
+        pd.testing.assert_frame_equal(dfs_fix_smp[0], dfs_fix[0])
+
+        # data types of first dataframe are used for next dataframes
+        for df_fix in dfs_fix_smp[1:]:
+            self.assertListEqual(df_fix.dtypes.tolist(), dfs_fix_smp[0].dtypes.tolist())
+
+    def test_sampled_type_not_reassessed(self):
+        df = self.df.iloc[:500]
+        df_next = df.assign(a=df.a.where(df.index != 100, 'foo'), b=df.b.astype(float))
+        dfs_fix, link = self._fix([df, df_next], infer_sample_size=10)
+
+        # inferred types are kept and next dataframes are converted to them; inconsistent values are contamination
+        self.assertDictEqual(link.var_dtype, dict(a=np.int64, b=np.float64, c=str, d=np.int64))
+        self.assertListEqual(link.contaminated_columns, ['a'])
+        self.assertListEqual(dfs_fix[1].dtypes.tolist(), [np.float64, np.float64, object, np.int64])
+        self.assertTrue(np.isnan(dfs_fix[1].a[100]))
+        np.testing.assert_array_equal(dfs_fix[1].a.drop(100).values, np.arange(500)[np.arange(500) != 100])
+
+    def test_sampled_type_reassessed(self):
+        # first dataframe is inconsistent with type inferred from sample
+        idx = self.df.index
+        df = self.df.assign(a=self.df.a.where((idx < 10) | (idx >= 990), self.df.a + '.5'))
+        dfs_fix, link = self._fix([df], infer_sample_size=10)
+        dfs_fix_full, link_full = self._fix([df])
+
+        # type re-assessed on full column
+        self.assertDictEqual(link.var_dtype, link_full.var_dtype)
+        self.assertIs(link.var_dtype['a'], np.float64)
+        self.assertListEqual(sorted(link.contaminated_columns), sorted(link_full.contaminated_columns))
+        pd.testing.assert_frame_equal(dfs_fix[0], dfs_fix_full[0])
+
+    def tearDown(self):
+        from eskapade.core import execution
+        execution.reset_eskapade()
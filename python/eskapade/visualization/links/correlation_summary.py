@@ -14,16 +14,181 @@
 # **********************************************************************************
 
 import os
+import concurrent.futures
 import pandas as pd
 import numpy as np
-#from sklearn.feature_selection import mutual_info_regression
 
 from eskapade import ProcessManager, ConfigObject, Link, DataStore, StatusCode
 from eskapade.core import persistence
 
-#ALL_CORRS = ['pearson', 'kendall', 'spearman', 'mutual_information', 'correlation_ratio']
-ALL_CORRS = ['pearson', 'kendall', 'spearman', 'correlation_ratio']
+ALL_CORRS = ['pearson', 'kendall', 'spearman', 'mutual_information', 'correlation_ratio']
 LINEAR_CORRS = ['pearson', 'kendall', 'spearman']
+BINNED_CORRS = ['mutual_information', 'correlation_ratio']
+
+# number of bins per variable: pandas.cut with the number of edges of numpy.histogram with default binning
+NUMBER_OF_BINS = 11
+
+# number of values (rows x columns) processed at once, to bound the memory of the contingency-table indices
+CHUNK_SIZE = 2 ** 16
+
+# maximum number of columns of a heatmap page with tick labels
+MAX_TICK_LABELS = 200
+
+
+def bin_codes(df, n_bins=NUMBER_OF_BINS):
+    """Bin all columns of data frame into integer codes
+
+    Each column is divided into bins of equal width between its minimum and
+    maximum, as by pandas.cut.  Missing values get code -1.
+
+    :param pandas.DataFrame df: input data frame with numerical columns
+    :param int n_bins: number of bins per column
+    :returns: bin codes (rows x columns)
+    :rtype: numpy.ndarray
+    """
+
+    codes = np.empty(df.shape, dtype=np.int64)
+    for it, col in enumerate(df.columns):
+        codes[:, it] = pd.cut(df[col], n_bins, labels=False).fillna(-1).values
+    return codes
+
+
+def _correlation_ratio_row(index, codes, values, filled, n_bins):
+    """Correlation ratios of all columns given the bins of one column
+
+    The per-bin counts and sums of all columns are accumulated with one
+    bincount over (bin, column) indices per chunk of rows.
+    """
+
+    n_rows, n_cols = values.shape
+    counts = np.zeros(n_bins * n_cols)
+    sums = np.zeros(n_bins * n_cols)
+    col_offsets = np.arange(n_cols)
+    chunk_rows = max(1, CHUNK_SIZE // n_cols)
+    for start in range(0, n_rows, chunk_rows):
+        x_codes = codes[start:start + chunk_rows, index]
+        sel = x_codes >= 0
+        idx = (x_codes[sel, None] * n_cols + col_offsets).ravel()
+        counts += np.bincount(idx, weights=filled[start:start + chunk_rows][sel].ravel(), minlength=len(counts))
+        sums += np.bincount(idx, weights=values[start:start + chunk_rows][sel].ravel(), minlength=len(sums))
+    counts = counts.reshape(n_bins, n_cols)
+    sums = sums.reshape(n_bins, n_cols)
+
+    # weighted variance of the bin means of y around the mean of y; empty bins do not contribute
+    n_y = filled.sum(axis=0)
+    mean_y = values.sum(axis=0) / n_y
+    with np.errstate(divide='ignore', invalid='ignore'):
+        dev = np.where(counts > 0, sums / counts - mean_y, 0.)
+    return (counts * dev ** 2).sum(axis=0)
+
+
+def correlation_ratios(df, n_bins=NUMBER_OF_BINS, n_workers=1):
+    """Compute correlation ratios between all numerical columns of data frame
+
+    The correlation ratio of column y given column x is the weighted
+    variance of the means of y in the bins of x over the variance of y,
+    where the bins of x are those of bin_codes.  The input data frame is not
+    modified.
+
+    :param pandas.DataFrame df: input data frame with numerical columns
+    :param int n_bins: number of bins per column
+    :param int n_workers: number of threads that compute the rows of the matrix
+    :returns: correlation ratios (x in rows, y in columns)
+    :rtype: pandas.DataFrame
+    """
+
+    cols = df.columns
+    codes = bin_codes(df, n_bins)
+    values = df.values.astype(np.float64)
+    filled = ~np.isnan(values)
+    values[~filled] = 0.
+
+    with concurrent.futures.ThreadPoolExecutor(max(n_workers, 1)) as executor:
+        cors = np.array(list(executor.map(lambda it: _correlation_ratio_row(it, codes, values, filled, n_bins),
+                                          range(len(cols)))))
+
+    # normalize to the variance of y (with degrees-of-freedom correction, as pandas)
+    var_y = df.var().values
+    cors = cors.reshape(len(cols), len(cols)) / (filled.sum(axis=0) * var_y)
+    return pd.DataFrame(cors, columns=cols, index=cols)
+
+
+def _mutual_information_row(index, codes, n_bins):
+    """Binned mutual information of one column with itself and all next columns
+
+    The contingency tables of the column pairs are accumulated with one
+    bincount over (pair, bin x, bin y) indices per chunk of rows.  Rows with
+    a missing value in either column of a pair are excluded from its table.
+    """
+
+    n_rows, n_cols = codes.shape
+    n_pairs = n_cols - index
+    joint = np.zeros(n_pairs * n_bins ** 2)
+    pair_offsets = np.arange(n_pairs) * n_bins ** 2
+    chunk_rows = max(1, CHUNK_SIZE // n_pairs)
+    for start in range(0, n_rows, chunk_rows):
+        x_codes = codes[start:start + chunk_rows, index, None]
+        y_codes = codes[start:start + chunk_rows, index:]
+        sel = (x_codes >= 0) & (y_codes >= 0)
+        joint += np.bincount((x_codes * n_bins + y_codes + pair_offsets)[sel], minlength=len(joint))
+
+    # mutual information from the joint and marginal probabilities of the bins
+    joint = joint.reshape(n_pairs, n_bins, n_bins)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        prob = joint / joint.sum(axis=(1, 2))[:, None, None]
+        prob_x = prob.sum(axis=2)[:, :, None]
+        prob_y = prob.sum(axis=1)[:, None, :]
+        terms = np.where(prob > 0, prob * np.log(prob / (prob_x * prob_y)), 0.)
+    return terms.sum(axis=(1, 2))
+
+
+def mutual_information(df, n_bins=NUMBER_OF_BINS, n_workers=1):
+    """Compute binned mutual information between all numerical columns of data frame
+
+    The mutual information (in nats) of each pair of columns is computed
+    from the contingency table of their bins, as given by bin_codes, using
+    the rows in which both columns are filled.  The input data frame is not
+    modified.
+
+    :param pandas.DataFrame df: input data frame with numerical columns
+    :param int n_bins: number of bins per column
+    :param int n_workers: number of threads that compute the rows of the matrix
+    :returns: symmetric matrix of mutual information
+    :rtype: pandas.DataFrame
+    """
+
+    cols = df.columns
+    codes = bin_codes(df, n_bins)
+
+    with concurrent.futures.ThreadPoolExecutor(max(n_workers, 1)) as executor:
+        rows = list(executor.map(lambda it: _mutual_information_row(it, codes, n_bins), range(len(cols))))
+
+    # fill upper triangle and mirror
+    mi = np.zeros((len(cols), len(cols)))
+    for it, row in enumerate(rows):
+        mi[it, it:] = row
+        mi[it:, it] = row
+    return pd.DataFrame(mi, columns=cols, index=cols)
+
+
+def cluster_order(matrix):
+    """Order variables of correlation matrix by hierarchical clustering
+
+    The variables are clustered by average linkage of the Euclidean
+    distances between their rows of correlations, such that variables with
+    similar correlations are adjacent in the heatmap.
+
+    :param numpy.ndarray matrix: square correlation matrix
+    :returns: indices of variables in cluster order
+    :rtype: numpy.ndarray
+    """
+
+    from scipy.cluster import hierarchy
+
+    matrix = np.nan_to_num(np.asarray(matrix, dtype=np.float64))
+    if len(matrix) < 3:
+        return np.arange(len(matrix))
+    return hierarchy.leaves_list(hierarchy.linkage(matrix, method='average', metric='euclidean'))
 
 
 class CorrelationSummary(Link):
@@ -37,13 +202,23 @@ class CorrelationSummary(Link):
         :param str write_key: key of correlations dataframe in data store
         :param str results_path: path to save correlation summary pdf
         :param str method: method of computing correlations
+        :param int n_bins: number of bins per variable for correlation_ratio and mutual_information
+        :param int n_workers: number of threads to compute correlation_ratio and mutual_information
+        :param int annotate_max: maximum number of columns of a heatmap page with annotated correlation values
+        :param bool cluster: order variables in heatmap by hierarchical clustering of their correlations
+        :param int tile_size: maximum number of variables per heatmap page; the matrix is tiled into multiple
+                              pages if there are more variables (default: all variables on one page)
+        :param bool save_matrix: save correlation matrix (float32) with variable names and heatmap order in
+                                 NumPy .npz file next to heatmap pdf
         """
 
         # initialize Link, pass name from kwargs
         Link.__init__(self, kwargs.pop('name', 'correlation_summary'))
 
         # process arguments
-        self._process_kwargs(kwargs, read_key=None, write_key=None, results_path='', method='pearson')
+        self._process_kwargs(kwargs, read_key=None, write_key=None, results_path='', method='pearson',
+                             n_bins=NUMBER_OF_BINS, n_workers=1, annotate_max=50, cluster=False, tile_size=0,
+                             save_matrix=True)
         self.check_extra_kwargs(kwargs)
 
     def initialize(self):
@@ -75,111 +250,132 @@ class CorrelationSummary(Link):
             self.method = 'pearson'
 
         # check input arguments
-        self.check_arg_types(read_key=str, method=str)
+        self.check_arg_types(read_key=str, method=str, n_bins=int, n_workers=int, annotate_max=int,
+                             tile_size=int)
         self.check_arg_vals('read_key')
 
         return StatusCode.Success
 
+    def data_keys(self):
+        """Get keys of data-store objects that are read and stored by CorrelationSummary"""
+
+        return self.attr_data_keys()
+
     def execute(self):
         """Execute CorrelationSummary"""
 
         ds = ProcessManager().service(DataStore)
 
-        import matplotlib.pyplot as plt
-        from matplotlib import colors
-
         # fetch and check input data frame
-        # drop all-nan columns right away
-        df = ds.get(self.read_key, None).dropna(how='all', axis=1)
+        df = ds.get(self.read_key, None)
         if not isinstance(df, pd.DataFrame):
             self.log().critical('no Pandas data frame "%s" found in data store for %s', self.read_key, str(self))
             raise RuntimeError('no input data found for %s' % str(self))
 
+        # drop all-nan columns right away
+        df = df.dropna(how='all', axis=1)
+
         # compute correlations between all numerical variables
         self.log().debug('Computing "%s" correlations of dataframe "%s"', self.method, self.read_key)
 
-        # mutual info, from sklearn
-        if self.method == 'mutual_information':
-            # numerical columns only
-            cols = df.select_dtypes(include=[np.number]).columns
-
-            # initialize correlation matrix
-            n = len(cols)
-            cors = np.zeros((n, n))
-            for i, c in enumerate(cols):
-                # compare each column to all of the columns
-                cors[i, :] = mutual_info_regression(df[cols], df[c])
-
-            cors = pd.DataFrame(cors, columns=cols, index=cols)
+        if self.method in BINNED_CORRS:
+            # numerical columns only, binned once into integer codes
+            num_df = df.select_dtypes(include=[np.number])
+            corr_func = mutual_information if self.method == 'mutual_information' else correlation_ratios
+            cors = corr_func(num_df, n_bins=self.n_bins, n_workers=self.n_workers)
+            cols = list(cors.columns)
 
-        elif self.method == 'correlation_ratio':
-            # numerical columns only
-            cols = df.select_dtypes(include=[np.number]).columns
+        else:
+            cors = df.corr(method=self.method)
+            cols = list(cors.columns)
 
-            # choose bins for each column
-            bins = {c: len(np.histogram(df[c])[1]) for c in cols}
+        # order of variables in heatmap
+        order = cluster_order(cors.values) if self.cluster else np.arange(len(cols))
 
-            # sort rows into bins
-            for c in cols:
-                df[str(c) + '_bin'] = pd.cut(df[c], bins[c])
+        # save heatmap pages in file
+        fname = '_'.join(['correlations', self.read_key.replace(' ', ''), self.method])
+        fpath = os.path.join(self.results_path, fname + '.pdf')
+        self.log().debug('Saving correlation heatmap as {}'.format(fpath))
+        self.plot_heatmap(cors.values[np.ix_(order, order)], [cols[it] for it in order], fpath)
 
-            # initialize correlation matrix
-            n = len(cols)
-            cors = np.zeros((n, n))
+        # save raw correlation matrix next to heatmap
+        if self.save_matrix:
+            mpath = os.path.join(self.results_path, fname + '.npz')
+            self.log().debug('Saving correlation matrix as {}'.format(mpath))
+            np.savez(mpath, matrix=cors.values.astype(np.float32), columns=np.array(cols, dtype=str), order=order)
 
-            for i, x in enumerate(cols):
-                xbin = str(x) + '_bin'
+        # save correlations to datastore if requested
+        if self.write_key:
+            ds[self.write_key] = cors
 
-                # definition from Wikipedia "correlation ratio"
-                y_given_x = (df.groupby(xbin))[cols]
-                weighted_var_y_bar = (y_given_x.count() * (y_given_x.mean() - df.mean()) ** 2).sum()
-                weighted_var_y = df[cols].count() * df[cols].var()
+        return StatusCode.Success
 
-                cors[i, :] = weighted_var_y_bar / weighted_var_y
+    def plot_heatmap(self, matrix, cols, fpath):
+        """Plot heatmap of correlation matrix
 
-            cors = pd.DataFrame(cors, columns=cols, index=cols)
+        The matrix is tiled into pages of at most tile_size variables.  Values
+        are annotated on pages with at most annotate_max columns.  Larger pages
+        are drawn as a single image, without cell edges, and only get variable
+        names if they have at most MAX_TICK_LABELS variables.
 
-        else:
-            cors = df.corr(method=self.method)
-            cols = list(cors.columns)
+        :param numpy.ndarray matrix: square correlation matrix, in order of plotting
+        :param list cols: names of variables
+        :param str fpath: path of pdf file
+        """
 
-        # set up heatmap of convenient size
-        plot_size = max(len(cols) / 1.8, 2)
-        fig, ax = plt.subplots(figsize=(1.5 * plot_size, plot_size))
+        import matplotlib.pyplot as plt
+        from matplotlib import colors
+        from matplotlib.backends.backend_pdf import PdfPages
 
         vmin = -1 if self.method in LINEAR_CORRS else 0
         vmax = 1
         cmap = 'RdYlGn' if self.method in LINEAR_CORRS else 'YlGn'
-
         norm = colors.Normalize(vmin=vmin, vmax=vmax)
-        img = ax.pcolormesh(cors, cmap=cmap, edgecolor='w', linewidth=1, norm=norm)
-
-        # make plot look pretty
-        ax.set_title('{0:s} correlations'.format(self.method.capitalize()))
-        ax.set_yticks(np.arange(len(cols)) + 0.5)
-        ax.set_xticks(np.arange(len(cols)) + 0.5)
-        ax.set_yticklabels(cols, rotation='horizontal')
-        ax.set_xticklabels(cols, rotation='vertical')
-        fig.colorbar(img)
-
-        # annotate with correlation values
-        for i in range(len(cols)):
-            for j in range(len(cols)):
-                point = float(cors[cols[i]][j])
-                label = 'NaN' if np.isnan(point) else '{0:.2f}'.format(point)
-                white_cond = (point < 0.7 * vmin) or (point >= 0.7 * vmax) or np.isnan(point)
-                color = 'w' if white_cond else 'k'
-                ax.annotate(label, xy=(i + 0.5, j + 0.5), color=color, horizontalalignment='center',
-                            verticalalignment='center')
-
-        # save plots in file
-        fname = '_'.join(['correlations', self.read_key.replace(' ', ''), self.method]) + '.pdf'
-        fpath = os.path.join(self.results_path, fname)
-        self.log().debug('Saving correlation heatmap as {}'.format(fpath))
-        fig.savefig(fpath, bbox_inches='tight')
-
-        # save correlations to datastore if requested
-        if self.write_key:
-            ds[self.write_key] = cors
 
-        return StatusCode.Success
+        n_vars = len(cols)
+        tile_size = self.tile_size if self.tile_size > 0 else max(n_vars, 1)
+        tiles = [(slice(i, i + tile_size), slice(j, j + tile_size))
+                 for i in range(0, n_vars, tile_size) for j in range(0, n_vars, tile_size)]
+
+        with PdfPages(fpath) as pdf:
+            for rows, columns in tiles:
+                tile = matrix[rows, columns]
+                n_rows, n_cols = tile.shape
+                annotate = n_cols <= self.annotate_max
+
+                # set up heatmap of convenient size
+                plot_size = max(min(n_cols, MAX_TICK_LABELS) / (1.8 if annotate else 6.), 2)
+                fig, ax = plt.subplots(figsize=(1.5 * plot_size, plot_size * max(n_rows / n_cols, 0.2)))
+                if annotate:
+                    img = ax.pcolormesh(tile, cmap=cmap, edgecolor='w', linewidth=1, norm=norm)
+                else:
+                    img = ax.imshow(tile, cmap=cmap, norm=norm, interpolation='none', origin='lower',
+                                    aspect='auto', extent=(0, n_cols, 0, n_rows))
+
+                # make plot look pretty
+                title = '{0:s} correlations'.format(self.method.capitalize())
+                if len(tiles) > 1:
+                    title += ' (rows {0:d}-{1:d}, columns {2:d}-{3:d})'.format(rows.start + 1, rows.start + n_rows,
+                                                                              columns.start + 1,
+                                                                              columns.start + n_cols)
+                ax.set_title(title)
+                if max(n_rows, n_cols) <= MAX_TICK_LABELS:
+                    ax.set_yticks(np.arange(n_rows) + 0.5)
+                    ax.set_xticks(np.arange(n_cols) + 0.5)
+                    ax.set_yticklabels(cols[rows], rotation='horizontal')
+                    ax.set_xticklabels(cols[columns], rotation='vertical')
+                else:
+                    ax.set_xticks([])
+                    ax.set_yticks([])
+                fig.colorbar(img)
+
+                # annotate with correlation values
+                if annotate:
+                    white = np.isnan(tile) | (tile < 0.7 * vmin) | (tile >= 0.7 * vmax)
+                    for (j, i), point in np.ndenumerate(tile):
+                        label = 'NaN' if np.isnan(point) else '{0:.2f}'.format(point)
+                        ax.text(i + 0.5, j + 0.5, label, color='w' if white[j, i] else 'k',
+                                horizontalalignment='center', verticalalignment='center')
+
+                pdf.savefig(fig, bbox_inches='tight')
+                plt.close(fig)
@@ -93,6 +93,11 @@ class DfBoxplot(Link):
 
         return StatusCode.Success
 
+    def data_keys(self):
+        """Get keys of data-store objects that are read by DfBoxplot"""
+
+        return self.attr_data_keys()
+
     def execute(self):
         """Execute DfBoxplot
 
@@ -47,6 +47,11 @@ class DfSummary(Link):
         :param dict var_units: dict of column names with a unit per column
         :param dict var_bins: dict of column names with the number of bins per column. Default per column is 30.
         :param str hist_y_label: y-axis label to plot for all columns. Default is 'Bin Counts'.
+        :param bool stream: summarize a stream of data frames, e.g. chunks from ReadToDf, with approximate quantiles
+                            and distinct counts, at constant memory; the report is created in finalize, so do not
+                            skip the chain with SkipChainIfEmpty after the last chunk
+        :param int sketch_size: size parameter of the quantile sketches used if stream is set
+        :param int n_workers: number of processes to render plots in parallel
         """
 
         # initialize Link
@@ -55,17 +60,19 @@ class DfSummary(Link):
         # process keyword arguments
         self._process_kwargs(kwargs, read_key='', results_path='', columns=None,
                              var_labels={}, var_units={}, var_bins={},
-                             hist_y_label='Bin counts')
+                             hist_y_label='Bin counts', stream=False, sketch_size=200,
+                             n_workers=1)
         self.check_extra_kwargs(kwargs)
 
         # initialize attributes
         self.pages = []
+        self._stream_stats = None
 
     def initialize(self):
         """Inititialize DfSummary link"""
 
         # check input arguments
-        self.check_arg_types(read_key=str)
+        self.check_arg_types(read_key=str, n_workers=int)
         self.check_arg_types(recurse=True, allow_none=True, columns=str,
                              var_labels=str, var_units=str)
         self.check_arg_vals('read_key')
@@ -97,6 +104,11 @@ class DfSummary(Link):
 
         return StatusCode.Success
 
+    def data_keys(self):
+        """Get keys of data-store objects that are read by DfSummary"""
+
+        return self.attr_data_keys()
+
     def execute(self):
         """Execute DfSummary
 
@@ -106,48 +118,109 @@ class DfSummary(Link):
         * create overview table of column variable
         * plot histogram of column variable
         * store plot
-        """
 
-        # import matplotlib here to prevent import before setting backend in
-        # core.execution.run_eskapade
-        import matplotlib.pyplot as plt
-        from matplotlib.backends.backend_pdf import PdfPages
+        If stream is set, the summaries of the columns are only updated with
+        the values in the data frame and the report is created in finalize.
+        """
 
         # fetch and check input data frame
         data = ProcessManager().service(DataStore).get(self.read_key, None)
         if not isinstance(data, pd.DataFrame):
             self.log().critical('No Pandas data frame "%s" found in data store for %s', self.read_key, str(self))
             raise RuntimeError('no input data found for %s' % str(self))
+        if self.stream and data.empty:
+            # e.g. data frame after last chunk of data stream
+            self.log().debug('Skipping empty data frame "%s"', self.read_key)
+            return StatusCode.Success
 
-        # create report page for each variable in data frame
-        self.pages = []
-        nan_counts = []
-        all_columns = sorted((data if self.columns is None else self).columns.tolist())
+        # select columns to summarize
+        all_columns = sorted(data.columns.tolist() if self.columns is None else self.columns)
         for col in all_columns[:]:
-            # output column name
-            self.log().debug('processing column "%s"', col)
-
             # check if column is in data frame
             if col not in data:
                 self.log().warning('column "%s" not in data frame', col)
-                all_columns.remove(all_columns.index(col))
-                continue
+                all_columns.remove(col)
+
+        # update summaries of data stream
+        if self.stream:
+            if self._stream_stats is None:
+                seed = ProcessManager().service(ConfigObject)['seeds'][self.name]
+                self._stream_stats = statistics.StreamStats(all_columns, units=self.var_units,
+                                                            labels=self._var_labels(all_columns),
+                                                            sketch_size=self.sketch_size, random_state=seed)
+            self._stream_stats.update(data)
+            return StatusCode.Success
+
+        # 1. create statistics objects for columns and evaluate statistical properties of arrays in one go
+        nan_counts = data[all_columns].isnull().sum().tolist()
+        stat_columns = self._stat_columns(all_columns, nan_counts, len(data.index))
+        frame_stats = statistics.FrameStats(data, stat_columns, units=self.var_units,
+                                            labels=self._var_labels(stat_columns))
+        frame_stats.create_stats()
+
+        self.write_report(frame_stats, stat_columns, all_columns, nan_counts, len(data.index))
+
+        return StatusCode.Success
+
+    def finalize(self):
+        """Finalize DfSummary
+
+        Creates the report of a stream of data frames if stream is set.
+        """
+
+        if self._stream_stats is not None:
+            stream_stats, self._stream_stats = self._stream_stats, None
+            stream_stats.create_stats()
+            all_columns = list(stream_stats.stats)
+            nan_counts = [stream_stats.n_nan[col] for col in all_columns]
+            stat_columns = self._stat_columns(all_columns, nan_counts, stream_stats.n_rows)
+            self.write_report(stream_stats, stat_columns, all_columns, nan_counts, stream_stats.n_rows)
+
+        return StatusCode.Success
 
-            # skip columns consisting entirely of nans
-            nan_cnt = data[col].isnull().sum()
-            nan_counts.append(nan_cnt)
-            if nan_cnt == len(data.index):
+    def _var_labels(self, columns):
+        """Get labels of column variables"""
+
+        return dict((col, self.var_labels.get(col, col)) for col in columns)
+
+    def _stat_columns(self, all_columns, nan_counts, n_data):
+        """Select columns that do not consist entirely of nans"""
+
+        stat_columns = []
+        for col, nan_cnt in zip(all_columns, nan_counts):
+            if nan_cnt == n_data:
                 self.log().debug('column "%s" consists of nans only. Skipping.', col)
-                continue
+            else:
+                stat_columns.append(col)
+        return stat_columns
 
-            # 1. create statistics object for column
-            var_label = self.var_labels.get(col, col)
-            stats = statistics.ArrayStats(data, col, unit=self.var_units.get(col, ''), label=var_label)
-            # evaluate statitical properties of array
-            stats.create_stats()
+    def write_report(self, col_stats, stat_columns, all_columns, nan_counts, n_data):
+        """Write report of data frame columns
 
-            # make histogram
-            nphist = stats.make_histogram(var_bins=self.var_bins.get(col, NUMBER_OF_BINS))
+        :param col_stats: statistics of columns (FrameStats or StreamStats)
+        :param list stat_columns: columns to create pages for
+        :param list all_columns: columns in nan histogram
+        :param list nan_counts: numbers of nans in columns
+        :param int n_data: number of entries in the processed data set
+        """
+
+        # import matplotlib here to prevent import before setting backend in
+        # core.execution.run_eskapade
+        import matplotlib.pyplot as plt
+        from matplotlib.backends.backend_pdf import PdfPages
+
+        # make histograms
+        nphists = col_stats.make_histograms(var_bins=self.var_bins, default_bins=NUMBER_OF_BINS)
+
+        # create report page for each variable in data frame
+        self.pages = []
+        plot_jobs = []
+        for col in stat_columns:
+            # output column name
+            self.log().debug('processing column "%s"', col)
+            stats = col_stats[col]
+            nphist = nphists[col]
+            var_label = self.var_labels.get(col, col)
 
             # determine histogram properties for plotting
             x_label = stats.get_x_label()
@@ -157,12 +230,10 @@ class DfSummary(Link):
             hist_file_name = 'hist_{}.pdf'.format(col)
             pdf_file_name = '{0:s}/{1:s}'.format(self.results_path, hist_file_name)
 
-            # 3. plot histogram of column variable
-            visualization.vis_utils.plot_histogram(nphist,
-                                                   x_label=x_label,
-                                                   y_label=y_label,
-                                                   is_num=is_num, is_ts=is_ts,
-                                                   pdf_file_name=pdf_file_name)
+            # 3. plot histogram of column variable (rendered below)
+            plot_jobs.append((visualization.vis_utils.plot_histogram, (nphist,),
+                              dict(x_label=x_label, y_label=y_label, is_num=is_num, is_ts=is_ts,
+                                   pdf_file_name=pdf_file_name)))
 
             # create overview table of column variable
             stats_table = stats.get_latex_table()
@@ -174,7 +245,10 @@ class DfSummary(Link):
 
         # add nan histogram to summary
         nan_hist = nan_counts, all_columns
-        self.process_nan_histogram(nan_hist, len(data.index))
+        self.process_nan_histogram(nan_hist, n_data)
+
+        # render plots of variables, in parallel if requested, before writing the report
+        visualization.vis_utils.render_plots(plot_jobs, n_workers=self.n_workers)
 
         # write report file
         with open('{}/report.tex'.format(self.results_path), 'w') as report_file:
@@ -183,8 +257,6 @@ class DfSummary(Link):
                     'INPUT_PAGES', ''.join(
                         self.pages)))
 
-        return StatusCode.Success
-
     def process_nan_histogram(self, nphist, n_data):
         """Process nans histogram
 
@@ -51,6 +51,7 @@ class HistSummary(Link):
         :param dict var_units: dict of column names with a unit per column
         :param dict var_bins: dict of column names with the number of bins per column. Default per column is 30.
         :param str hist_y_label: y-axis label to plot for all columns. Default is 'Bin Counts'.
+        :param int n_workers: number of processes to render plots in parallel
         """
 
         # initialize Link, pass name from kwargs
@@ -64,11 +65,13 @@ class HistSummary(Link):
                              var_labels={},
                              var_units={},
                              var_bins={},
-                             hist_y_label='Bin counts')
+                             hist_y_label='Bin counts',
+                             n_workers=1)
         self.check_extra_kwargs(kwargs)
 
         # initialize attributes
         self.pages = []
+        self.plot_jobs = []
 
     def initialize(self):
         """Initialize HistSummary
@@ -78,7 +81,7 @@ class HistSummary(Link):
         """
 
         # check input arguments
-        self.check_arg_types(read_key=str)
+        self.check_arg_types(read_key=str, n_workers=int)
         self.check_arg_types(recurse=True, allow_none=True, hist_keys=str,
                              var_labels=str, var_units=str)
         self.check_arg_vals('read_key')
@@ -109,6 +112,11 @@ class HistSummary(Link):
 
         return StatusCode.Success
 
+    def data_keys(self):
+        """Get keys of data-store objects that are read by HistSummary"""
+
+        return self.attr_data_keys()
+
     def execute(self):
         """Create a report of the data frame variables
 
@@ -132,6 +140,7 @@ class HistSummary(Link):
 
         # create report page for histogram
         self.pages = []
+        self.plot_jobs = []
         for name in self.hist_keys:
             # histogram name
             self.log().info('processing histogram "%s"', name)
@@ -148,6 +157,10 @@ class HistSummary(Link):
             elif hist.n_dim == 2:
                 self.process_2d_histogram(name, hist)
 
+        # render plots of histograms, in parallel if requested, before writing the report
+        visualization.vis_utils.render_plots(self.plot_jobs, n_workers=self.n_workers)
+        self.plot_jobs = []
+
         # write out accumulated histogram statistics into report file
         with open('{}/report.tex'.format(self.results_path), 'w') as report_file:
             report_file.write(self.report_template.replace('INPUT_PAGES', ''.join(self.pages)))
@@ -184,17 +197,19 @@ class HistSummary(Link):
 
         # create statistics object for histogram
         var_label = self.var_labels.get(name, name)
-        stats = statistics.ArrayStats(bin_labels, name, weights=bin_counts, unit=self.var_units.get(name, ''),
-                                      label=var_label)
+        frame_stats = statistics.FrameStats(pd.DataFrame({name: bin_labels}), weights=bin_counts,
+                                            units=self.var_units, labels={name: var_label})
+        stats = frame_stats[name]
         # evaluate statitical properties of array
-        stats.create_stats()
+        frame_stats.create_stats()
 
         # make nice plots here ...
         # for numbers and timestamps, make cropped histogram, between percentiles 5-95%
         # ... and project on existing binning.
         # for categories, accept top N number of categories in bins.
         # NB: bin_edges overrules var_bins (if it is not none)
-        nphist = stats.make_histogram(var_bins=self.var_bins.get(name, NUMBER_OF_BINS), bin_edges=bin_edges)
+        nphist = frame_stats.make_histograms(var_bins=self.var_bins, bin_edges={name: bin_edges},
+                                             default_bins=NUMBER_OF_BINS)[name]
 
         # determine histogram properties for plotting below
         x_label = stats.get_x_label()
@@ -202,9 +217,10 @@ class HistSummary(Link):
         hist_file_name = 'hist_{}.pdf'.format(name)
         pdf_file_name = '{0:s}/{1:s}'.format(self.results_path, hist_file_name)
 
-        # matplotlib plot of histogram
-        visualization.vis_utils.plot_histogram(nphist, x_label=x_label, y_label=y_label, is_num=is_num, is_ts=is_ts,
-                                               pdf_file_name=pdf_file_name)
+        # matplotlib plot of histogram (rendered in execute)
+        self.plot_jobs.append((visualization.vis_utils.plot_histogram, (nphist,),
+                               dict(x_label=x_label, y_label=y_label, is_num=is_num, is_ts=is_ts,
+                                    pdf_file_name=pdf_file_name)))
 
         # create overview table of histogram statistics
         stats_table = stats.get_latex_table()
@@ -258,9 +274,10 @@ class HistSummary(Link):
         hist_file_name = 'hist_{}.pdf'.format(name.replace(':', '_vs_'))
         pdf_file_name = '{0:s}/{1:s}'.format(self.results_path, hist_file_name)
 
-        # plot the 2d histogram
-        visualization.vis_utils.plot_2d_histogram(nphist, x_lim=hist.x_lim(), y_lim=hist.y_lim(), title=var_label,
-                                                  x_label=xlab, y_label=ylab, pdf_file_name=pdf_file_name)
+        # plot the 2d histogram (rendered in execute)
+        self.plot_jobs.append((visualization.vis_utils.plot_2d_histogram, (nphist,),
+                               dict(x_lim=hist.x_lim(), y_lim=hist.y_lim(), title=var_label, x_label=xlab,
+                                    y_label=ylab, pdf_file_name=pdf_file_name)))
 
         # create page string for report
         page_templ = self.page_template
@@ -0,0 +1,94 @@
+import unittest
+import os
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+
+from eskapade.tests.observers import TestCaseObservable
+
+
+class CorrelationSummaryTest(unittest.TestCase, TestCaseObservable):
+
+    def setUp(self):
+        # --- setup a dummy data frame with (non-linearly) correlated columns and missing values
+        rng = np.random.RandomState(42)
+        n = 5000
+        self.df = pd.DataFrame(rng.normal(size=(n, 4)), columns=['a', 'b', 'c', 'd'])
+        self.df['b'] += self.df['a'] ** 2
+        self.df['c'] = rng.randint(0, 3, n)
+        self.df.loc[::5, 'a'] = np.nan
+        self.df.loc[::7, 'd'] = np.nan
+
+    def test_correlation_ratios(self):
+        from eskapade.visualization.links.correlation_summary import correlation_ratios, NUMBER_OF_BINS
+
+        df = self.df.copy()
+        cors = correlation_ratios(df, n_workers=2)
+        pd.testing.assert_frame_equal(df, self.df)
+
+        # --- definition with group-by per column
+        for x in df.columns:
+            y_given_x = df.groupby(pd.cut(df[x], NUMBER_OF_BINS))
+            expected = (y_given_x.count() * (y_given_x.mean() - df.mean()) ** 2).sum() / (df.count() * df.var())
+            np.testing.assert_allclose(cors.loc[x].values, expected.values)
+
+    def test_mutual_information(self):
+        from eskapade.visualization.links.correlation_summary import mutual_information, bin_codes
+
+        df = self.df.copy()
+        mi = mutual_information(df, n_workers=2)
+        pd.testing.assert_frame_equal(df, self.df)
+        np.testing.assert_allclose(mi.values, mi.values.T)
+
+        # --- definition from contingency table per pair of columns
+        codes = bin_codes(df)
+        for i in range(len(df.columns)):
+            for j in range(len(df.columns)):
+                sel = (codes[:, i] >= 0) & (codes[:, j] >= 0)
+                prob = pd.crosstab(codes[sel, i], codes[sel, j]).values / sel.sum()
+                prob_xy = np.outer(prob.sum(axis=1), prob.sum(axis=0))
+                filled = prob > 0
+                expected = (prob[filled] * np.log(prob[filled] / prob_xy[filled])).sum()
+                self.assertAlmostEqual(mi.values[i, j], expected)
+
+    def test_row_chunks(self):
+        import mock
+        from eskapade.visualization.links.correlation_summary import correlation_ratios, mutual_information
+
+        # --- same results if rows are processed in many chunks, scaled to the number of columns
+        cors, mi = correlation_ratios(self.df), mutual_information(self.df)
+        with mock.patch('eskapade.visualization.links.correlation_summary.CHUNK_SIZE', 999):
+            pd.testing.assert_frame_equal(correlation_ratios(self.df), cors)
+            pd.testing.assert_frame_equal(mutual_information(self.df), mi)
+
+    def test_heatmap_pages(self):
+        from eskapade import ProcessManager, DataStore, ConfigObject
+        from eskapade.visualization.links.correlation_summary import CorrelationSummary, cluster_order
+
+        settings = ProcessManager().service(ConfigObject)
+        settings['analysisName'] = 'correlation_summary_test'
+        settings['version'] = 0
+        ds = ProcessManager().service(DataStore)
+        ds['data'] = self.df
+        results_path = tempfile.mkdtemp()
+
+        # --- clustered heatmap, tiled into pages, with matrix saved next to it
+        link = CorrelationSummary(read_key='data', write_key='cors', results_path=results_path, cluster=True,
+                                  tile_size=3, annotate_max=2)
+        link.initialize()
+        link.execute()
+        path = os.path.join(results_path, 'correlations_data_pearson')
+        with open(path + '.pdf', 'rb') as pdf_file:
+            pdf = pdf_file.read()
+        self.assertEqual(pdf.count(b'/Type /Page') - pdf.count(b'/Type /Pages'), 4)
+        saved = np.load(path + '.npz')
+        self.assertListEqual(saved['columns'].tolist(), list(self.df.columns))
+        np.testing.assert_allclose(saved['matrix'], ds['cors'].values, rtol=1e-6)
+        np.testing.assert_array_equal(saved['order'], cluster_order(ds['cors'].values))
+        self.assertListEqual(sorted(saved['order']), list(range(len(self.df.columns))))
+        shutil.rmtree(results_path)
+
+    def tearDown(self):
+        from eskapade.core import execution
+        execution.reset_eskapade()
@@ -0,0 +1,61 @@
+import unittest
+import os
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+
+from eskapade.tests.observers import TestCaseObservable
+
+
+class SummaryRenderTest(unittest.TestCase, TestCaseObservable):
+
+    def setUp(self):
+        from eskapade import ProcessManager, ConfigObject
+
+        settings = ProcessManager().service(ConfigObject)
+        settings['analysisName'] = 'summary_render_test'
+        settings['version'] = 0
+        rng = np.random.RandomState(42)
+        self.df = pd.DataFrame({'x': rng.normal(size=1000), 'y': rng.randint(0, 10, 1000),
+                                'z': rng.choice(list('abc'), 1000)})
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def _render(self, link_cls, read_key, n_workers, **kwargs):
+        results_path = os.path.join(self.tmp_dir, '{}_{:d}'.format(link_cls.__name__, n_workers))
+        link = link_cls(read_key=read_key, results_path=results_path, n_workers=n_workers, **kwargs)
+        link.initialize()
+        link.execute()
+        link.finalize()
+        with open(os.path.join(results_path, 'report.tex')) as report_file:
+            report = report_file.read()
+        pdfs = set(f for f in os.listdir(results_path) if f.endswith('.pdf'))
+        for pdf in pdfs:
+            self.assertGreater(os.path.getsize(os.path.join(results_path, pdf)), 0)
+        return report, pdfs
+
+    def test_parallel_rendering(self):
+        from eskapade import ProcessManager, DataStore
+        from eskapade.analysis import ValueCounter
+        from eskapade.visualization import DfSummary, HistSummary
+
+        ds = ProcessManager().service(DataStore)
+        ds['data'] = self.df
+        counter = ValueCounter(read_key='data', columns=['x', 'y', 'z'], store_key_hists='hists',
+                               bin_specs={'x': {'bin_width': 0.5, 'bin_offset': 0}})
+        counter.initialize()
+        counter.execute()
+        counter.finalize()
+
+        # --- same report and plots as rendered serially
+        for link_cls, read_key in ((DfSummary, 'data'), (HistSummary, 'hists')):
+            report, pdfs = self._render(link_cls, read_key, 1)
+            report_par, pdfs_par = self._render(link_cls, read_key, 2)
+            self.assertTrue(pdfs.issuperset('hist_{}.pdf'.format(c) for c in 'xyz'), str(pdfs))
+            self.assertSetEqual(pdfs_par, pdfs)
+            self.assertEqual(report_par, report)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+        from eskapade.core import execution
+        execution.reset_eskapade()
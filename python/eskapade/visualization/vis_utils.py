@@ -1,3 +1,5 @@
+import concurrent.futures
+import multiprocessing
 import numpy as np
 import pandas as pd
 import logging
@@ -144,6 +146,54 @@ def plot_2d_histogram(hist, x_lim, y_lim, title, x_label, y_label, pdf_file_name
         pdf_file.close()
 
 
+def render_plots(plot_jobs, n_workers=1):
+    """Render plots, in parallel processes if requested
+
+    Each plot job consists of a plot function of this module, e.g.
+    plot_histogram, with its positional and keyword arguments.  With more
+    than one worker, the jobs are rendered in forked processes with the
+    non-interactive Agg backend, so only the job arguments, e.g. histogram
+    arrays, are passed to the processes.  The function returns when all
+    plots have been rendered.
+
+    Forking is unsafe while other threads are alive, e.g. the prefetch and
+    decompression threads of ReadToDf, because locks held by these threads
+    remain locked in the worker processes.  Only use more than one worker if
+    no such threads are running, e.g. not in a chain that reads data in
+    chunks with prefetching or parallel decompression.
+
+    :param list plot_jobs: plot jobs: tuples of plot function, argument tuple and keyword-argument dict
+    :param int n_workers: number of processes to render plots in parallel
+    """
+
+    if n_workers <= 1 or len(plot_jobs) <= 1:
+        for job in plot_jobs:
+            _render_plot(job)
+        return
+
+    ctx = multiprocessing.get_context('fork')
+    n_workers = min(n_workers, len(plot_jobs))
+    with concurrent.futures.ProcessPoolExecutor(n_workers, mp_context=ctx, initializer=_init_plot_worker) as pool:
+        # iterate over results to raise exceptions of jobs
+        for _ in pool.map(_render_plot, plot_jobs, chunksize=max(len(plot_jobs) // (4 * n_workers), 1)):
+            pass
+
+
+def _init_plot_worker():
+    """Switch plot worker process to non-interactive backend"""
+
+    import matplotlib.pyplot as plt
+    plt.close('all')
+    plt.switch_backend('Agg')
+
+
+def _render_plot(job):
+    """Render plot of plot job"""
+
+    plot_func, args, kwargs = job
+    plot_func(*args, **kwargs)
+
+
 def delete_smallstat(df, group_col, statlim=400):
     """Remove low-statistics groups from data frame
 
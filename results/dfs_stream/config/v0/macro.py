@@ -0,0 +1,8 @@
+from eskapade import ConfigObject, ProcessManager, analysis, visualization, core_ops
+settings = ProcessManager().service(ConfigObject)
+settings['analysisName'] = 'dfs_stream'
+pm = ProcessManager()
+ch = pm.add_chain('Data')
+ch.add_link(analysis.ReadToDf(name='read', key='data', path='/tmp/dfs/data.csv', chunksize=10000))
+ch.add_link(visualization.DfSummary(name='summary', read_key='data', stream=True, results_path='/tmp/dfs/report'))
+ch.add_link(core_ops.RepeatChain(listenTo='chainRepeatRequestBy_read'))
@@ -38,7 +38,7 @@ settings['version'] = 0
 settings['input_path'] = persistence.io_path('data', settings.io_conf(), 'correlated_data.sv.gz')
 settings['reader'] = 'csv'
 settings['separator'] = ' '
-settings['correlations'] = ['pearson', 'kendall', 'spearman', 'correlation_ratio']
+settings['correlations'] = ['pearson', 'kendall', 'spearman', 'correlation_ratio', 'mutual_information']
 
 
 #########################################################################################